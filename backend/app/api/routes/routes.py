@@ -1,72 +1,478 @@
-from fastapi import APIRouter, HTTPException
-from core.models import SearchQuery, AdvancedSearchQuery
-from core.client import get_client
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from elasticsearch import AsyncElasticsearch
+from core.models import SearchQuery, AdvancedSearchQuery, BatchSearchRequest, BatchAdvancedSearchQuery
+from core.client import get_async_client
+import json
+import logging
 import os
+import numpy as np
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 from dotenv import load_dotenv
-from core.custom_search import vector_text_search, advanced_search, generate_embedding
-from core.suggestions import update_search_stats, get_search_suggestions
+from core.custom_search import (
+    async_vector_text_search,
+    async_advanced_search,
+    async_vector_text_search_page,
+    async_advanced_search_page,
+    async_batch_search,
+    plan_vector_text_search,
+    plan_advanced_search,
+    SearchPlan,
+    build_vector_text_page_query,
+    build_advanced_query,
+    format_hits
+)
+from core.query_dsl import build_filter_clauses
+from core.reranker import RankingWeights, ranking_weights
+from core.index_lifecycle import IndexAliases, get_index_aliases
+from core.pagination import InvalidCursor, params_fingerprint, async_iterate_hits
+from core.embeddings import embedding_service
+from core.suggestions import async_get_search_suggestions, async_get_completion_suggestions
+from core.suggestion_index import suggestion_index
+from core.trending import trending_tracker
+from core.stats_aggregator import SearchStatsAggregator, get_stats_aggregator
 from core.documents import fetch_and_index_new_documents
+from core.dedup import deduplicator
+from core.vector_index import local_vector_index
+from core.result_cache import result_cache
+from core.miss_fill import MissFillQueue, MissFillQueueFull, get_miss_fill_queue
+from core.metrics import record_miss_fill, stage, traced
+from core.singleflight import singleflight
 
 load_dotenv()
 
+# Retrieval settings for /api/search (the request can override the mode)
+SEARCH_MODE = os.getenv("SEARCH_MODE", "script_score")
+SEARCH_FUSION = os.getenv("SEARCH_FUSION", "rrf")
+KNN_NUM_CANDIDATES = int(os.getenv("KNN_NUM_CANDIDATES", "100"))
+
+# Suggestions: memory (in-process trie), completion (ES completion suggester)
+# or query (prefix + phrase_prefix queries)
+SUGGESTION_BACKEND = os.getenv("SUGGESTION_BACKEND", "memory")
+SUGGESTION_FALLBACK = os.getenv("SUGGESTION_FALLBACK", "true").lower() == "true"
+SUGGESTION_SIZE = int(os.getenv("SUGGESTION_SIZE", "5"))
+
+# Page size of the point-in-time searches behind the NDJSON export endpoints
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+# Fill search misses in a background job instead of blocking the request
+MISS_FILL_BACKGROUND = os.getenv("MISS_FILL_BACKGROUND", "false").lower() == "true"
+
+# Most searches accepted by one /api/search/batch request
+BATCH_SEARCH_MAX_QUERIES = int(os.getenv("BATCH_SEARCH_MAX_QUERIES", "100"))
+
 # Create the router with a prefix and tags
 router = APIRouter(
     prefix="/api",
     tags=["search"]
 )
 
+def search_mode(query: SearchQuery) -> str:
+    """
+    Returns the retrieval mode of a /api/search request; ranking weights imply the rerank mode
+    """
+    return query.mode or ("rerank" if query.ranking else SEARCH_MODE)
+
+def search_ranking(query: SearchQuery) -> Optional[RankingWeights]:
+    """
+    Returns the second-stage ranking of a rerank request: the RERANK_* defaults
+    with the weights the request set
+    """
+    if search_mode(query) != "rerank":
+        return None
+    return ranking_weights(query.ranking.model_dump() if query.ranking else None)
+
+def search_filters(query: SearchQuery) -> Optional[List[Dict[str, Any]]]:
+    """
+    Builds the filter-context clauses of a /api/search request
+    """
+    if query.filters is None:
+        return None
+    return build_filter_clauses(**query.filters.model_dump())
+
+async def search_documents(
+    client: AsyncElasticsearch,
+    index_name: str,
+    query: SearchQuery,
+    query_vector: np.ndarray
+) -> List[Dict[str, Any]]:
+    return await async_vector_text_search(
+        client=client,
+        index_name=index_name,
+        query_text=query.query,
+        query_vector=query_vector,
+        size=query.size,
+        mode=search_mode(query),
+        fusion=SEARCH_FUSION,
+        num_candidates=KNN_NUM_CANDIDATES,
+        vector_index=local_vector_index,
+        filters=search_filters(query),
+        ranking=search_ranking(query)
+    )
+
+async def fill_missing_results(
+    client: AsyncElasticsearch,
+    aliases: IndexAliases,
+    query: SearchQuery,
+    query_vector: np.ndarray,
+    cache_params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Fetches and indexes new documents for a query with no results, then searches again
+    """
+    new_documents = await fetch_and_index_new_documents(client, aliases.write, query.query, aliases.read)
+    if not new_documents:
+        return []
+
+    # Taken after this fill's own write, before the search that sees it
+    generation = await result_cache.current_generation()
+    results = await search_documents(client, aliases.read, query, query_vector)
+    if results:
+        await result_cache.set("search", cache_params, results, generation)
+    return results
+
+async def search_uncached(
+    client: AsyncElasticsearch,
+    aliases: IndexAliases,
+    query: SearchQuery,
+    cache_params: Dict[str, Any],
+    miss_fill: MissFillQueue,
+    background: bool,
+    generation: int
+) -> Dict[str, Any]:
+    """
+    Answers a search the result cache could not: embeds the query, searches
+    and, without results, fills the index from Google inline or in the background.
+    `generation` is the index generation of the cache lookup.
+    """
+    # Generar embedding para la consulta
+    with stage("query_embedding"):
+        query_vector = await embedding_service.embed(query.query)
+
+    # Realizar búsqueda
+    with stage("search"):
+        results = await search_documents(client, aliases.read, query, query_vector)
+    if results:
+        await result_cache.set("search", cache_params, results, generation)
+        return {"results": results}
+
+    # Sin resultados: completar el índice con Google, en línea o en segundo plano
+    def work():
+        return fill_missing_results(client, aliases, query, query_vector, cache_params)
+
+    if not background:
+        record_miss_fill("inline")
+        with stage("miss_fill"):
+            return {"results": await work()}
+
+    try:
+        job = miss_fill.submit(result_cache.make_key("search", cache_params), work)
+    except MissFillQueueFull:
+        return {"results": [], "pending": None}
+    return {"results": [], "pending": job.token}
+
 @router.post("/search")
-async def search(query: SearchQuery):
+@traced("search")
+async def search(
+    query: SearchQuery,
+    client: AsyncElasticsearch = Depends(get_async_client),
+    stats: SearchStatsAggregator = Depends(get_stats_aggregator),
+    miss_fill: MissFillQueue = Depends(get_miss_fill_queue),
+    aliases: IndexAliases = Depends(get_index_aliases)
+):
     try:
-        client = get_client()
-        index_name = os.getenv("INDEX_NAME")
+        index_name = aliases.read
         
-        # Actualizar estadísticas de búsqueda
-        update_search_stats(client, index_name, query.query)
-        
-        # Generar embedding para la consulta
-        query_vector = generate_embedding(query.query)
+        # Actualizar estadísticas de búsqueda (se escriben en segundo plano);
+        # las páginas siguientes de un cursor no cuentan como búsquedas nuevas
+        if query.cursor is None:
+            with stage("record_stats"):
+                stats.record(query.query)
+                trending_tracker.record(query.query)
+                suggestion_index.add_query(query.query)
+
+        if query.paginate or query.cursor:
+            return await search_page(client, index_name, query)
+
+        cache_params = search_cache_params(query)
+        with stage("cache_lookup"):
+            cached, generation = await result_cache.lookup("search", cache_params)
+        if cached is not None:
+            return {"results": cached}
+
+        # Identical concurrent searches share one embedding, query and miss-fill
+        background = query.background_fill if query.background_fill is not None else MISS_FILL_BACKGROUND
+        return await singleflight.do(
+            "search",
+            {**cache_params, "background_fill": background},
+            lambda: search_uncached(client, aliases, query, cache_params, miss_fill, background, generation)
+        )
         
-        # Realizar búsqueda
-        results = vector_text_search(
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def search_cache_params(query: SearchQuery) -> Dict[str, Any]:
+    """
+    Result cache parameters of a /api/search request
+    """
+    return {
+        "query": query.query,
+        "size": query.size,
+        "mode": search_mode(query),
+        "filters": query.filters.model_dump() if query.filters else None,
+        "ranking": query.ranking.model_dump() if query.ranking else None
+    }
+
+def plan_search(query: SearchQuery, query_vector: np.ndarray) -> SearchPlan:
+    return plan_vector_text_search(
+        query_text=query.query,
+        query_vector=query_vector,
+        size=query.size,
+        mode=search_mode(query),
+        fusion=SEARCH_FUSION,
+        num_candidates=KNN_NUM_CANDIDATES,
+        vector_index=local_vector_index,
+        filters=search_filters(query),
+        ranking=search_ranking(query)
+    )
+
+def plan_advanced(query: AdvancedSearchQuery) -> SearchPlan:
+    return plan_advanced_search(
+        title=query.title,
+        author=query.author,
+        date_from=query.date_from,
+        date_to=query.date_to,
+        keywords=query.keywords,
+        content=query.content,
+        size=query.size
+    )
+
+@router.post("/search/batch")
+@traced("search_batch")
+async def search_batch(
+    batch: BatchSearchRequest,
+    client: AsyncElasticsearch = Depends(get_async_client),
+    stats: SearchStatsAggregator = Depends(get_stats_aggregator),
+    miss_fill: MissFillQueue = Depends(get_miss_fill_queue),
+    aliases: IndexAliases = Depends(get_index_aliases)
+):
+    """
+    Runs several searches and advanced searches at once: the query texts
+    are embedded together and every request body goes out in one _msearch.
+    Responses come back in request order, each with its own error.
+    """
+    if len(batch.queries) > BATCH_SEARCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {BATCH_SEARCH_MAX_QUERIES} queries per batch, got {len(batch.queries)}"
+        )
+
+    responses: List[Optional[Dict[str, Any]]] = [None] * len(batch.queries)
+    uncached = []
+    with stage("cache_lookup"):
+        for position, query in enumerate(batch.queries):
+            if query.paginate or query.cursor:
+                responses[position] = {"results": [], "error": "Pagination is not supported in batch searches"}
+                continue
+            advanced = isinstance(query, BatchAdvancedSearchQuery)
+            if not advanced and batch.record_stats:
+                stats.record(query.query)
+                trending_tracker.record(query.query)
+                suggestion_index.add_query(query.query)
+            namespace = "advanced-search" if advanced else "search"
+            cache_params = query.model_dump(exclude={"type"}) if advanced else search_cache_params(query)
+            cached, generation = await result_cache.lookup(namespace, cache_params)
+            if cached is not None:
+                responses[position] = {"results": cached}
+            else:
+                uncached.append((position, query, namespace, cache_params, generation))
+
+    # One embedding batch for every search text (the service also dedups and caches them)
+    texts = [query.query for _, query, namespace, *_ in uncached if namespace == "search"]
+    with stage("query_embedding"):
+        vectors = iter(await embedding_service.embed_many(texts))
+
+    planned = []
+    for position, query, namespace, cache_params, generation in uncached:
+        try:
+            plan = plan_advanced(query) if namespace == "advanced-search" else plan_search(query, next(vectors))
+        except ValueError as e:
+            responses[position] = {"results": [], "error": str(e)}
+            continue
+        planned.append((position, query, namespace, cache_params, generation, plan))
+
+    with stage("search"):
+        outcomes = await async_batch_search(client, aliases.read, [plan for *_, plan in planned])
+
+    for (position, query, namespace, cache_params, generation, plan), (results, error) in zip(planned, outcomes):
+        if error is not None:
+            responses[position] = {"results": [], "error": error}
+            continue
+        if results:
+            await result_cache.set(namespace, cache_params, results, generation)
+        responses[position] = {"results": results}
+        if not results and namespace == "search" and batch.fill_misses:
+            def work(query=query, query_vector=plan.query_vector, cache_params=cache_params):
+                return fill_missing_results(client, aliases, query, query_vector, cache_params)
+            try:
+                responses[position]["pending"] = miss_fill.submit(result_cache.make_key("search", cache_params), work).token
+            except MissFillQueueFull:
+                responses[position]["pending"] = None
+
+    return {"responses": responses}
+
+def page_fingerprint(query: Any, **overrides) -> str:
+    """
+    Fingerprint of the parameters that define a paged result list
+    """
+    params = query.model_dump(exclude={"cursor", "paginate", "background_fill"})
+    params.update(overrides)
+    return params_fingerprint(params)
+
+async def search_page(client: AsyncElasticsearch, index_name: str, query: SearchQuery) -> Dict[str, Any]:
+    """
+    Serves a cursor-paged /api/search request. Pages bypass the result cache.
+    """
+    mode = search_mode(query)
+    try:
+        query_vector = await embedding_service.embed(query.query)
+        results, next_cursor = await async_vector_text_search_page(
             client=client,
             index_name=index_name,
             query_text=query.query,
             query_vector=query_vector,
-            size=query.size
+            fingerprint=page_fingerprint(query, mode=mode),
+            size=query.size,
+            cursor=query.cursor,
+            mode=mode,
+            filters=search_filters(query)
         )
-        
-        if not results:
-            new_documents = await fetch_and_index_new_documents(
-                client, 
-                index_name, 
-                query.query
-            )
-            
-            if new_documents:
-                results = vector_text_search(
-                    client=client,
-                    index_name=index_name,
-                    query_text=query.query,
-                    query_vector=query_vector,
-                    size=query.size
-                )
-        
-        return {"results": results}
-        
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"results": results, "next_cursor": next_cursor}
+
+async def stream_ndjson(
+    hits: AsyncIterator[Dict[str, Any]],
+    format_hit: Callable[[Dict[str, Any]], Dict[str, Any]]
+) -> AsyncIterator[str]:
+    """
+    Writes hits as NDJSON lines as they arrive. Errors after the response
+    has started are reported as a final {"error": ...} line.
+    """
+    try:
+        async for hit in hits:
+            yield json.dumps(format_hit(hit), default=str) + "\n"
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-@router.get("/suggestions")
-async def get_suggestions(query: str):
+        logging.error(f"Error exporting search results: {str(e)}")
+        yield json.dumps({"error": str(e)}) + "\n"
+
+@router.post("/search/export")
+@traced("search_export")
+async def export_search(
+    query: SearchQuery,
+    limit: Optional[int] = Query(default=None, ge=1),
+    client: AsyncElasticsearch = Depends(get_async_client),
+    aliases: IndexAliases = Depends(get_index_aliases)
+):
+    """
+    Streams every result of a search as NDJSON, paging over a point in time
+    """
     try:
-        client = get_client()
-        index_name = os.getenv("INDEX_NAME")
-        
-        suggestions = get_search_suggestions(
+        query_vector = await embedding_service.embed(query.query)
+        body = build_vector_text_page_query(
+            query.query, query_vector, search_mode(query), search_filters(query)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    hits = async_iterate_hits(client, aliases.read, body, EXPORT_BATCH_SIZE, limit)
+    return StreamingResponse(
+        stream_ndjson(hits, lambda hit: format_hits([hit])[0]),
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/search/pending/{token}")
+@traced("search_pending")
+async def get_pending_search(
+    token: str,
+    wait: float = Query(default=0, ge=0, le=30),
+    miss_fill: MissFillQueue = Depends(get_miss_fill_queue)
+):
+    """
+    Returns the state of a background miss-fill job, optionally waiting
+    up to `wait` seconds for it to finish
+    """
+    job = await miss_fill.wait(token, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired token")
+    return job.to_dict()
+
+@router.get("/search/pending-stats")
+@traced("search_pending_stats")
+async def get_miss_fill_stats(miss_fill: MissFillQueue = Depends(get_miss_fill_queue)):
+    return miss_fill.stats.to_dict(miss_fill.queue_depth)
+    
+@router.get("/embeddings/stats")
+@traced("embedding_stats")
+async def get_embedding_stats():
+    return embedding_service.status()
+
+@router.get("/cache/stats")
+@traced("cache_stats")
+async def get_cache_stats():
+    return result_cache.stats.to_dict()
+
+@router.get("/coalescing/stats")
+@traced("coalescing_stats")
+async def get_coalescing_stats():
+    return singleflight.status()
+
+@router.get("/dedup/stats")
+@traced("dedup_stats")
+async def get_dedup_stats():
+    return deduplicator.status()
+
+async def fetch_suggestions(client: AsyncElasticsearch, index_name: str, query: str) -> List[Any]:
+    """
+    Suggestions from Elasticsearch with the configured backend
+    """
+    if SUGGESTION_BACKEND == "query":
+        return await async_get_search_suggestions(
             client=client,
             index_name=index_name,
-            query=query
+            query=query,
+            size=SUGGESTION_SIZE
+        )
+    return await async_get_completion_suggestions(
+        client=client,
+        index_name=index_name,
+        query=query,
+        size=SUGGESTION_SIZE
+    )
+
+@router.get("/suggestions")
+@traced("suggestions")
+async def get_suggestions(
+    query: str,
+    client: AsyncElasticsearch = Depends(get_async_client),
+    aliases: IndexAliases = Depends(get_index_aliases)
+):
+    try:
+        index_name = aliases.read
+
+        # Served from memory once the trie is loaded; ES covers startup and misses
+        if SUGGESTION_BACKEND == "memory" and suggestion_index.ready:
+            suggestions = suggestion_index.suggest(query, size=SUGGESTION_SIZE)
+            if suggestions or not SUGGESTION_FALLBACK:
+                return {"suggestions": [suggestion.to_dict() for suggestion in suggestions]}
+
+        # Every keystroke of a trending prefix reaches here at once; one ES request serves them
+        suggestions = await singleflight.do(
+            "suggestions",
+            {"index": index_name, "prefix": query, "backend": SUGGESTION_BACKEND, "size": SUGGESTION_SIZE},
+            lambda: fetch_suggestions(client, index_name, query),
+            normalize=False
         )
         
         return {
@@ -74,25 +480,99 @@ async def get_suggestions(query: str):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/trending")
+@traced("trending")
+async def get_trending(size: int = Query(default=10, ge=1, le=100)):
+    """
+    Returns the queries with the highest time-decayed search score
+    """
+    return {
+        "trending": [
+            {"text": text, "score": score, "trending": score >= trending_tracker.threshold}
+            for text, score in trending_tracker.top(size)
+        ],
+        **trending_tracker.status()
+    }
+
+@router.get("/suggestions/stats")
+@traced("suggestion_stats")
+async def get_suggestion_stats():
+    return {"backend": SUGGESTION_BACKEND, **suggestion_index.status()}
     
 @router.post("/advanced-search")
-async def advanced_search_endpoint(query: AdvancedSearchQuery):
+@traced("advanced_search")
+async def advanced_search_endpoint(
+    query: AdvancedSearchQuery,
+    client: AsyncElasticsearch = Depends(get_async_client),
+    aliases: IndexAliases = Depends(get_index_aliases)
+):
     try:
-        client = get_client()
-        index_name = os.getenv("INDEX_NAME")
+        index_name = aliases.read
+
+        if query.paginate or query.cursor:
+            try:
+                results, next_cursor = await async_advanced_search_page(
+                    client=client,
+                    index_name=index_name,
+                    fingerprint=page_fingerprint(query),
+                    title=query.title,
+                    author=query.author,
+                    date_from=query.date_from,
+                    date_to=query.date_to,
+                    keywords=query.keywords,
+                    content=query.content,
+                    size=query.size,
+                    cursor=query.cursor
+                )
+            except InvalidCursor as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return {"results": results, "next_cursor": next_cursor}
+
+        cache_params = query.model_dump()
+        with stage("cache_lookup"):
+            cached, generation = await result_cache.lookup("advanced-search", cache_params)
+        if cached is not None:
+            return {"results": cached}
         
-        results = advanced_search(
-            client=client,
-            index_name=index_name,
-            title=query.title,
-            author=query.author,
-            date_from=query.date_from,
-            date_to=query.date_to,
-            keywords=query.keywords,
-            content=query.content,
-            size=query.size
-        )
+        with stage("search"):
+            try:
+                results = await async_advanced_search(
+                    client=client,
+                    index_name=index_name,
+                    title=query.title,
+                    author=query.author,
+                    date_from=query.date_from,
+                    date_to=query.date_to,
+                    keywords=query.keywords,
+                    content=query.content,
+                    size=query.size,
+                    raise_errors=True
+                )
+            except Exception:
+                # Un fallo de Elasticsearch no se guarda en caché como "sin resultados"
+                return {"results": []}
         
+        await result_cache.set("advanced-search", cache_params, results, generation)
         return {"results": results}
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/advanced-search/export")
+@traced("advanced_search_export")
+async def export_advanced_search(
+    query: AdvancedSearchQuery,
+    limit: Optional[int] = Query(default=None, ge=1),
+    client: AsyncElasticsearch = Depends(get_async_client),
+    aliases: IndexAliases = Depends(get_index_aliases)
+):
+    """
+    Streams every result of an advanced search as NDJSON
+    """
+    body = build_advanced_query(
+        query.title, query.author, query.date_from, query.date_to, query.keywords, query.content
+    )
+    hits = async_iterate_hits(client, aliases.read, body, EXPORT_BATCH_SIZE, limit)
+    return StreamingResponse(stream_ndjson(hits, lambda hit: hit['_source']), media_type="application/x-ndjson")
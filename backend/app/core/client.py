@@ -1,17 +1,49 @@
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from fastapi import Request
 from dotenv import load_dotenv
+from typing import Any, Dict
 import os
 import ssl
 
 load_dotenv()
 
+def get_client_options() -> Dict[str, Any]:
+    """
+    Connection, pooling and retry options shared by the sync and async clients
+    """
+    host = os.getenv("ELASTICSEARCH_CLOUD_ID")
+    options = {
+        "hosts": [host],
+        "api_key": os.getenv("ELASTICSEARCH_API_KEY"),
+        "connections_per_node": int(os.getenv("ELASTICSEARCH_POOL_SIZE", "10")),
+        "request_timeout": float(os.getenv("ELASTICSEARCH_REQUEST_TIMEOUT", "10")),
+        "max_retries": int(os.getenv("ELASTICSEARCH_MAX_RETRIES", "3")),
+        "retry_on_timeout": os.getenv("ELASTICSEARCH_RETRY_ON_TIMEOUT", "true").lower() == "true",
+        "retry_on_status": (429, 502, 503, 504),
+        "retry_backoff_base": float(os.getenv("ELASTICSEARCH_RETRY_BACKOFF_BASE", "0.1")),
+        "retry_backoff_cap": float(os.getenv("ELASTICSEARCH_RETRY_BACKOFF_CAP", "2"))
+    }
+
+    # TLS options are only valid for https hosts (a local cluster may use plain http)
+    if not host or not host.startswith("http://"):
+        options["verify_certs"] = True
+        options["ssl_context"] = ssl.create_default_context()
+    return options
+
 def get_client() -> Elasticsearch:
     """
         Create an Elasticsearh client
     """
-    return Elasticsearch(
-        hosts=[os.getenv("ELASTICSEARCH_CLOUD_ID")],
-        api_key=os.getenv("ELASTICSEARCH_API_KEY"),
-        verify_certs=True,
-        ssl_context=ssl.create_default_context()
-    )
\ No newline at end of file
+    return Elasticsearch(**get_client_options())
+
+def create_async_client() -> AsyncElasticsearch:
+    """
+    Create the pooled AsyncElasticsearch client shared for the application lifetime
+    """
+    return AsyncElasticsearch(**get_client_options())
+
+async def get_async_client(request: Request) -> AsyncElasticsearch:
+    """
+    FastAPI dependency returning the application-wide async client
+    """
+    return request.app.state.es_client
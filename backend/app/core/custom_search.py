@@ -1,70 +1,74 @@
-import requests
-import os
 import logging 
-from elasticsearch import Elasticsearch
-from typing import List, Dict, Any, Optional
-from transformers import AutoTokenizer, AutoModel
-import torch
+import time
+from dataclasses import dataclass
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from .vector_index import VectorIndex
+from .embedding_backends import embedding_backend
+from .index import VECTOR_SIMILARITY
+from .pagination import search_page, async_search_page
+from .query_dsl import BoolQuery, build_filter_clauses, match, multi_match, with_filters
+from .reranker import RankingWeights, build_candidate_bodies, rerank
+from .metrics import record_embedding_batch, record_error, record_es_request
+from .quantization import vector_quantization
 
-model_name = "sentence-transformers/all-MiniLM-L6-v2"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModel.from_pretrained(model_name)
-
-def fetch_custom_search_results(query: str, num_results: int = 10) -> list[dict]:
+def generate_embedding(text: str) -> np.ndarray:
     """
-    Query the Google API Custom Search JSON and get the results.
+    Generates an embedding for a given text with the configured embedding backend.
 
     Args:
-        query: Search query
-        num_results: Number of results to return (maximum 10)
+        text: The text to process.
 
     Returns:
-        list[dict]: List of results with relevant information
+        np.ndarray: Text embedding as a float32 vector.
     """
-    api_key = os.getenv("GOOGLE_API_KEY")
-    search_engine_id = os.getenv("SEARCH_ENGINE_ID")
-    url = "https://www.googleapis.com/customsearch/v1"
-
-    params = {
-        "q": query,
-        "key": api_key,
-        "cx": search_engine_id,
-        "num": num_results
-    }
+    return embedding_backend.embed([text])[0]
 
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        results = response.json().get("items", [])
-        return results
-    else:
-        raise Exception(f"Error querying the API: {response.status_code}, {response.text}")
-
-def generate_embedding(text: str) -> list[float]:
+def generate_embeddings(texts: list[str]) -> np.ndarray:
     """
-    Generates an embedding for a given text using Hugging Face.
+    Generates embeddings for several texts in a single padded forward pass.
 
     Args:
-        text: The text to process.
+        texts: The texts to process.
 
     Returns:
-        list[float]: Text embedding as a list of floats.
+        np.ndarray: One float32 embedding row per input text, in the same order.
     """
-    # Tokenize the text
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
+    return embedding_backend.embed(texts)
 
-    # Generate model representations
-    with torch.no_grad():
-        outputs = model(**inputs)
+def search_result_document(item: dict) -> dict:
+    """
+    Maps a Custom Search JSON API result to a document without its vector
+    """
+    return {
+        "title": item.get("title", ""),
+        "author": "Google Search",
+        "publication_date": None,
+        "abstract": item.get("snippet", ""),
+        "keywords": [],
+        "content": item.get("link", "")
+    }
+
+def embed_documents(documents: list[dict]) -> list[dict]:
+    """
+    Adds the vector of every document in a single batched Hugging Face call
+    """
+    # Combined text from the title and snippet
+    texts = [f"{doc.get('title', '')} {doc.get('abstract', '')}".strip() for doc in documents]
 
-    # Extract the [CLS] token representation
-    # Typically, the [CLS] token embedding (position 0) is representative of the entire text
-    embedding = outputs.last_hidden_state[:, 0, :].squeeze().tolist()
-    return embedding
+    # Generate every embedding in one padded forward pass, stored as the index expects it
+    vectors = vector_quantization.encode(generate_embeddings(texts)) if texts else []
+    if texts:
+        record_embedding_batch("ingest", len(texts))
+    for document, vector in zip(documents, vectors):
+        document["vector"] = vector  # Vector generated by the model
+    return documents
 
 def process_search_results(results: list[dict]) -> list[dict]:
     """
     Processes the results from the Custom Search JSON API and prepares them for Elasticsearch.
-    Generates embeddings using Hugging Face.
+    Generates all embeddings in a single batched Hugging Face call.
 
     Args:
         results: List of raw API results.
@@ -72,33 +76,354 @@ def process_search_results(results: list[dict]) -> list[dict]:
     Returns:
         list[dict]: List of processed documents.
     """
-    documents = []
-    for item in results:
-        # Combined text from the title and snippet
-        text = f"{item.get('title', '')} {item.get('snippet', '')}".strip()
-
-        # Generate the embedding using Hugging Face
-        vector = generate_embedding(text)
-
-        # Create the processed document
-        documents.append({
-            "title": item.get("title", ""),
-            "author": "Google Search",
-            "publication_date": None,
-            "abstract": item.get("snippet", ""),
-            "keywords": [],
-            "content": item.get("link", ""),
-            "vector": vector  # Vector generated by the model
-        })
-    return documents
+    return embed_documents([search_result_document(item) for item in results])
+
+SEARCH_MODES = ("script_score", "knn", "hybrid", "rerank")
+FUSION_METHODS = ("rrf", "linear")
+
+def build_text_query(query_text: str) -> Dict[str, Any]:
+    """
+    Builds the BM25 multi_match clause used by every search mode.
+    """
+    return multi_match(query_text, ["title^3", "abstract^2", "content"])
+
+def build_knn_clause(
+    query_vector: np.ndarray,
+    size: int,
+    num_candidates: int,
+    boost: float = 1.0,
+    filters: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Builds the approximate kNN section over the indexed vector field.
+    Filters are applied during the graph search, so k hits still come back.
+    Quantized float indices rescore their oversampled candidates with the raw vectors.
+    """
+    clause = {
+        "field": "vector",
+        "query_vector": vector_quantization.encode(query_vector),
+        "k": size,
+        "num_candidates": max(num_candidates, size),
+        "boost": boost,
+        **vector_quantization.knn_options()
+    }
+    if filters:
+        clause["filter"] = filters
+    return clause
+
+# Similarity of the searched index, detected at startup (set_script_similarity)
+script_similarity = VECTOR_SIMILARITY
+
+def set_script_similarity(similarity: str):
+    """
+    Sets the similarity function of the script_score queries. dotProduct
+    scores of unnormalized vectors can be negative, which Elasticsearch rejects.
+    """
+    global script_similarity
+    script_similarity = similarity
+
+def build_vector_text_query(
+    query_text: str,
+    query_vector: np.ndarray,
+    size: int = 10,
+    similarity: Optional[str] = None,
+    filters: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Builds the combined text and vector similarity query body.
+
+    Args:
+        query_text: Text for search
+        query_vector: Vector for search
+        size: Maximum number of results
+        similarity: "dot_product" for normalized vectors (no per-document
+            renormalization), "cosine" otherwise; defaults to the index's own
+        filters: Non-scoring clauses the matches must satisfy
+
+    Returns:
+        Dict: Elasticsearch query body
+    """
+    function = "dotProduct" if (similarity or script_similarity) == "dot_product" else "cosineSimilarity"
+    similarity_script = f"{function}(params.query_vector, 'vector')"
+    params = {"query_vector": vector_quantization.encode(query_vector)}
+    if function == "dotProduct" and vector_quantization.script_scale != 1.0:
+        # Byte vectors: bring the integer dot product back to [-1, 1]
+        similarity_script = f"{similarity_script} * params.vector_scale"
+        params["vector_scale"] = vector_quantization.script_scale
+    return {
+        "size": size,
+        "query": {
+            "script_score": {
+                "query": with_filters(build_text_query(query_text), filters),
+                "script": {
+                    "source": f"""
+                        {similarity_script} + 1.0 + 
+                        (doc['keywords'].size() > 0 ? 0.5 : 0)
+                    """,
+                    "params": params
+                }
+            }
+        }
+    }
+
+def build_search_bodies(
+    query_text: str,
+    query_vector: np.ndarray,
+    size: int = 10,
+    mode: str = "script_score",
+    fusion: str = "rrf",
+    num_candidates: int = 100,
+    text_weight: float = 1.0,
+    vector_weight: float = 1.0,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    ranking: Optional[RankingWeights] = None
+) -> List[Dict[str, Any]]:
+    """
+    Builds the request bodies for a search mode.
+
+    script_score and linear hybrid searches need a single request; an RRF
+    hybrid search runs the BM25 and kNN retrievals separately and fuses
+    their rankings client side. rerank retrieves `ranking.candidates` hits
+    from each and leaves the ranking to the reranker.
+
+    Args:
+        query_text: Text for search
+        query_vector: Vector for search
+        size: Maximum number of results
+        mode: One of "script_score", "knn" or "hybrid"
+        fusion: "rrf" or "linear", only used by the hybrid mode
+        num_candidates: Candidates considered per shard by the kNN search
+        text_weight: Weight of the BM25 score in a linear blend
+        vector_weight: Weight of the vector similarity in a linear blend
+        filters: Non-scoring clauses applied to every retrieval
+        ranking: Second-stage ranking, used by the rerank mode
+
+    Returns:
+        List[Dict]: Elasticsearch query bodies
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+    if fusion not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method '{fusion}', expected one of {FUSION_METHODS}")
+
+    if mode == "script_score":
+        return [build_vector_text_query(query_text, query_vector, size, filters=filters)]
+
+    if mode == "knn":
+        # Byte vectors: fetch extra hits for the float rescoring in SearchPlan.results
+        k = vector_quantization.candidates(size)
+        return [{"size": k, "knn": build_knn_clause(query_vector, k, num_candidates, filters=filters)}]
+
+    if mode == "rerank":
+        candidates = (ranking or RankingWeights()).candidates
+        return build_candidate_bodies(build_text_query(query_text), query_vector, candidates, num_candidates, filters)
+
+    if fusion == "linear":
+        # ES sums the boosted BM25 and kNN scores of documents found by either
+        text_query = build_text_query(query_text)
+        text_query["multi_match"]["boost"] = text_weight
+        return [{
+            "size": size,
+            "query": with_filters(text_query, filters),
+            "knn": build_knn_clause(query_vector, size, num_candidates, boost=vector_weight, filters=filters)
+        }]
+
+    return [
+        {"size": size, "query": with_filters(build_text_query(query_text), filters)},
+        {"size": size, "knn": build_knn_clause(query_vector, size, num_candidates, filters=filters)}
+    ]
+
+def uses_local_vector_index(vector_index: Optional[VectorIndex], mode: str, fusion: str) -> bool:
+    """
+    Whether the local vector index serves the vector retrieval of a search.
+    It only stands in for the kNN retrieval, so script_score and linear
+    fusion (scored inside one Elasticsearch request) stay in Elasticsearch,
+    as does every search until the index is built.
+    """
+    if vector_index is None or not vector_index.ready:
+        return False
+    return mode in ("knn", "rerank") or (mode == "hybrid" and fusion == "rrf")
+
+def build_local_vector_bodies(
+    query_text: str,
+    local_hits: List[Tuple[str, float]],
+    size: int = 10,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    text: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Builds the request bodies when vector candidates come from the local
+    vector index: the BM25 retrieval (unless `text` is False) plus a fetch
+    of the candidate documents. Filters drop candidates after the local search.
+    """
+    bodies = [{"size": size, "query": with_filters(build_text_query(query_text), filters)}] if text else []
+    bodies.append({
+        "size": len(local_hits),
+        "query": with_filters({"ids": {"values": [doc_id for doc_id, _ in local_hits]}}, filters)
+    })
+    return bodies
+
+def order_local_hits(
+    response: Dict[str, Any],
+    local_hits: List[Tuple[str, float]]
+) -> List[Dict[str, Any]]:
+    """
+    Orders fetched documents by their local vector rank and similarity.
+    """
+    hits_by_id = {hit['_id']: hit for hit in response['hits']['hits']}
+    return [
+        {**hits_by_id[doc_id], '_score': score}
+        for doc_id, score in local_hits
+        if doc_id in hits_by_id
+    ]
+
+def reciprocal_rank_fusion(
+    hit_lists: List[List[Dict[str, Any]]],
+    size: int,
+    rank_constant: int = 60
+) -> List[Dict[str, Any]]:
+    """
+    Merges several ranked hit lists with reciprocal rank fusion.
+    The fused score replaces each hit's _score.
+    """
+    scores: Dict[str, float] = {}
+    hits_by_id: Dict[str, Dict[str, Any]] = {}
+    for hits in hit_lists:
+        for rank, hit in enumerate(hits, start=1):
+            scores[hit['_id']] = scores.get(hit['_id'], 0.0) + 1.0 / (rank_constant + rank)
+            hits_by_id.setdefault(hit['_id'], hit)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:size]
+    return [{**hits_by_id[doc_id], '_score': score} for doc_id, score in ranked]
+
+def merge_search_responses(
+    responses: List[Dict[str, Any]],
+    size: int,
+    local_hits: Optional[List[Tuple[str, float]]] = None,
+    ranking: Optional[RankingWeights] = None,
+    query_vector: Optional[np.ndarray] = None
+) -> List[Dict[str, Any]]:
+    """
+    Returns the hits of a single response, or the fusion of several: the
+    reranker when a ranking is given, RRF otherwise.
+    """
+    for response in responses:
+        if 'error' in response:
+            raise Exception(f"Search request failed: {response['error']}")
+    hit_lists = [response['hits']['hits'] for response in responses]
+    if local_hits is not None:
+        # The local candidates are fetched last
+        hit_lists[-1] = order_local_hits(responses[-1], local_hits)
+    if len(hit_lists) == 1:
+        return hit_lists[0]
+    if ranking is not None:
+        return rerank(hit_lists, query_vector, ranking, size)
+    return reciprocal_rank_fusion(hit_lists, size)
+
+def build_msearch(index_name: str, bodies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Interleaves headers and bodies for an _msearch request.
+    """
+    searches = []
+    for body in bodies:
+        searches.append({"index": index_name})
+        searches.append(body)
+    return searches
+
+def format_hits(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Converts search hits into result dicts.
+    """
+    results = []
+    for hit in hits:
+        result = {
+            'id': hit['_id'],
+            'score': hit['_score'],
+            'title': hit['_source'].get('title', ''),
+            'abstract': hit['_source'].get('abstract', ''),
+            'author': hit['_source'].get('author', ''),
+            'publication_date': hit['_source'].get('publication_date'),
+            'keywords': hit['_source'].get('keywords', []),
+            'content': hit['_source'].get('content', '')
+        }
+        results.append(result)
+    return results
+
+def format_vector_text_hits(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Converts the hits of a vector text search response into result dicts.
+    """
+    return format_hits(response['hits']['hits'])
+
+@dataclass
+class SearchPlan:
+    """
+    The request bodies of one search and how their responses become results
+    """
+    bodies: List[Dict[str, Any]]
+    size: int
+    local_hits: Optional[List[Tuple[str, float]]] = None
+    ranking: Optional[RankingWeights] = None
+    query_vector: Optional[np.ndarray] = None
+    sources_only: bool = False
+    # Rescore the kNN hits of a byte-quantized index with the float query vector
+    rescore: bool = False
+
+    def results(self, responses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        hits = merge_search_responses(responses, self.size, self.local_hits, self.ranking, self.query_vector)
+        if self.rescore:
+            hits = vector_quantization.rescore(hits, self.query_vector, self.size)
+        if self.sources_only:
+            return [hit['_source'] for hit in hits]
+        return format_hits(hits)
+
+def plan_vector_text_search(
+    query_text: str,
+    query_vector: np.ndarray,
+    size: int = 10,
+    mode: str = "script_score",
+    fusion: str = "rrf",
+    num_candidates: int = 100,
+    text_weight: float = 1.0,
+    vector_weight: float = 1.0,
+    vector_index: Optional[VectorIndex] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    ranking: Optional[RankingWeights] = None
+) -> SearchPlan:
+    """
+    Plans a combined text and vector search (see vector_text_search for the arguments)
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+    local_hits = None
+    ranking = (ranking or RankingWeights()) if mode == "rerank" else None
+    local = uses_local_vector_index(vector_index, mode, fusion)
+    if local:
+        retrieve = ranking.candidates if ranking is not None else size
+        local_hits = vector_index.search(query_vector, retrieve)
+        bodies = build_local_vector_bodies(query_text, local_hits, retrieve, filters, text=mode != "knn")
+    else:
+        bodies = build_search_bodies(
+            query_text, query_vector, size, mode, fusion, num_candidates, text_weight, vector_weight, filters, ranking
+        )
+    rescore = mode == "knn" and not local and vector_quantization.rescores_locally
+    return SearchPlan(bodies, size, local_hits, ranking, query_vector, rescore=rescore)
 
 def vector_text_search(
     client: Elasticsearch,
     index_name: str,
     query_text: str,
-    query_vector: List[float],
+    query_vector: np.ndarray,
     min_score: float = 0.1,
-    size: int = 10
+    size: int = 10,
+    mode: str = "script_score",
+    fusion: str = "rrf",
+    num_candidates: int = 100,
+    text_weight: float = 1.0,
+    vector_weight: float = 1.0,
+    vector_index: Optional[VectorIndex] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    ranking: Optional[RankingWeights] = None
 ) -> List[Dict[str, Any]]:
     """
     Performs a combined search by text and vector similarity.
@@ -110,56 +435,199 @@ def vector_text_search(
         query_vector: Vector for search
         min_score: Minimum score to filter results
         size: Maximum number of results
+        mode: "script_score" (rescore text matches), "knn" or "hybrid" (BM25 + kNN)
+        fusion: "rrf" or "linear", only used by the hybrid mode
+        num_candidates: Candidates considered per shard by the kNN search
+        text_weight: Weight of the BM25 score in a linear blend
+        vector_weight: Weight of the vector similarity in a linear blend
+        vector_index: Local vector index; once built, it replaces the kNN retrieval
+            of the knn, rerank and RRF hybrid modes (see uses_local_vector_index)
+        filters: Non-scoring clauses (see query_dsl.build_filter_clauses)
+        ranking: Second-stage ranking for the rerank mode (default: RankingWeights())
 
     Returns:
         List[Dict]: List of found documents
     """
     try:
-        query = {
-            "size": size,
-            "query": {
-                "script_score": {
-                    "query": {
-                        "multi_match": {
-                            "query": query_text,
-                            "fields": ["title^3", "abstract^2", "content"],
-                            "fuzziness": "AUTO"
-                        }
-                    },
-                    "script": {
-                        "source": """
-                            cosineSimilarity(params.query_vector, 'vector') + 1.0 + 
-                            (doc['keywords'].size() > 0 ? 0.5 : 0)
-                        """,
-                        "params": {"query_vector": query_vector}
-                    }
-                }
-            }
-        }
+        plan = plan_vector_text_search(
+            query_text, query_vector, size, mode, fusion, num_candidates, text_weight, vector_weight,
+            vector_index, filters, ranking
+        )
+        bodies = plan.bodies
+        started = time.perf_counter()
+        if len(bodies) == 1:
+            response = client.search(index=index_name, body=bodies[0])
+            record_es_request("search", time.perf_counter() - started, response)
+            responses = [response]
+        else:
+            response = client.msearch(searches=build_msearch(index_name, bodies))
+            record_es_request("msearch", time.perf_counter() - started, response)
+            responses = response['responses']
+        results = plan.results(responses)
 
-        response = client.search(index=index_name, body=query)
-        
-        results = []
-        for hit in response['hits']['hits']:
-            result = {
-                'id': hit['_id'],
-                'score': hit['_score'],
-                'title': hit['_source'].get('title', ''),
-                'abstract': hit['_source'].get('abstract', ''),
-                'author': hit['_source'].get('author', ''),
-                'publication_date': hit['_source'].get('publication_date'),
-                'keywords': hit['_source'].get('keywords', []),
-                'content': hit['_source'].get('content', '')
-            }
-            results.append(result)
+        logging.info(f"Search completed. Found {len(results)} results")
+        return results
+
+    except Exception as e:
+        logging.error(f"Error in search: {str(e)}")
+        record_error("search")
+        return []
+
+async def async_vector_text_search(
+    client: AsyncElasticsearch,
+    index_name: str,
+    query_text: str,
+    query_vector: np.ndarray,
+    min_score: float = 0.1,
+    size: int = 10,
+    mode: str = "script_score",
+    fusion: str = "rrf",
+    num_candidates: int = 100,
+    text_weight: float = 1.0,
+    vector_weight: float = 1.0,
+    vector_index: Optional[VectorIndex] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    ranking: Optional[RankingWeights] = None
+) -> List[Dict[str, Any]]:
+    """
+    Async version of vector_text_search using the shared AsyncElasticsearch client.
+    """
+    try:
+        plan = plan_vector_text_search(
+            query_text, query_vector, size, mode, fusion, num_candidates, text_weight, vector_weight,
+            vector_index, filters, ranking
+        )
+        bodies = plan.bodies
+        started = time.perf_counter()
+        if len(bodies) == 1:
+            response = await client.search(index=index_name, body=bodies[0])
+            record_es_request("search", time.perf_counter() - started, response)
+            responses = [response]
+        else:
+            response = await client.msearch(searches=build_msearch(index_name, bodies))
+            record_es_request("msearch", time.perf_counter() - started, response)
+            responses = response['responses']
+        results = plan.results(responses)
 
         logging.info(f"Search completed. Found {len(results)} results")
         return results
 
     except Exception as e:
         logging.error(f"Error in search: {str(e)}")
+        record_error("search")
         return []
 
+def build_vector_text_page_query(
+    query_text: str,
+    query_vector: np.ndarray,
+    mode: str = "script_score",
+    filters: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Builds the body paged with search_after. Only script_score ranks every
+    text match in one request; kNN and hybrid fusion return a fixed top k.
+    """
+    if mode != "script_score":
+        raise ValueError(f"Cursor pagination supports the script_score mode only, got '{mode}'")
+    body = build_vector_text_query(query_text, query_vector, filters=filters)
+    body.pop("size")
+    return body
+
+def vector_text_search_page(
+    client: Elasticsearch,
+    index_name: str,
+    query_text: str,
+    query_vector: np.ndarray,
+    fingerprint: str,
+    size: int = 10,
+    cursor: Optional[str] = None,
+    mode: str = "script_score",
+    filters: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Returns one page of a combined text and vector search.
+
+    Args:
+        client: Elasticsearch client
+        index_name: Index name
+        query_text: Text for search
+        query_vector: Vector for search
+        fingerprint: Hash of the request parameters, bound into the cursor
+        size: Page size
+        cursor: Token from the previous page, None for the first page
+        mode: Search mode; only "script_score" can be paged
+        filters: Non-scoring clauses the matches must satisfy
+
+    Returns:
+        Tuple[List[Dict], Optional[str]]: Found documents and the next cursor (None on the last page)
+    """
+    body = build_vector_text_page_query(query_text, query_vector, mode, filters)
+    hits, next_cursor = search_page(client, index_name, body, size, fingerprint, cursor)
+    return format_hits(hits), next_cursor
+
+async def async_vector_text_search_page(
+    client: AsyncElasticsearch,
+    index_name: str,
+    query_text: str,
+    query_vector: np.ndarray,
+    fingerprint: str,
+    size: int = 10,
+    cursor: Optional[str] = None,
+    mode: str = "script_score",
+    filters: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Async version of vector_text_search_page
+    """
+    body = build_vector_text_page_query(query_text, query_vector, mode, filters)
+    hits, next_cursor = await async_search_page(client, index_name, body, size, fingerprint, cursor)
+    return format_hits(hits), next_cursor
+
+def build_advanced_query(
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    keywords: Optional[List[str]] = None,
+    content: Optional[str] = None,
+    size: int = 10
+) -> Dict[str, Any]:
+    """
+    Builds the query body for an advanced search with multiple criteria.
+
+    Args:
+        title: Text to search in the title
+        author: Specific author
+        date_from: Start date (format: YYYY-MM-DD)
+        date_to: End date (format: YYYY-MM-DD)
+        keywords: List of keywords
+        content: Text to search in the content
+        size: Maximum number of results
+
+    Returns:
+        Dict: Elasticsearch query body
+    """
+    query = BoolQuery()
+
+    # Free text is scored
+    if title:
+        query.must(match("title", title))
+    if content:
+        query.must(match("content", content))
+
+    # Exact and range criteria only restrict the matches, so they run in
+    # filter context where they are not scored and can be cached
+    query.filter(*build_filter_clauses(author, keywords, date_from, date_to))
+
+    return {
+        "size": size,
+        "query": query.to_dict(),
+        "sort": [
+            {"_score": "desc"},
+            {"publication_date": {"order": "desc", "missing": "_last"}}
+        ]
+    }
+
 def advanced_search(
     client: Elasticsearch,
     index_name: str,
@@ -189,68 +657,46 @@ def advanced_search(
         List[Dict]: List of found documents
     """
     try:
-        must_conditions = []
-        
-        if title:
-            must_conditions.append({
-                "match": {
-                    "title": {
-                        "query": title,
-                        "fuzziness": "AUTO"
-                    }
-                }
-            })
-            
-        if author:
-            must_conditions.append({
-                "term": {
-                    "author.keyword": author
-                }
-            })
-            
-        if date_from or date_to:
-            must_conditions.append({
-                "range": {
-                    "publication_date": {
-                        "gte": date_from,
-                        "lte": date_to,
-                        "format": "yyyy-MM-dd"
-                    }
-                }
-            })
-            
-        if keywords:
-            must_conditions.append({
-                "terms": {
-                    "keywords": keywords
-                }
-            })
-            
-        if content:
-            must_conditions.append({
-                "match": {
-                    "content": {
-                        "query": content,
-                        "fuzziness": "AUTO"
-                    }
-                }
-            })
+        query = build_advanced_query(title, author, date_from, date_to, keywords, content, size)
+        started = time.perf_counter()
+        response = client.search(index=index_name, body=query)
+        record_es_request("advanced_search", time.perf_counter() - started, response)
 
-        query = {
-            "size": size,
-            "query": {
-                "bool": {
-                    "must": must_conditions if must_conditions else [{"match_all": {}}]
-                }
-            },
-            "sort": [
-                {"_score": "desc"},
-                {"publication_date": {"order": "desc", "missing": "_last"}}
-            ]
-        }
+        results = []
+        for hit in response['hits']['hits']:
+            results.append(hit['_source'])
+
+        logging.info(f"Advanced search completed. Found {len(results)} results")
+        return results
+
+    except Exception as e:
+        logging.error(f"Error in advanced search: {str(e)}")
+        record_error("advanced_search")
+        return []
+
+async def async_advanced_search(
+    client: AsyncElasticsearch,
+    index_name: str,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    keywords: Optional[List[str]] = None,
+    content: Optional[str] = None,
+    size: int = 10,
+    raise_errors: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Async version of advanced_search using the shared AsyncElasticsearch client.
+    With raise_errors, a failed search raises after logging instead of
+    returning [], so callers can tell it from an empty result.
+    """
+    try:
+        query = build_advanced_query(title, author, date_from, date_to, keywords, content, size)
+        started = time.perf_counter()
+        response = await client.search(index=index_name, body=query)
+        record_es_request("advanced_search", time.perf_counter() - started, response)
 
-        response = client.search(index=index_name, body=query)
-        
         results = []
         for hit in response['hits']['hits']:
             results.append(hit['_source'])
@@ -260,4 +706,115 @@ def advanced_search(
 
     except Exception as e:
         logging.error(f"Error in advanced search: {str(e)}")
+        record_error("advanced_search")
+        if raise_errors:
+            raise
         return []
+
+def plan_advanced_search(
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    keywords: Optional[List[str]] = None,
+    content: Optional[str] = None,
+    size: int = 10
+) -> SearchPlan:
+    """
+    Plans an advanced search (see advanced_search for the arguments)
+    """
+    query = build_advanced_query(title, author, date_from, date_to, keywords, content, size)
+    return SearchPlan([query], size, sources_only=True)
+
+async def async_batch_search(
+    client: AsyncElasticsearch,
+    index_name: str,
+    plans: List[SearchPlan]
+) -> List[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """
+    Runs several planned searches in a single _msearch request.
+
+    A failed search does not affect the others: its error is returned in
+    its place. A failed _msearch request is reported for every search.
+
+    Args:
+        client: Elasticsearch client
+        index_name: Index name
+        plans: Searches from plan_vector_text_search / plan_advanced_search
+
+    Returns:
+        List[Tuple]: (results, error) per plan, in order
+    """
+    bodies = [body for plan in plans for body in plan.bodies]
+    if not bodies:
+        return [([], None) for _ in plans]
+    try:
+        started = time.perf_counter()
+        response = await client.msearch(searches=build_msearch(index_name, bodies))
+        record_es_request("msearch", time.perf_counter() - started, response)
+        responses = response['responses']
+    except Exception as e:
+        logging.error(f"Error in batch search: {str(e)}")
+        record_error("batch_search")
+        return [([], str(e)) for _ in plans]
+
+    outcomes = []
+    position = 0
+    for plan in plans:
+        group = responses[position:position + len(plan.bodies)]
+        position += len(plan.bodies)
+        try:
+            outcomes.append((plan.results(group), None))
+        except Exception as e:
+            record_error("batch_search")
+            outcomes.append(([], str(e)))
+    logging.info(f"Batch search completed: {len(plans)} searches in one _msearch of {len(bodies)} requests")
+    return outcomes
+
+def advanced_search_page(
+    client: Elasticsearch,
+    index_name: str,
+    fingerprint: str,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    keywords: Optional[List[str]] = None,
+    content: Optional[str] = None,
+    size: int = 10,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Returns one page of an advanced search.
+
+    Args:
+        fingerprint: Hash of the request parameters, bound into the cursor
+        cursor: Token from the previous page, None for the first page
+        The other arguments are those of advanced_search; size is the page size
+
+    Returns:
+        Tuple[List[Dict], Optional[str]]: Found documents and the next cursor (None on the last page)
+    """
+    body = build_advanced_query(title, author, date_from, date_to, keywords, content)
+    hits, next_cursor = search_page(client, index_name, body, size, fingerprint, cursor)
+    return [hit['_source'] for hit in hits], next_cursor
+
+async def async_advanced_search_page(
+    client: AsyncElasticsearch,
+    index_name: str,
+    fingerprint: str,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    keywords: Optional[List[str]] = None,
+    content: Optional[str] = None,
+    size: int = 10,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Async version of advanced_search_page
+    """
+    body = build_advanced_query(title, author, date_from, date_to, keywords, content)
+    hits, next_cursor = await async_search_page(client, index_name, body, size, fingerprint, cursor)
+    return [hit['_source'] for hit in hits], next_cursor
@@ -0,0 +1,474 @@
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from elasticsearch.helpers import async_scan, scan, streaming_bulk
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import hashlib
+import logging
+import os
+import re
+import time
+
+import numpy as np
+
+TOKEN = re.compile(r"\w+")
+
+# Query parameters that never change which page a link points to
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src", "spm"}
+
+# Mersenne prime for the MinHash permutations; hashes stay below 2^31 so a * h fits in uint64
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a link: no scheme, lowercase host without "www." or
+    default port, no fragment, no trailing slash, no tracking parameters and
+    the remaining query parameters sorted. Values that are not URLs are
+    lowercased with whitespace collapsed.
+    """
+    url = (url or "").strip()
+    parts = urlsplit(url if "//" in url else f"//{url}")
+    if not parts.hostname:
+        return " ".join(url.lower().split())
+
+    host = parts.hostname.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and (parts.scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+    params = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    query = f"?{urlencode(params)}" if params else ""
+    return f"{host}{path}{query}"
+
+def document_text(document: dict) -> str:
+    return f"{document.get('title', '')} {document.get('abstract', '')}"
+
+def content_hash(document: dict) -> Optional[str]:
+    """
+    Hash of the title and abstract words, ignoring case and punctuation
+    """
+    tokens = TOKEN.findall(document_text(document).lower())
+    if not tokens:
+        return None
+    return hashlib.sha1(" ".join(tokens).encode("utf-8")).hexdigest()
+
+def fingerprint_document(document: dict) -> dict:
+    """
+    Adds the url_key and content_hash fields used to detect duplicates
+    """
+    document['url_key'] = normalize_url(document.get('content', '')) or None
+    document['content_hash'] = content_hash(document)
+    return document
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles; the share of equal positions in
+    two signatures estimates the Jaccard similarity of their shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> Set[str]:
+        tokens = TOKEN.findall(text.lower())
+        if len(tokens) <= self.shingle_size:
+            return {" ".join(tokens)} if tokens else set()
+        return {" ".join(tokens[i:i + self.shingle_size]) for i in range(len(tokens) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        ) % MERSENNE_PRIME
+        permuted = (np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+class SignatureIndex:
+    """
+    Bounded LSH index of MinHash signatures.
+
+    Signatures are split into bands; documents sharing any band are
+    candidates and are confirmed by their estimated Jaccard similarity.
+    The oldest signature is evicted once `capacity` are held.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.8, capacity: int = 100000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.capacity = capacity
+        self._signatures: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, doc_id: str, signature: np.ndarray):
+        if doc_id in self._signatures:
+            self.remove(doc_id)
+        while len(self._signatures) >= self.capacity:
+            self.remove(next(iter(self._signatures)))
+        self._signatures[doc_id] = signature
+        for band, key in self._band_keys(signature):
+            self._buckets[band].setdefault(key, set()).add(doc_id)
+
+    def remove(self, doc_id: str):
+        signature = self._signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for band, key in self._band_keys(signature):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[str, float]]:
+        """
+        Returns the most similar indexed document at or above the threshold
+        """
+        candidates: Set[str] = set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(key, ()))
+        best = None
+        for doc_id in candidates:
+            score = similarity(signature, self._signatures[doc_id])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (doc_id, score)
+        return best
+
+class Deduplicator:
+    """
+    Drops documents already in the index, or repeated within a batch, before
+    they are embedded and written.
+
+    Exact duplicates share a normalized URL or a content hash; they are found
+    in the batch and with one terms query against the index. Near duplicates
+    are found in a bounded in-memory MinHash/LSH index of recent documents.
+    """
+
+    def __init__(self, hasher: MinHasher, signatures: SignatureIndex, enabled: bool = True):
+        self.hasher = hasher
+        self.signatures = signatures
+        self.enabled = enabled
+        self.duplicates = 0
+        self.near_duplicates = 0
+
+    def _split(self, documents: List[dict], existing: Set[str]) -> Tuple[List[dict], List[dict]]:
+        unique, duplicates = [], []
+        seen = set(existing)
+        batch = SignatureIndex(
+            self.hasher.num_perm, self.signatures.bands, self.signatures.threshold, max(len(documents), 1)
+        )
+        for position, document in enumerate(documents):
+            keys = {document['url_key'], document['content_hash']} - {None}
+            if keys & seen:
+                duplicates.append(document)
+                self.duplicates += 1
+                continue
+
+            signature = self.hasher.signature(document_text(document))
+            if signature is not None:
+                match = self.signatures.query(signature) or batch.query(signature)
+                if match is not None:
+                    logging.info(f"Skipping near duplicate of {match[0]} ({match[1]:.2f}): {document.get('content', '')}")
+                    duplicates.append(document)
+                    self.near_duplicates += 1
+                    continue
+                batch.add(str(position), signature)
+            seen.update(keys)
+            unique.append(document)
+        return unique, duplicates
+
+    def filter(self, client: Elasticsearch, index_name: str, documents: List[dict]) -> Tuple[List[dict], List[dict]]:
+        """
+        Splits documents into new ones and duplicates.
+
+        Args:
+            client: Elasticsearch client
+            index_name: Index the documents are about to be written to
+            documents: Documents with title, abstract and content (link)
+
+        Returns:
+            Tuple[List[dict], List[dict]]: Documents to index (with url_key and
+            content_hash set) and the duplicates that were dropped
+        """
+        if not self.enabled or not documents:
+            return documents, []
+        for document in documents:
+            fingerprint_document(document)
+        try:
+            existing = existing_keys(client.search(**build_existing_query(index_name, documents)))
+        except Exception as e:
+            logging.error(f"Error looking up duplicates: {str(e)}")
+            existing = set()
+        return self._split(documents, existing)
+
+    async def async_filter(
+        self,
+        client: AsyncElasticsearch,
+        index_name: str,
+        documents: List[dict]
+    ) -> Tuple[List[dict], List[dict]]:
+        """
+        Async version of filter
+        """
+        if not self.enabled or not documents:
+            return documents, []
+        for document in documents:
+            fingerprint_document(document)
+        try:
+            existing = existing_keys(await client.search(**build_existing_query(index_name, documents)))
+        except Exception as e:
+            logging.error(f"Error looking up duplicates: {str(e)}")
+            existing = set()
+        return self._split(documents, existing)
+
+    def add(self, doc_id: str, document: dict):
+        """
+        Remembers the signature of an indexed document
+        """
+        signature = self.hasher.signature(document_text(document))
+        if signature is not None:
+            self.signatures.add(doc_id, signature)
+
+    def add_documents(self, doc_ids: List[str], documents: List[dict]):
+        for doc_id, document in zip(doc_ids, documents):
+            self.add(doc_id, document)
+
+    async def load(self, client: AsyncElasticsearch, index_name: str):
+        """
+        Fills the signature index from the indexed documents, up to its capacity
+        """
+        started = time.perf_counter()
+        try:
+            async for hit in async_scan(client, index=index_name, query={"_source": ["title", "abstract"]}):
+                self.add(hit["_id"], hit["_source"])
+                if len(self.signatures) >= self.signatures.capacity:
+                    break
+            logging.info(
+                f"Duplicate signatures loaded: {len(self.signatures)} in {time.perf_counter() - started:.2f}s"
+            )
+        except Exception as e:
+            logging.error(f"Error loading duplicate signatures: {str(e)}")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "signatures": len(self.signatures),
+            "capacity": self.signatures.capacity,
+            "threshold": self.signatures.threshold,
+            "duplicates": self.duplicates,
+            "near_duplicates": self.near_duplicates
+        }
+
+def build_existing_query(index_name: str, documents: List[dict]) -> Dict[str, Any]:
+    """
+    Builds a search whose terms aggregations return which url_key and
+    content_hash values of the batch are already indexed
+    """
+    clauses, aggs = [], {}
+    for field in ("url_key", "content_hash"):
+        values = sorted({d[field] for d in documents if d.get(field)})
+        if values:
+            clauses.append({"terms": {field: values}})
+            aggs[field] = {"terms": {"field": field, "include": values, "size": len(values)}}
+    return {
+        "index": index_name,
+        "query": {"bool": {"filter": [{"bool": {"should": clauses or [{"match_none": {}}]}}]}},
+        "aggs": aggs,
+        "size": 0
+    }
+
+def existing_keys(response: Dict[str, Any]) -> Set[str]:
+    return {
+        bucket["key"]
+        for aggregation in response.get("aggregations", {}).values()
+        for bucket in aggregation["buckets"]
+    }
+
+def create_deduplicator() -> Deduplicator:
+    """
+    Builds a Deduplicator configured from environment variables
+    """
+    num_perm = int(os.getenv("DEDUP_NUM_PERM", "64"))
+    return Deduplicator(
+        MinHasher(num_perm=num_perm, shingle_size=int(os.getenv("DEDUP_SHINGLE_SIZE", "3"))),
+        SignatureIndex(
+            num_perm=num_perm,
+            bands=int(os.getenv("DEDUP_BANDS", "16")),
+            threshold=float(os.getenv("DEDUP_THRESHOLD", "0.8")),
+            capacity=int(os.getenv("DEDUP_CAPACITY", "100000"))
+        ),
+        enabled=os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    )
+
+deduplicator = create_deduplicator()
+
+def ensure_dedup_mapping(client: Elasticsearch, index_name: str):
+    """
+    Adds the url_key and content_hash keyword fields to an index created before they existed
+    """
+    client.indices.put_mapping(
+        index=index_name,
+        properties={"url_key": {"type": "keyword"}, "content_hash": {"type": "keyword"}}
+    )
+
+# Signatures held at once by the one-off collapse; near duplicates further
+# apart in scan order than this are not compared
+DEDUP_COLLAPSE_CAPACITY = int(os.getenv("DEDUP_COLLAPSE_CAPACITY", "200000"))
+
+def survivor_rank(hit: Dict[str, Any]) -> Tuple:
+    # Keep the most searched copy, then the lowest id for determinism
+    return (-(hit["_source"].get("search_count") or 0), hit["_id"])
+
+def find_duplicate_groups(
+    client: Elasticsearch,
+    index_name: str,
+    hasher: Optional[MinHasher] = None,
+    signatures: Optional[SignatureIndex] = None,
+    max_signatures: int = DEDUP_COLLAPSE_CAPACITY
+) -> Tuple[List[List[Dict[str, Any]]], int]:
+    """
+    Scans the index and groups documents sharing a normalized URL, a content
+    hash or a near-duplicate MinHash signature. Only the last max_signatures
+    signatures are kept for the near-duplicate comparison, which bounds its
+    memory; URL and hash matches cover the whole index.
+
+    Returns:
+        Tuple[List[List[Dict]], int]: Groups of two or more hits (survivor
+        first) and the number of documents scanned
+    """
+    hasher = hasher or MinHasher()
+    signatures = signatures or SignatureIndex(hasher.num_perm, capacity=max_signatures)
+    hits: Dict[str, Dict[str, Any]] = {}
+    parent: Dict[str, str] = {}
+    owners: Dict[str, str] = {}
+
+    def find(doc_id: str) -> str:
+        while parent[doc_id] != doc_id:
+            parent[doc_id] = parent[parent[doc_id]]
+            doc_id = parent[doc_id]
+        return doc_id
+
+    def union(a: str, b: str):
+        parent[find(a)] = find(b)
+
+    for hit in scan(
+        client,
+        index=index_name,
+        query={"_source": ["title", "abstract", "content", "search_count", "url_key", "content_hash"]}
+    ):
+        doc_id = hit["_id"]
+        hits[doc_id] = hit
+        parent[doc_id] = doc_id
+        source = hit["_source"]
+        for key in (f"url:{normalize_url(source.get('content', ''))}", f"hash:{content_hash(source)}"):
+            if key.endswith((":", ":None")):
+                continue
+            if key in owners:
+                union(doc_id, owners[key])
+            else:
+                owners[key] = doc_id
+
+        signature = hasher.signature(document_text(source))
+        if signature is not None:
+            match = signatures.query(signature)
+            if match is not None:
+                union(doc_id, match[0])
+            signatures.add(doc_id, signature)
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for doc_id, hit in hits.items():
+        groups.setdefault(find(doc_id), []).append(hit)
+    duplicate_groups = [sorted(group, key=survivor_rank) for group in groups.values() if len(group) > 1]
+    return duplicate_groups, len(hits)
+
+def collapse_duplicates(
+    client: Elasticsearch,
+    index_name: str,
+    dry_run: bool = False,
+    max_signatures: int = DEDUP_COLLAPSE_CAPACITY
+) -> Dict[str, Any]:
+    """
+    Collapses duplicate documents in bulk, keeping one survivor per group
+    (highest search_count, summed over the group). Survivors and every
+    other document get url_key and content_hash so ingest-time lookups
+    match them.
+
+    Returns:
+        Dict: Documents scanned, duplicate groups, deleted ids and bulk errors
+    """
+    started = time.perf_counter()
+    if not dry_run:
+        ensure_dedup_mapping(client, index_name)
+    groups, scanned = find_duplicate_groups(client, index_name, max_signatures=max_signatures)
+    grouped = {hit["_id"] for group in groups for hit in group}
+    deleted = [hit["_id"] for group in groups for hit in group[1:]]
+    report = {"documents": scanned, "groups": len(groups), "deleted": deleted, "errors": 0}
+    if dry_run:
+        for group in groups:
+            logging.info(f"Keep {group[0]['_id']}, delete {[hit['_id'] for hit in group[1:]]}")
+        return report
+
+    def actions():
+        for group in groups:
+            survivor = group[0]
+            fields = fingerprint_document(dict(survivor["_source"]))
+            yield {
+                "_op_type": "update",
+                "_index": survivor["_index"],
+                "_id": survivor["_id"],
+                "doc": {
+                    "url_key": fields["url_key"],
+                    "content_hash": fields["content_hash"],
+                    "search_count": sum(hit["_source"].get("search_count") or 0 for hit in group)
+                }
+            }
+            for hit in group[1:]:
+                yield {"_op_type": "delete", "_index": hit["_index"], "_id": hit["_id"]}
+
+        # Backfill the lookup fields on documents indexed before they existed
+        for hit in scan(client, index=index_name, query={"_source": ["title", "abstract", "content", "url_key"]}):
+            if hit["_id"] in grouped or hit["_source"].get("url_key"):
+                continue
+            fields = fingerprint_document(dict(hit["_source"]))
+            yield {
+                "_op_type": "update",
+                "_index": hit["_index"],
+                "_id": hit["_id"],
+                "doc": {"url_key": fields["url_key"], "content_hash": fields["content_hash"]}
+            }
+
+    for ok, item in streaming_bulk(client, actions(), raise_on_error=False, raise_on_exception=False, refresh=True):
+        if not ok:
+            report["errors"] += 1
+            logging.error(f"Error collapsing duplicates: {item}")
+    report["seconds"] = time.perf_counter() - started
+    logging.info(
+        f"Collapsed {len(deleted)} duplicates in {len(groups)} groups out of {scanned} documents "
+        f"in {report['seconds']:.1f}s"
+    )
+    return report
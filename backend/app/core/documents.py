@@ -1,47 +1,233 @@
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from elasticsearch.helpers import streaming_bulk, async_streaming_bulk
+import asyncio
+import hashlib
 import logging
-from typing import List
-from .custom_search import fetch_custom_search_results, process_search_results
-from .utils import extract_keywords
+import os
+from typing import List, Optional, Tuple
+from .custom_search import embed_documents, search_result_document
+from .dedup import deduplicator
+from .google_search import google_search
+from .utils import extract_keywords_batch
+from .vector_index import local_vector_index
+from .result_cache import index_generation
+from .suggestion_index import suggestion_index
+from .metrics import record_error, stage
+from .singleflight import singleflight
 
-def index_document(client: Elasticsearch, index_name: str, document: dict) -> bool:
+def document_id(document: dict) -> str:
     """
-    Indexes a document with keyword processing
+    Builds a deterministic document id from the document link so that
+    repeated fetches of the same result overwrite instead of duplicating
     """
-    try:
-        # Extract keywords from title and content if not provided
-        if not document.get('keywords'):
-            text = f"{document.get('title', '')} {document.get('abstract', '')}"
-            document['keywords'] = extract_keywords(text)
-        
-        # Add completion suggestion field
+    source = document.get('content') or f"{document.get('title', '')} {document.get('abstract', '')}"
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+def prepare_documents(documents: List[dict]) -> List[dict]:
+    """
+    Adds the derived fields (keywords and completion input) to documents,
+    extracting the keywords of the whole batch in one pass
+    """
+    # Extract keywords from title and abstract if not provided
+    missing = [document for document in documents if not document.get('keywords')]
+    if missing:
+        texts = [f"{document.get('title', '')} {document.get('abstract', '')}" for document in missing]
+        for document, keywords in zip(missing, extract_keywords_batch(texts)):
+            document['keywords'] = keywords
+
+    # Add completion suggestion field
+    for document in documents:
         document['title_completion'] = {
             "input": [document['title']] + document['keywords'],
             "weight": 1
         }
-        
-        response = client.index(index=index_name, document=document)
+    return documents
+
+def prepare_document(document: dict) -> dict:
+    """
+    Adds the derived fields (keywords and completion input) to a document
+    """
+    return prepare_documents([document])[0]
+
+def index_document(client: Elasticsearch, index_name: str, document: dict) -> bool:
+    """
+    Indexes a document with keyword processing
+    """
+    try:
+        prepare_document(document)
+        response = client.index(index=index_name, id=document_id(document), document=document)
+        index_generation.bump()
         logging.info(f"Document indexed: {response['_id']}")
         return True
     except Exception as e:
         logging.error(f"Error indexing document: {str(e)}")
         return False
 
-async def fetch_and_index_new_documents(client: Elasticsearch, index_name: str, query: str) -> List[dict]:
+def build_bulk_actions(index_name: str, documents: List[dict]) -> List[dict]:
+    """
+    Builds the bulk index actions with deterministic ids
+    """
+    return [
+        {
+            "_op_type": "index",
+            "_index": index_name,
+            "_id": document_id(document),
+            "_source": document
+        }
+        for document in prepare_documents(documents)
+    ]
+
+def collect_bulk_result(
+    document: dict,
+    ok: bool,
+    item: dict,
+    indexed_documents: List[dict],
+    errors: List[dict]
+):
+    """
+    Records a single bulk item outcome
+    """
+    if ok:
+        indexed_documents.append(document)
+        return
+    error = item.get("index", item)
+    errors.append({
+        "id": error.get("_id"),
+        "title": document.get("title", ""),
+        "status": error.get("status"),
+        "error": error.get("error")
+    })
+    logging.error(f"Error indexing document '{document.get('title', '')}': {error.get('error')}")
+
+def index_documents(
+    client: Elasticsearch,
+    index_name: str,
+    documents: List[dict],
+    refresh: str = "wait_for"
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Indexes several documents in a single bulk request.
+
+    Args:
+        client: Elasticsearch client
+        index_name: Index name
+        documents: Documents to index
+        refresh: Refresh policy for the bulk request, so a follow-up search sees the documents
+
+    Returns:
+        Tuple[List[dict], List[dict]]: Indexed documents and per-item errors
+    """
+    indexed_documents = []
+    errors = []
+    results = streaming_bulk(
+        client,
+        build_bulk_actions(index_name, documents),
+        raise_on_error=False,
+        raise_on_exception=False,
+        refresh=refresh
+    )
+    for document, (ok, item) in zip(documents, results):
+        collect_bulk_result(document, ok, item, indexed_documents, errors)
+
+    if indexed_documents:
+        index_generation.bump()
+    logging.info(f"Bulk indexed {len(indexed_documents)} documents with {len(errors)} errors")
+    return indexed_documents, errors
+
+async def async_index_documents(
+    client: AsyncElasticsearch,
+    index_name: str,
+    documents: List[dict],
+    refresh: str = "wait_for"
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Async version of index_documents
+    """
+    indexed_documents = []
+    errors = []
+    results = async_streaming_bulk(
+        client,
+        build_bulk_actions(index_name, documents),
+        raise_on_error=False,
+        raise_on_exception=False,
+        refresh=refresh
+    )
+    position = 0
+    async for ok, item in results:
+        collect_bulk_result(documents[position], ok, item, indexed_documents, errors)
+        position += 1
+
+    if indexed_documents:
+        index_generation.bump()
+    logging.info(f"Bulk indexed {len(indexed_documents)} documents with {len(errors)} errors")
+    return indexed_documents, errors
+
+async def fetch_and_index_new_documents(
+    client: AsyncElasticsearch,
+    index_name: str,
+    query: str,
+    read_index: Optional[str] = None
+) -> List[dict]:
     """
     Fetches and indexes new documents when no results are found.
+    Drops results already in the index before embedding them, embeds the
+    rest in one model call and writes them in one bulk request. Concurrent
+    misses for the same query share one fetch.
+
+    Args:
+        client: Elasticsearch client
+        index_name: Index or write alias the new documents go to
+        query: Query to fetch results for
+        read_index: Index or read alias searched for existing copies; with
+            rollover the write alias only covers the newest generation.
+            Defaults to index_name
+
+    Returns:
+        List[dict]: The indexed documents followed by the dropped duplicates
     """
+    return await singleflight.do(
+        "miss-fill",
+        {"index": index_name, "query": query},
+        lambda: _fetch_and_index_new_documents(client, index_name, query, read_index or index_name)
+    )
+
+async def _fetch_and_index_new_documents(
+    client: AsyncElasticsearch,
+    index_name: str,
+    query: str,
+    read_index: str
+) -> List[dict]:
     try:
-        raw_results = fetch_custom_search_results(query, num_results=10)
-        documents = process_search_results(raw_results)
-        
-        indexed_documents = []
-        for doc in documents:
-            if index_document(client, index_name, doc):
-                indexed_documents.append(doc)
-                logging.info(f"Document '{doc['title']}' indexed successfully")
-        
-        return indexed_documents
+        with stage("google_fetch"):
+            raw_results = await google_search.fetch(query, num_results=int(os.getenv("GOOGLE_RESULTS", "10")))
+        if not raw_results:
+            return []
+
+        with stage("dedup"):
+            documents, duplicates = await deduplicator.async_filter(
+                client, read_index, [search_result_document(item) for item in raw_results]
+            )
+        if duplicates:
+            logging.info(f"Dropped {len(duplicates)} duplicate results for '{query}'")
+        if not documents:
+            return duplicates
+
+        # The model runs in a thread to keep the event loop free
+        with stage("embedding_documents"):
+            documents = await asyncio.to_thread(embed_documents, documents)
+        with stage("bulk_index"):
+            indexed_documents, _ = await async_index_documents(client, index_name, documents)
+
+        # Keep the local vector index in sync with what was written to ES
+        if local_vector_index is not None and indexed_documents:
+            local_vector_index.add(
+                [document_id(doc) for doc in indexed_documents],
+                [doc['vector'] for doc in indexed_documents]
+            )
+        suggestion_index.add_documents(indexed_documents)
+        deduplicator.add_documents([document_id(doc) for doc in indexed_documents], indexed_documents)
+        return indexed_documents + duplicates
     except Exception as e:
         logging.error(f"Error indexing new documents: {e}")
-        return []
\ No newline at end of file
+        record_error("miss_fill")
+        return []
@@ -0,0 +1,202 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+import logging
+import os
+import time
+
+import numpy as np
+
+from .embedding_ipc import EmbeddingClient
+from .model_loader import ModelLoader, model_loader
+
+class EmbeddingBackend(ABC):
+    """
+    Turns texts into fixed-size vectors.
+
+    Backends that return unit-length vectors (normalized = True) let the
+    index use dot_product similarity instead of cosine.
+    """
+
+    name: str = "base"
+    dims: int = 384
+    normalized: bool = False
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds a batch of texts.
+
+        Args:
+            texts: The texts to process.
+
+        Returns:
+            np.ndarray: One float32 embedding row per input text, in the same order.
+        """
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds a batch of search queries. Same as embed() unless the
+        backend treats queries differently (see RemoteEmbeddingBackend).
+        """
+        return self.embed(texts)
+
+    def is_ready(self) -> bool:
+        return True
+
+    def warm(self):
+        """
+        Starts loading whatever the backend needs, without blocking
+        """
+
+    def status(self) -> Dict[str, Any]:
+        return {"state": "ready" if self.is_ready() else "starting", "backend": self.name}
+
+class TransformerBackend(EmbeddingBackend):
+    """
+    Hugging Face encoder with mean or [CLS] pooling.
+
+    Mean pooling over the attention mask followed by L2 normalization is
+    how sentence-transformers models such as all-MiniLM-L6-v2 were trained;
+    [CLS] pooling is kept only to compare against older indexes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: ModelLoader,
+        pooling: str = "mean",
+        normalize: bool = True,
+        dims: int = 384,
+        max_length: int = 256
+    ):
+        if pooling not in ("mean", "cls"):
+            raise ValueError(f"Unknown pooling '{pooling}'")
+        self.name = name
+        self.loader = loader
+        self.pooling = pooling
+        self.normalized = normalize
+        self.dims = dims
+        self.max_length = max_length
+
+    def is_ready(self) -> bool:
+        return self.loader.is_ready
+
+    def warm(self):
+        self.loader.warm()
+
+    def status(self) -> Dict[str, Any]:
+        return {**self.loader.status(), "backend": self.name}
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dims), dtype=np.float32)
+
+        import torch
+
+        tokenizer, model = self.loader.get()
+        inputs = tokenizer(
+            texts, return_tensors="pt", padding=True, truncation=True, max_length=self.max_length
+        )
+
+        with torch.no_grad():
+            outputs = model(**inputs)
+        hidden = outputs.last_hidden_state
+
+        if self.pooling == "mean":
+            # Average the token vectors, ignoring padding
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        else:
+            pooled = hidden[:, 0, :]
+
+        if self.normalized:
+            pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+        return pooled.numpy().astype(np.float32, copy=False)
+
+class RemoteEmbeddingBackend(EmbeddingBackend):
+    """
+    Embeds through the embedding server (core/embedding_server.py) over a
+    Unix socket, so API worker processes never load the model themselves.
+
+    Name, dimensions and normalization are those of the backend the server
+    runs, which both sides build from the same EMBEDDING_BACKEND.
+    """
+
+    def __init__(self, backend: EmbeddingBackend, client: EmbeddingClient, status_ttl: float = 1.0):
+        self.name = backend.name
+        self.dims = backend.dims
+        self.normalized = backend.normalized
+        self.client = client
+        self.status_ttl = status_ttl
+        self._status: Dict[str, Any] = {"state": "starting"}
+        self._status_checked = 0.0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.client.embed(texts, kind="document")
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        return self.client.embed(texts, kind="query")
+
+    def status(self) -> Dict[str, Any]:
+        # /health is polled; ask the server at most once per status_ttl
+        now = time.monotonic()
+        if now - self._status_checked >= self.status_ttl:
+            self._status_checked = now
+            try:
+                self._status = {**self.client.status()["model"], "server": self.client.socket_path}
+            except Exception as e:
+                logging.error(f"Error reaching embedding server at '{self.client.socket_path}': {str(e)}")
+                self._status = {"state": "unreachable", "server": self.client.socket_path, "error": str(e)}
+        return self._status
+
+    def is_ready(self) -> bool:
+        return self.status().get("state") == "ready"
+
+def create_embedding_backend(name: str, loader: Optional[ModelLoader] = None) -> EmbeddingBackend:
+    """
+    Builds a backend by name.
+
+    "minilm" is the mean-pooled, normalized default. "minilm-cls" reproduces
+    the previous [CLS] embeddings. Any backend uses the model configured for
+    its loader, so a smaller or quantized model is swapped in through
+    EMBEDDING_MODEL_PATH / EMBEDDING_MODEL_FORMAT / EMBEDDING_MODEL_QUANTIZE.
+    """
+    loader = loader or model_loader
+    if name == "minilm":
+        return TransformerBackend(name, loader, pooling="mean", normalize=True)
+    if name == "minilm-cls":
+        return TransformerBackend(name, loader, pooling="cls", normalize=False)
+    raise ValueError(f"Unknown embedding backend '{name}', expected one of {list(BACKENDS)}")
+
+BACKENDS: Dict[str, str] = {
+    "minilm": "mean pooling, L2-normalized (dot_product similarity)",
+    "minilm-cls": "[CLS] token, unnormalized (cosine similarity)"
+}
+
+def create_configured_backend() -> EmbeddingBackend:
+    """
+    Builds the EMBEDDING_BACKEND backend, or a client of the embedding
+    server listening on EMBEDDING_SERVER_SOCKET when that is set
+    """
+    backend = create_embedding_backend(os.getenv("EMBEDDING_BACKEND", "minilm"))
+    socket_path = os.getenv("EMBEDDING_SERVER_SOCKET")
+    if not socket_path:
+        return backend
+    client = EmbeddingClient(socket_path, timeout=float(os.getenv("EMBEDDING_SERVER_TIMEOUT", "30")))
+    return RemoteEmbeddingBackend(backend, client)
+
+embedding_backend = create_configured_backend()
+
+def embed_queries(texts: List[str]) -> np.ndarray:
+    """
+    Embeds search queries with the configured backend. Locally the same as
+    embedding documents; an embedding server batches and caches queries
+    from every worker together.
+
+    Args:
+        texts: The queries to process.
+
+    Returns:
+        np.ndarray: One float32 embedding row per query, in the same order.
+    """
+    return embedding_backend.embed_queries(texts)
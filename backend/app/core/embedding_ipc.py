@@ -0,0 +1,139 @@
+from typing import Any, Dict, List, Tuple
+import asyncio
+import json
+import socket
+import struct
+import threading
+
+import numpy as np
+
+# Wire format, both directions: a frame is a 4-byte big-endian length
+# followed by the payload. A payload is a 4-byte big-endian header length,
+# a JSON header and an optional binary body.
+#
+#   request  {"op": "embed", "kind": "query" | "document", "texts": [...]}
+#            {"op": "status"}
+#   response {"ok": true, "count": n, "dims": d} + n*d little-endian float32
+#            {"ok": true, "status": {...}}
+#            {"ok": false, "error": "..."}
+
+LENGTH = struct.Struct(">I")
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+
+def encode_frame(header: Dict[str, Any], body: bytes = b"") -> bytes:
+    encoded = json.dumps(header).encode("utf-8")
+    return LENGTH.pack(LENGTH.size + len(encoded) + len(body)) + LENGTH.pack(len(encoded)) + encoded + body
+
+def decode_payload(payload: bytes) -> Tuple[Dict[str, Any], bytes]:
+    (header_length,) = LENGTH.unpack_from(payload)
+    header = json.loads(payload[LENGTH.size:LENGTH.size + header_length])
+    return header, payload[LENGTH.size + header_length:]
+
+def encode_vectors(vectors: np.ndarray) -> Tuple[Dict[str, Any], bytes]:
+    array = np.asarray(vectors, dtype="<f4")
+    count, dims = array.shape if array.ndim == 2 else (0, 0)
+    return {"ok": True, "count": count, "dims": dims}, array.tobytes()
+
+def decode_vectors(header: Dict[str, Any], body: bytes) -> np.ndarray:
+    # A read-only view of the received bytes, no per-float conversion
+    return np.frombuffer(body, dtype="<f4").reshape(header["count"], header["dims"])
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[Dict[str, Any], bytes]:
+    (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    return decode_payload(await reader.readexactly(length))
+
+class EmbeddingServerError(RuntimeError):
+    """
+    The embedding server answered with an error
+    """
+
+class EmbeddingClient:
+    """
+    Blocking client for the embedding server's Unix socket.
+
+    Called from the embedding service's worker threads, so each thread
+    keeps its own connection. A broken connection is reopened once before
+    the error is raised.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = self._local.sock = self._connect()
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    @staticmethod
+    def _receive(sock: socket.socket, size: int) -> bytes:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = sock.recv_into(view[received:])
+            if count == 0:
+                raise ConnectionError("Embedding server closed the connection")
+            received += count
+        return bytes(buffer)
+
+    def _call(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        frame = encode_frame(header)
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(frame)
+                (length,) = LENGTH.unpack(self._receive(sock, LENGTH.size))
+                response, body = decode_payload(self._receive(sock, length))
+                break
+            except OSError:
+                self._drop_connection()
+                if attempt:
+                    raise
+        if not response.get("ok"):
+            raise EmbeddingServerError(response.get("error", "unknown error"))
+        return response, body
+
+    def embed(self, texts: List[str], kind: str = "document") -> np.ndarray:
+        """
+        Embeds texts on the server.
+
+        Args:
+            texts: The texts to embed
+            kind: "query" texts share the server's micro-batches and cache;
+                "document" texts are embedded as one uncached batch
+
+        Returns:
+            np.ndarray: One float32 embedding row per input text, in the same order.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        response, body = self._call({"op": "embed", "kind": kind, "texts": texts})
+        return decode_vectors(response, body)
+
+    def status(self) -> Dict[str, Any]:
+        response, _ = self._call({"op": "status"})
+        return response["status"]
+
+    def close(self):
+        self._drop_connection()
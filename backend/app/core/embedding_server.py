@@ -0,0 +1,143 @@
+"""
+Embedding server: one process holds the model and answers every API
+worker on the host over a Unix socket (wire format in embedding_ipc.py).
+
+Query texts from all connections go through one EmbeddingService, so
+concurrent searches on different workers share model batches and the
+LRU cache; document batches are embedded as they come.
+
+Usually started by scripts/serve.py; on its own (from the app directory):
+
+    python -m core.embedding_server --socket /tmp/indexify-embeddings.sock
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Set
+import argparse
+import asyncio
+import logging
+import os
+import signal
+
+from .embedding_backends import EmbeddingBackend, create_embedding_backend
+from .embedding_ipc import encode_frame, encode_vectors, read_frame
+from .embeddings import EmbeddingService, create_embedding_service
+from .metrics import record_embedding_batch, stage
+
+class EmbeddingServer:
+    def __init__(self, backend: EmbeddingBackend, service: EmbeddingService, socket_path: str):
+        self.backend = backend
+        self.service = service
+        self.socket_path = socket_path
+        self.connections = 0
+        self.requests = 0
+        self._documents = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-documents")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._handlers: Set[asyncio.Task] = set()
+
+    async def _embed(self, kind: str, texts: list) -> list:
+        if kind == "query":
+            return await self.service.embed_many(texts)
+        if kind == "document":
+            record_embedding_batch("document", len(texts))
+            with stage("embedding_documents"):
+                return await asyncio.get_running_loop().run_in_executor(self._documents, self.backend.embed, texts)
+        raise ValueError(f"Unknown embedding kind '{kind}'")
+
+    async def _answer(self, request: Dict[str, Any]) -> bytes:
+        self.requests += 1
+        op = request.get("op")
+        try:
+            if op == "embed":
+                header, body = encode_vectors(await self._embed(request.get("kind", "document"), request["texts"]))
+                return encode_frame(header, body)
+            if op == "status":
+                return encode_frame({"ok": True, "status": self.status()})
+            raise ValueError(f"Unknown operation '{op}'")
+        except Exception as e:
+            logging.error(f"Error answering embedding request: {str(e)}")
+            return encode_frame({"ok": False, "error": str(e)})
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._clients.add(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    request, _ = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                writer.write(await self._answer(request))
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            logging.warning(f"Dropping embedding client connection: {str(e)}")
+        finally:
+            self.connections -= 1
+            self._clients.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.backend.warm()
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        logging.info(f"Embedding server ({self.backend.name}) listening on {self.socket_path}")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # Closing the connections ends their handlers at the next read
+            for writer in list(self._clients):
+                writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        await self.service.close()
+        self._documents.shutdown(wait=False)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "model": self.backend.status(),
+            "connections": self.connections,
+            "requests": self.requests,
+            "embeddings": self.service.status()
+        }
+
+async def serve(socket_path: str, backend: EmbeddingBackend):
+    """
+    Runs an embedding server until SIGINT or SIGTERM
+
+    Args:
+        socket_path: Unix socket to listen on
+        backend: Local backend holding the model
+    """
+    # API workers keep the shared-memory cache; the server only keeps its LRU
+    service = create_embedding_service(embed_batch=backend.embed, shared_cache=False)
+    # Workers already batch their own queries; the server only waits briefly
+    # to merge batches arriving from different workers
+    service.max_wait = float(os.getenv("EMBEDDING_SERVER_MAX_WAIT_MS", "1")) / 1000
+    server = EmbeddingServer(backend, service, socket_path)
+    await server.start()
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+    try:
+        await stopped.wait()
+    finally:
+        await server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SERVER_SOCKET", "/tmp/indexify-embeddings.sock"))
+    parser.add_argument("--backend", default=os.getenv("EMBEDDING_BACKEND", "minilm"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(args.socket, create_embedding_backend(args.backend)))
+
+if __name__ == "__main__":
+    main()
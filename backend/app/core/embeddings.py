@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Any
+
+import numpy as np
+
+from .embedding_backends import embed_queries, embedding_backend
+from .metrics import record_cache, record_embedding_batch, stage
+from .shared_embedding_cache import SharedEmbeddingCache, create_shared_embedding_cache
+
+def normalize_query(text: str) -> str:
+    """
+    Normalizes a query so equivalent spellings share a cache entry.
+    """
+    return " ".join(text.lower().split())
+
+@dataclass
+class EmbeddingStats:
+    cache_hits: int = 0
+    shared_cache_hits: int = 0
+    cache_misses: int = 0
+    batches: int = 0
+    batched_texts: int = 0
+    max_batch_size: int = 0
+    queue_latency_total: float = 0.0
+    queue_latency_max: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.shared_cache_hits + self.cache_misses
+        return {
+            "cache_hits": self.cache_hits,
+            "shared_cache_hits": self.shared_cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": (self.cache_hits + self.shared_cache_hits) / lookups if lookups else 0.0,
+            "batches": self.batches,
+            "avg_batch_size": self.batched_texts / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_queue_latency_ms": (
+                self.queue_latency_total / self.batched_texts * 1000 if self.batched_texts else 0.0
+            ),
+            "max_queue_latency_ms": self.queue_latency_max * 1000
+        }
+
+@dataclass
+class _PendingEmbedding:
+    text: str
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+class EmbeddingService:
+    """
+    Gathers concurrent embedding requests into micro-batches and runs the
+    model in a worker pool so inference never blocks the event loop.
+    Results are kept in an LRU cache keyed by the normalized query text,
+    backed by an optional shared-memory cache that every worker process on
+    the host reads and fills.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        cache_size: int = 10000,
+        workers: int = 1,
+        shared_cache: Optional[SharedEmbeddingCache] = None
+    ):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self.shared_cache = shared_cache
+        self.stats = EmbeddingStats()
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embedding")
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    def _cache_get(self, key: str) -> Optional[np.ndarray]:
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+        return vector
+
+    def _cache_put(self, key: str, vector: np.ndarray):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _ensure_batcher(self):
+        if self._batcher is None or self._batcher.done():
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.get_running_loop().create_task(self._run_batcher())
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Returns the embedding for a single text, batching it with any
+        other requests that arrive within the wait window.
+
+        Args:
+            text: The text to embed.
+
+        Returns:
+            np.ndarray: Text embedding as a read-only float32 vector,
+            shared with the cache and other callers of the same text.
+        """
+        key = normalize_query(text)
+        vector = self._cache_get(key)
+        if vector is not None:
+            self.stats.cache_hits += 1
+            record_cache("embedding", "hit")
+            return vector
+
+        if self.shared_cache is not None:
+            vector = self.shared_cache.get(key)
+            if vector is not None:
+                vector.flags.writeable = False
+                self.stats.shared_cache_hits += 1
+                record_cache("embedding", "shared_hit")
+                self._cache_put(key, vector)
+                return vector
+
+        self.stats.cache_misses += 1
+        record_cache("embedding", "miss")
+        self._ensure_batcher()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingEmbedding(text=key, future=future))
+        return await future
+
+    async def embed_many(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Embeds several texts, sharing cache and batches with concurrent callers.
+        """
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
+    async def _collect_batch(self) -> List[_PendingEmbedding]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_batcher(self):
+        # One batch per worker runs at a time; requests arriving meanwhile
+        # queue up and form the next batch once a worker frees up
+        slots = asyncio.Semaphore(self.workers)
+        loop = asyncio.get_running_loop()
+        while True:
+            await slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                slots.release()
+                raise
+            task = loop.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _run_batch(self, batch: List[_PendingEmbedding]):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        # Identical texts inside one batch only reach the model once
+        waiters: "OrderedDict[str, List[_PendingEmbedding]]" = OrderedDict()
+        for pending in batch:
+            waiters.setdefault(pending.text, []).append(pending)
+            latency = started - pending.enqueued_at
+            self.stats.queue_latency_total += latency
+            self.stats.queue_latency_max = max(self.stats.queue_latency_max, latency)
+
+        texts = list(waiters.keys())
+        self.stats.batches += 1
+        self.stats.batched_texts += len(batch)
+        self.stats.max_batch_size = max(self.stats.max_batch_size, len(texts))
+        record_embedding_batch("query", len(texts))
+
+        try:
+            with stage("embedding_model"):
+                vectors = await loop.run_in_executor(self._executor, self.embed_batch, texts)
+        except Exception as e:
+            logging.error(f"Error generating embeddings: {str(e)}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        for text, row in zip(texts, vectors):
+            # Own copy, so a cached vector does not keep the whole batch alive
+            vector = np.array(row, dtype=np.float32)
+            vector.flags.writeable = False
+            self._cache_put(text, vector)
+            if self.shared_cache is not None:
+                self.shared_cache.put(text, vector)
+            for pending in waiters[text]:
+                if not pending.future.done():
+                    pending.future.set_result(vector)
+
+    async def close(self):
+        """
+        Stops the batcher task and the worker pool.
+        """
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+        for task in list(self._batches):
+            task.cancel()
+        self._executor.shutdown(wait=False)
+        if self.shared_cache is not None:
+            self.shared_cache.close()
+            self.shared_cache = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            **self.stats.to_dict(),
+            "shared_cache": self.shared_cache.status() if self.shared_cache is not None else None
+        }
+
+def create_embedding_service(
+    embed_batch: Callable[[List[str]], np.ndarray] = embed_queries,
+    shared_cache: bool = True
+) -> EmbeddingService:
+    """
+    Builds an EmbeddingService configured from environment variables.
+    """
+    return EmbeddingService(
+        embed_batch=embed_batch,
+        max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+        max_wait_ms=float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5")),
+        cache_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+        workers=int(os.getenv("EMBEDDING_WORKERS", "1")),
+        shared_cache=create_shared_embedding_cache(embedding_backend.dims) if shared_cache else None
+    )
+
+embedding_service = create_embedding_service()
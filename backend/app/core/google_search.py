@@ -0,0 +1,227 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import time
+
+import httpx
+
+from .metrics import record_cache
+
+GOOGLE_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+# The Custom Search JSON API returns at most 10 items per call and 100 per query
+PAGE_SIZE = 10
+MAX_RESULTS = 100
+
+class TokenBucket:
+    """
+    Async token bucket: allows `rate` calls per second with bursts of `capacity`
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of search results keyed by query, so a miss
+    that was already fetched never spends API quota again
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, items TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT items, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, items: List[dict]):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, items, fetched_at) VALUES (?, ?, ?)",
+                (key, json.dumps(items), time.time())
+            )
+
+@dataclass
+class FetchStats:
+    requests: int = 0
+    retries: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses
+        }
+
+class GoogleSearchClient:
+    """
+    Async Custom Search JSON API client.
+
+    Uses one pooled httpx.AsyncClient, a token bucket for the API quota,
+    retries with exponential backoff on 429/5xx, concurrent pagination
+    beyond 10 results and an optional persistent response cache.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        search_engine_id: Optional[str],
+        url: str = GOOGLE_SEARCH_URL,
+        timeout: float = 5.0,
+        max_connections: int = 10,
+        rate: float = 10.0,
+        burst: int = 10,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+        cache: Optional[ResponseCache] = None
+    ):
+        self.api_key = api_key
+        self.search_engine_id = search_engine_id
+        self.url = url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache
+        self.rate_limiter = TokenBucket(rate, burst)
+        self.stats = FetchStats()
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections)
+            )
+        return self._http
+
+    async def _fetch_page(self, query: str, start: int, num: int) -> List[dict]:
+        params = {
+            "q": query,
+            "key": self.api_key,
+            "cx": self.search_engine_id,
+            "num": num,
+            "start": start
+        }
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            self.stats.requests += 1
+            try:
+                response = await self.http.get(self.url, params=params)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {str(e)}"
+            else:
+                if response.status_code == 200:
+                    return response.json().get("items", [])
+                error = f"{response.status_code}, {response.text}"
+                if response.status_code != 429 and response.status_code < 500:
+                    break
+
+            if attempt < self.max_retries:
+                self.stats.retries += 1
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+        raise Exception(f"Error querying the API: {error}")
+
+    async def fetch(self, query: str, num_results: int = 10) -> List[dict]:
+        """
+        Query the Google API Custom Search JSON and get the results.
+
+        Args:
+            query: Search query
+            num_results: Number of results to return (up to 100, fetched 10 per page concurrently)
+
+        Returns:
+            list[dict]: List of results with relevant information
+        """
+        num_results = max(1, min(num_results, MAX_RESULTS))
+        key = f"{' '.join(query.lower().split())}:{num_results}"
+
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                self.stats.cache_hits += 1
+                record_cache("google", "hit")
+                return cached
+            self.stats.cache_misses += 1
+            record_cache("google", "miss")
+
+        pages = []
+        for page in range(math.ceil(num_results / PAGE_SIZE)):
+            start = page * PAGE_SIZE + 1
+            pages.append(self._fetch_page(query, start, min(PAGE_SIZE, num_results - page * PAGE_SIZE)))
+        results = await asyncio.gather(*pages)
+
+        items = [item for page_items in results for item in page_items][:num_results]
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, key, items)
+        return items
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+def create_google_search_client() -> GoogleSearchClient:
+    """
+    Builds a GoogleSearchClient configured from environment variables
+    """
+    cache_path = os.getenv("GOOGLE_CACHE_PATH")
+    cache = None
+    if cache_path:
+        try:
+            cache = ResponseCache(cache_path, ttl=float(os.getenv("GOOGLE_CACHE_TTL", "604800")))
+        except sqlite3.Error as e:
+            logging.error(f"Error opening Google response cache: {str(e)}")
+
+    return GoogleSearchClient(
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        search_engine_id=os.getenv("SEARCH_ENGINE_ID"),
+        url=os.getenv("GOOGLE_SEARCH_URL", GOOGLE_SEARCH_URL),
+        timeout=float(os.getenv("GOOGLE_TIMEOUT", "5")),
+        max_connections=int(os.getenv("GOOGLE_MAX_CONNECTIONS", "10")),
+        rate=float(os.getenv("GOOGLE_RATE_LIMIT", "10")),
+        burst=int(os.getenv("GOOGLE_RATE_BURST", "10")),
+        max_retries=int(os.getenv("GOOGLE_MAX_RETRIES", "2")),
+        cache=cache
+    )
+
+google_search = create_google_search_client()
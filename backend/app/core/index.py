@@ -1,74 +1,274 @@
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from elasticsearch.helpers import scan, streaming_bulk
+from typing import Any, Dict, Iterator, List, Optional
 import logging
+import os
+import time
+from .embedding_backends import EmbeddingBackend
+from .quantization import VectorQuantization, vector_quantization
 
-def create_elasticsearch_index(client: Elasticsearch, index_name: str, vector_dims: int = 384) -> bool:
+# Similarity of new vector fields. dot_product requires unit-length vectors, so it
+# is only safe once every indexed vector comes from a normalized backend; searches
+# take the similarity of the existing index instead (async_vector_similarity)
+VECTOR_SIMILARITY = os.getenv("VECTOR_SIMILARITY", "cosine")
+
+def build_index_mapping(
+    vector_dims: int = 384,
+    similarity: str = VECTOR_SIMILARITY,
+    quantization: Optional[VectorQuantization] = None
+) -> dict:
     """
-    Create an index in Elasticsearch with support for suggestions and search counting
+    Builds the settings and mappings of the documents index.
+    The vector field is indexed (HNSW) so it can serve native kNN queries,
+    quantized as configured by VECTOR_QUANTIZATION unless `quantization` is given.
     """
-    try:
-        index_mapping = {
-            "settings": {
-                "analysis": {
-                    "analyzer": {
-                        "custom_text_analyzer": {
-                            "type": "custom",
-                            "tokenizer": "standard",
-                            "filter": ["lowercase", "stop", "snowball"]
-                        }
+    return {
+        "settings": {
+            "analysis": {
+                "analyzer": {
+                    "custom_text_analyzer": {
+                        "type": "custom",
+                        "tokenizer": "standard",
+                        "filter": ["lowercase", "stop", "snowball"]
                     }
                 }
-            },
-            "mappings": {
-                "properties": {
-                    "title": {
-                        "type": "text",
-                        "analyzer": "custom_text_analyzer",
-                        "fields": {
-                            "keyword": {"type": "keyword"},
-                            "completion": {
-                                "type": "completion",
-                                "analyzer": "custom_text_analyzer"
-                            }
+            }
+        },
+        "mappings": {
+            "properties": {
+                "title": {
+                    "type": "text",
+                    "analyzer": "custom_text_analyzer",
+                    "fields": {
+                        "keyword": {"type": "keyword"},
+                        "completion": {
+                            "type": "completion",
+                            "analyzer": "custom_text_analyzer"
                         }
-                    },
-                    "author": {"type": "keyword"},
-                    "publication_date": {"type": "date"},
-                    "abstract": {"type": "text", "analyzer": "custom_text_analyzer"},
-                    "keywords": {
-                        "type": "keyword",
-                        "fields": {
-                            "text": {
-                                "type": "text",
-                                "analyzer": "custom_text_analyzer"
-                            }
+                    }
+                },
+                "author": {"type": "keyword"},
+                "publication_date": {"type": "date"},
+                "abstract": {"type": "text", "analyzer": "custom_text_analyzer"},
+                "keywords": {
+                    "type": "keyword",
+                    "fields": {
+                        "text": {
+                            "type": "text",
+                            "analyzer": "custom_text_analyzer"
                         }
-                    },
-                    "content": {"type": "text", "analyzer": "custom_text_analyzer"},
-                    "vector": {"type": "dense_vector", "dims": vector_dims},
-                    "search_count": {"type": "long"}
-                }
+                    }
+                },
+                "content": {"type": "text", "analyzer": "custom_text_analyzer"},
+                "url_key": {"type": "keyword"},
+                "content_hash": {"type": "keyword"},
+                "vector": (quantization or vector_quantization).vector_mapping(vector_dims, similarity),
+                "search_count": {"type": "long"}
+            }
+        }
+    }
+
+# Written by the trending tracker's snapshots; added to existing stats indices at startup
+TRENDING_STATS_PROPERTIES = {
+    "trending_score": {"type": "double"},
+    "trending_rank": {"type": "double"},
+    "trending_updated": {"type": "date"}
+}
+
+def build_stats_mapping() -> dict:
+    """
+    Builds the mappings of the search statistics index
+    """
+    return {
+        "mappings": {
+            "properties": {
+                "query": {"type": "keyword"},
+                "count": {"type": "long"},
+                "last_searched": {"type": "date"},
+                "is_trending": {"type": "boolean"},
+                **TRENDING_STATS_PROPERTIES
             }
         }
+    }
+
+def create_elasticsearch_index(client: Elasticsearch, index_name: str, vector_dims: int = 384) -> bool:
+    """
+    Create an index in Elasticsearch with support for suggestions and search counting
+    """
+    try:
+        index_mapping = build_index_mapping(vector_dims)
 
         if not client.indices.exists(index=index_name):
             client.indices.create(index=index_name, body=index_mapping)
             logging.info(f"Índice '{index_name}' successfully created")
             
             # Create index for statistics
-            search_stats_mapping = {
-                "mappings": {
-                    "properties": {
-                        "query": {"type": "keyword"},
-                        "count": {"type": "long"},
-                        "last_searched": {"type": "date"},
-                        "is_trending": {"type": "boolean"}
-                    }
-                }
-            }
-            client.indices.create(index=f"{index_name}_stats", body=search_stats_mapping)
+            client.indices.create(index=f"{index_name}_stats", body=build_stats_mapping())
             return True
         return False
 
     except Exception as e:
         logging.error(f"Error creating index: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+def is_vector_indexed(client: Elasticsearch, index_name: str) -> bool:
+    """
+    Checks whether the vector field of an existing index supports kNN queries
+    """
+    mapping = client.indices.get_mapping(index=index_name)
+    for index_mapping in mapping.values():
+        vector = index_mapping["mappings"].get("properties", {}).get("vector", {})
+        if not vector.get("index", False):
+            return False
+    return True
+
+async def async_vector_similarity(client: AsyncElasticsearch, index_name: str) -> str:
+    """
+    Returns the similarity the vectors of an existing index were stored for:
+    dot_product only when every backing index maps the vector field with it
+    (Elasticsearch then guarantees unit-length vectors), cosine otherwise.
+    """
+    try:
+        mapping = await client.indices.get_mapping(index=index_name)
+        similarities = {
+            index_mapping["mappings"].get("properties", {}).get("vector", {}).get("similarity")
+            for index_mapping in mapping.values()
+        }
+        if similarities == {"dot_product"}:
+            return "dot_product"
+    except Exception as e:
+        logging.error(f"Error reading vector similarity: {str(e)}")
+    return "cosine"
+
+def upgrade_vector_mapping(
+    client: Elasticsearch,
+    source_index: str,
+    dest_index: str,
+    vector_dims: int = 384
+) -> bool:
+    """
+    Copies an index created with a non-indexed vector field into a new index
+    with the kNN-ready mapping. dense_vector indexing cannot be enabled in
+    place, so existing data has to be reindexed.
+
+    Args:
+        client: Elasticsearch client
+        source_index: Existing index name
+        dest_index: New index name
+        vector_dims: Vector dimensions
+
+    Returns:
+        bool: True if the reindex completed without failures
+    """
+    try:
+        if is_vector_indexed(client, source_index):
+            logging.info(f"Index '{source_index}' already supports kNN")
+            return False
+
+        if not client.indices.exists(index=dest_index):
+            client.indices.create(index=dest_index, body=build_index_mapping(vector_dims))
+
+        response = client.reindex(
+            source={"index": source_index},
+            dest={"index": dest_index},
+            wait_for_completion=True,
+            refresh=True
+        )
+        failures = response.get("failures", [])
+        logging.info(
+            f"Reindexed {response.get('created', 0)} documents from '{source_index}' "
+            f"to '{dest_index}' with {len(failures)} failures"
+        )
+        return not failures
+
+    except Exception as e:
+        logging.error(f"Error upgrading vector mapping: {str(e)}")
+        return False
+
+def _reembed_actions(
+    client: Elasticsearch,
+    source_index: str,
+    dest_index: str,
+    backend: EmbeddingBackend,
+    batch_size: int
+) -> Iterator[Dict[str, Any]]:
+    in_place = source_index == dest_index
+    batch: List[Dict[str, Any]] = []
+
+    def flush(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Same text the ingest path embeds: title and abstract
+        texts = [
+            f"{hit['_source'].get('title', '')} {hit['_source'].get('abstract', '')}".strip()
+            for hit in hits
+        ]
+        vectors = vector_quantization.encode(backend.embed(texts))
+        actions = []
+        for hit, vector in zip(hits, vectors):
+            if in_place:
+                actions.append({"_op_type": "update", "_index": dest_index, "_id": hit['_id'], "doc": {"vector": vector}})
+            else:
+                actions.append({"_index": dest_index, "_id": hit['_id'], "_source": {**hit['_source'], "vector": vector}})
+        return actions
+
+    for hit in scan(client, index=source_index, query={"query": {"match_all": {}}}, size=batch_size):
+        batch.append(hit)
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+
+def reembed_index(
+    client: Elasticsearch,
+    source_index: str,
+    dest_index: str,
+    backend: EmbeddingBackend,
+    batch_size: int = 256
+) -> Dict[str, Any]:
+    """
+    Rewrites the vector of every document with the given embedding backend.
+
+    With dest_index == source_index the vectors are updated in place, which
+    only works while the mapping similarity stays the same. Otherwise the
+    documents are copied into dest_index, created with the similarity the
+    backend needs (dot_product for normalized vectors).
+
+    Args:
+        client: Elasticsearch client
+        source_index: Index to read documents from
+        dest_index: Index to write re-embedded documents to
+        backend: Embedding backend
+        batch_size: Documents per model call and scroll page
+
+    Returns:
+        Dict: Documents written, errors, elapsed seconds and throughput
+    """
+    if source_index != dest_index and not client.indices.exists(index=dest_index):
+        similarity = "dot_product" if backend.normalized else "cosine"
+        client.indices.create(index=dest_index, body=build_index_mapping(backend.dims, similarity))
+
+    started = time.perf_counter()
+    written = 0
+    errors = 0
+    for ok, item in streaming_bulk(
+        client,
+        _reembed_actions(client, source_index, dest_index, backend, batch_size),
+        chunk_size=batch_size,
+        raise_on_error=False
+    ):
+        if ok:
+            written += 1
+        else:
+            errors += 1
+            logging.error(f"Error re-embedding document: {item}")
+        if (written + errors) % 10000 == 0:
+            logging.info(f"Re-embedded {written} documents")
+
+    elapsed = time.perf_counter() - started
+    logging.info(f"Re-embedded {written} documents into '{dest_index}' in {elapsed:.1f}s with {errors} errors")
+    return {
+        "documents": written,
+        "errors": errors,
+        "seconds": elapsed,
+        "docs_per_second": written / elapsed if elapsed else 0.0
+    }
@@ -0,0 +1,342 @@
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from contextlib import contextmanager
+from dataclasses import dataclass
+from fastapi import Request
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+import os
+import time
+
+from .embedding_backends import EmbeddingBackend
+from .index import VECTOR_SIMILARITY, build_index_mapping, build_stats_mapping, reembed_index
+
+# Bump when build_index_mapping changes in a way that needs a reindex
+MAPPING_VERSION = int(os.getenv("INDEX_MAPPING_VERSION", "1"))
+
+@dataclass
+class IndexAliases:
+    """
+    Names the application reads from and writes to.
+
+    The read alias carries the public INDEX_NAME and spans every generation
+    of the current mapping version; the write alias points at the newest
+    generation only. Both resolve to INDEX_NAME for an index created before
+    aliases were introduced.
+    """
+    read: str
+    write: str
+
+def write_alias(name: str) -> str:
+    return f"{name}-write"
+
+def template_name(name: str) -> str:
+    return f"{name}-template"
+
+def versioned_index_name(name: str, version: int, generation: int = 1) -> str:
+    """
+    Concrete index name; the numeric suffix lets rollover derive the next generation
+    """
+    return f"{name}-v{version}-{generation:06d}"
+
+def build_index_template(
+    name: str,
+    version: int = MAPPING_VERSION,
+    vector_dims: int = 384,
+    similarity: str = VECTOR_SIMILARITY,
+    shards: int = 1,
+    replicas: int = 1
+) -> Dict[str, Any]:
+    """
+    Builds the composable index template applied to every generation of a mapping version
+    """
+    mapping = build_index_mapping(vector_dims, similarity)
+    settings = {**mapping["settings"], "number_of_shards": shards, "number_of_replicas": replicas}
+    return {
+        "index_patterns": [f"{name}-v{version}-*"],
+        "template": {"settings": settings, "mappings": mapping["mappings"]},
+        "version": version,
+        "priority": 100 + version,
+        "_meta": {"managed_by": "indexify", "mapping_version": version}
+    }
+
+def put_index_template(client: Elasticsearch, name: str, version: int = MAPPING_VERSION, **options):
+    body = build_index_template(name, version, **options)
+    client.indices.put_index_template(name=f"{template_name(name)}-v{version}", **body)
+    logging.info(f"Index template for '{name}' mapping version {version} installed")
+
+def alias_indices(client: Elasticsearch, alias: str) -> List[str]:
+    if not client.indices.exists_alias(name=alias):
+        return []
+    return list(client.indices.get_alias(name=alias).keys())
+
+def bootstrap_index(client: Elasticsearch, name: str, version: int = MAPPING_VERSION, **options) -> Optional[str]:
+    """
+    Installs the template and creates the first generation with both
+    aliases, plus the search statistics index.
+
+    Returns:
+        Optional[str]: The created index, or None if the aliases already exist
+        or a concrete index named `name` has to be migrated with reindex_to_version
+    """
+    put_index_template(client, name, version, **options)
+    if not client.indices.exists(index=f"{name}_stats"):
+        client.indices.create(index=f"{name}_stats", body=build_stats_mapping())
+
+    if client.indices.exists_alias(name=name) or client.indices.exists_alias(name=write_alias(name)):
+        logging.info(f"Aliases for '{name}' already exist")
+        return None
+    if client.indices.exists(index=name):
+        logging.warning(f"'{name}' is a concrete index; migrate it with reindex_to_version")
+        return None
+
+    index = versioned_index_name(name, version)
+    client.indices.create(
+        index=index,
+        aliases={name: {}, write_alias(name): {"is_write_index": True}}
+    )
+    logging.info(f"Created '{index}' behind aliases '{name}' and '{write_alias(name)}'")
+    return index
+
+@contextmanager
+def bulk_load_settings(client: Elasticsearch, index: str) -> Iterator[None]:
+    """
+    Disables refresh and replicas while an index is bulk loaded, then
+    restores the previous values and refreshes
+    """
+    current = client.indices.get_settings(index=index)[index]["settings"]["index"]
+    previous = {
+        "refresh_interval": current.get("refresh_interval", "1s"),
+        "number_of_replicas": current.get("number_of_replicas", "1")
+    }
+    client.indices.put_settings(index=index, settings={"refresh_interval": "-1", "number_of_replicas": 0})
+    try:
+        yield
+    finally:
+        client.indices.put_settings(index=index, settings=previous)
+        client.indices.refresh(index=index)
+
+def swap_aliases(client: Elasticsearch, name: str, new_index: str) -> List[Dict[str, Any]]:
+    """
+    Points the read and write aliases at new_index in one atomic _aliases
+    call. A concrete index still using the public name is removed in the
+    same call, so readers never see a missing index.
+    """
+    actions: List[Dict[str, Any]] = []
+    for alias in (name, write_alias(name)):
+        for index in alias_indices(client, alias):
+            if index != new_index:
+                actions.append({"remove": {"index": index, "alias": alias}})
+    if client.indices.exists(index=name) and not client.indices.exists_alias(name=name):
+        actions.append({"remove_index": {"index": name}})
+    actions.append({"add": {"index": new_index, "alias": name}})
+    actions.append({"add": {"index": new_index, "alias": write_alias(name), "is_write_index": True}})
+    client.indices.update_aliases(actions=actions)
+    logging.info(f"Aliases for '{name}' now point at '{new_index}'")
+    return actions
+
+def log_progress(done: int, total: int, started: float) -> Dict[str, Any]:
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed else 0.0
+    percent = done / total * 100 if total else 0.0
+    logging.info(f"Reindexed {done}/{total} documents ({percent:.1f}%) at {rate:.0f} docs/s")
+    return {"documents": done, "total": total, "seconds": elapsed, "docs_per_second": rate}
+
+def run_sliced_reindex(
+    client: Elasticsearch,
+    source: str,
+    dest: str,
+    slices: Any = "auto",
+    requests_per_second: Optional[float] = None,
+    poll_interval: float = 5.0
+) -> Dict[str, Any]:
+    """
+    Runs _reindex as a sliced background task and polls it for progress.
+
+    Returns:
+        Dict: Documents copied, total, failures, elapsed seconds and throughput
+    """
+    started = time.perf_counter()
+    options = {"requests_per_second": requests_per_second} if requests_per_second else {}
+    # External versioning keeps the source versions, so catch_up can tell newer copies apart
+    task_id = client.reindex(
+        source={"index": source, "size": 1000},
+        dest={"index": dest, "version_type": "external"},
+        conflicts="proceed",
+        slices=slices,
+        wait_for_completion=False,
+        **options
+    )["task"]
+
+    while True:
+        task = client.tasks.get(task_id=task_id)
+        status = task["task"]["status"]
+        report = log_progress(
+            status.get("created", 0) + status.get("updated", 0), status.get("total", 0), started
+        )
+        if task.get("completed"):
+            response = task.get("response", {})
+            report["failures"] = response.get("failures", [])
+            if "error" in task:
+                report["failures"].append(task["error"])
+            return report
+        time.sleep(poll_interval)
+
+def set_write_block(client: Elasticsearch, index: str, blocked: bool = True):
+    client.indices.put_settings(index=index, settings={"index.blocks.write": blocked})
+    logging.info(f"Writes to '{index}' {'blocked' if blocked else 'allowed'}")
+
+def catch_up(client: Elasticsearch, source: str, dest: str, overwrite: bool = True) -> int:
+    """
+    Copies documents written to source during a reindex into dest.
+
+    With overwrite, documents are indexed with external versioning, so a
+    document updated in source after it was copied replaces the stale copy
+    (dest must have been filled with the source versions, as
+    run_sliced_reindex does). Without it only the documents dest is missing
+    are copied and later updates are lost; that is the case for re-embedded
+    copies, whose vectors must not be overwritten with the source ones.
+    Deletions in source are never propagated.
+
+    Returns:
+        int: Documents created or updated in dest
+    """
+    options = {"version_type": "external"} if overwrite else {"op_type": "create"}
+    response = client.reindex(
+        source={"index": source},
+        dest={"index": dest, **options},
+        conflicts="proceed",
+        wait_for_completion=True,
+        refresh=True
+    )
+    copied = response.get("created", 0) + response.get("updated", 0)
+    logging.info(f"Caught up {copied} documents from '{source}' into '{dest}'")
+    return copied
+
+def reindex_to_version(
+    client: Elasticsearch,
+    name: str,
+    version: int,
+    backend: Optional[EmbeddingBackend] = None,
+    slices: Any = "auto",
+    requests_per_second: Optional[float] = None,
+    swap: bool = True,
+    **template_options
+) -> Dict[str, Any]:
+    """
+    Copies the documents behind `name` into the first generation of a new
+    mapping version and swaps the aliases to it, without downtime for readers.
+
+    Documents are copied by a sliced, parallel _reindex, or by scroll and
+    bulk with re-embedding when a backend is given. The new index loads
+    with refresh disabled and no replicas; both are restored before the swap.
+    Documents written during the copy are caught up from the previous write
+    index after the swap; updated documents replace their stale copies,
+    except after a re-embedding (see catch_up). A concrete index is deleted by the swap, so it is
+    caught up just before it instead, with writes blocked from the final
+    catch-up on: a write in that window fails rather than being lost.
+
+    Args:
+        client: Elasticsearch client
+        name: Public index name (read alias, or the legacy concrete index)
+        version: Target mapping version
+        backend: Re-embed documents with this backend instead of copying vectors
+        slices: _reindex slices ("auto" uses one per shard)
+        requests_per_second: Throttle for _reindex
+        swap: Swap the aliases when the copy has no failures
+        template_options: vector_dims, similarity, shards, replicas for the template
+
+    Returns:
+        Dict: The new index name, copy report and whether the aliases were swapped
+    """
+    if backend is not None:
+        template_options.setdefault("vector_dims", backend.dims)
+        template_options.setdefault("similarity", "dot_product" if backend.normalized else "cosine")
+    put_index_template(client, name, version, **template_options)
+
+    previous_write = alias_indices(client, write_alias(name))
+    legacy = not previous_write and not client.indices.exists_alias(name=name)
+
+    dest = versioned_index_name(name, version)
+    if not client.indices.exists(index=dest):
+        client.indices.create(index=dest)
+
+    with bulk_load_settings(client, dest):
+        if backend is not None:
+            report = reembed_index(client, name, dest, backend)
+            report["failures"] = [] if not report["errors"] else [f"{report['errors']} documents failed"]
+        else:
+            report = run_sliced_reindex(client, name, dest, slices, requests_per_second)
+
+    swapped = False
+    if report["failures"]:
+        logging.error(f"Reindex into '{dest}' had {len(report['failures'])} failures; aliases left unchanged")
+    elif swap:
+        if legacy:
+            set_write_block(client, name)
+            try:
+                catch_up(client, name, dest, overwrite=backend is None)
+                swap_aliases(client, name, dest)
+            except Exception:
+                set_write_block(client, name, False)
+                raise
+        else:
+            swap_aliases(client, name, dest)
+        swapped = True
+        for index in previous_write:
+            if index != dest:
+                catch_up(client, index, dest, overwrite=backend is None)
+    return {"index": dest, "swapped": swapped, **report}
+
+def rollover(
+    client: Elasticsearch,
+    name: str,
+    max_primary_shard_size: str = "30gb",
+    max_docs: Optional[int] = None,
+    max_age: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Starts a new generation behind the write alias once the current one is
+    big enough. The new generation joins the read alias.
+
+    Documents are routed by id to the write index only, so a document
+    re-fetched after a rollover is stored again in the new generation.
+    """
+    conditions: Dict[str, Any] = {"max_primary_shard_size": max_primary_shard_size}
+    if max_docs:
+        conditions["max_docs"] = max_docs
+    if max_age:
+        conditions["max_age"] = max_age
+    response = client.indices.rollover(
+        alias=write_alias(name),
+        conditions=conditions,
+        aliases={name: {}}
+    )
+    if response.get("rolled_over"):
+        logging.info(f"Rolled '{write_alias(name)}' over to '{response['new_index']}'")
+    return response
+
+def resolve_index_aliases(client: Elasticsearch, name: str) -> IndexAliases:
+    """
+    Returns the aliases to use, falling back to the plain name when the
+    index has not been moved behind aliases yet
+    """
+    if client.indices.exists_alias(name=write_alias(name)):
+        return IndexAliases(read=name, write=write_alias(name))
+    return IndexAliases(read=name, write=name)
+
+async def async_resolve_index_aliases(client: AsyncElasticsearch, name: str) -> IndexAliases:
+    """
+    Async version of resolve_index_aliases
+    """
+    try:
+        if await client.indices.exists_alias(name=write_alias(name)):
+            return IndexAliases(read=name, write=write_alias(name))
+    except Exception as e:
+        logging.error(f"Error resolving index aliases: {str(e)}")
+    return IndexAliases(read=name, write=name)
+
+async def get_index_aliases(request: Request) -> IndexAliases:
+    """
+    FastAPI dependency returning the aliases resolved at startup
+    """
+    return request.app.state.index_aliases
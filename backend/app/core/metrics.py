@@ -0,0 +1,319 @@
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import functools
+import logging
+import math
+import os
+import threading
+import time
+
+# Seconds; covers a cache hit (sub-millisecond) up to a slow miss-fill
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Texts per model call
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+def format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = "") -> str:
+    pairs = [
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(labelnames, labelvalues)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+# Series are updated without locks: a lock costs more than the update
+# itself, and updates come from the event loop thread. An update racing
+# with another thread can at worst lose that one sample.
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        # Upper bounds are inclusive, as in Prometheus: le="0.01" counts 0.01
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *labelvalues: str):
+        """
+        Returns the series for the label values, creating it on first use.
+        Hot paths keep the returned child instead of looking it up per call.
+        """
+        child = self._children.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labelvalues}")
+            with self._lock:
+                child = self._children.setdefault(labelvalues, self._new_child())
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, child in sorted(self._children.items()):
+            lines.extend(self._render_child(labelvalues, child))
+        return lines
+
+    def _render_child(self, labelvalues: Tuple[str, ...], child: Any) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _render_child(self, labelvalues: Tuple[str, ...], child: _CounterChild) -> List[str]:
+        return [f"{self.name}_total{format_labels(self.labelnames, labelvalues)} {format_value(child.value)}"]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_child(self, labelvalues: Tuple[str, ...], child: _HistogramChild) -> List[str]:
+        counts, total = list(child.counts), child.sum
+        count = sum(counts)
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            labels = format_labels(self.labelnames, labelvalues, f'le="{format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = format_labels(self.labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Process-local counters and histograms rendered in the Prometheus text
+    exposition format. Each worker process exposes its own series.
+    """
+
+    def __init__(self, prefix: str = "indexify"):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    "stage_seconds", "Wall-clock time of each request stage", ["stage"]
+)
+errors = registry.counter(
+    "errors", "Errors raised or swallowed per stage", ["stage"]
+)
+cache_requests = registry.counter(
+    "cache_requests", "Cache lookups by cache and outcome (hit, shared_hit, miss)", ["cache", "result"]
+)
+miss_fill_events = registry.counter(
+    "miss_fill", "Miss-fill jobs by outcome (inline, submitted, deduplicated, rejected, completed, failed)", ["outcome"]
+)
+es_request_seconds = registry.histogram(
+    "es_request_seconds", "Client-side wall-clock time of Elasticsearch requests", ["operation"]
+)
+es_took_seconds = registry.histogram(
+    "es_took_seconds", "Server-side time reported by Elasticsearch in 'took'", ["operation"]
+)
+embedding_batch_size = registry.histogram(
+    "embedding_batch_size", "Texts per embedding model call", ["source"], BATCH_SIZE_BUCKETS
+)
+coalesced_requests = registry.counter(
+    "coalesced_requests", "Requests answered by another caller's in-flight or just-finished work", ["namespace", "via"]
+)
+
+def create_tracer() -> Optional[Any]:
+    """
+    Returns an OpenTelemetry tracer when TRACING_ENABLED is set and the
+    opentelemetry-api package is installed. Without a configured SDK the
+    API hands out no-op spans.
+    """
+    if os.getenv("TRACING_ENABLED", "false").lower() != "true":
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logging.error("TRACING_ENABLED is set but the opentelemetry-api package is not installed")
+        return None
+    return trace.get_tracer("indexify")
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+tracer = create_tracer()
+
+class Span:
+    """
+    Times one stage into stage_seconds and, when tracing is enabled, wraps
+    it in an OpenTelemetry span. Exceptions leaving the block count as
+    errors of the stage unless they carry a status code below 500.
+    """
+    __slots__ = ("name", "histogram", "started", "_otel")
+
+    def __init__(self, name: str, histogram: _HistogramChild):
+        self.name = name
+        self.histogram = histogram
+        self._otel = None
+
+    def __enter__(self) -> "Span":
+        if tracer is not None:
+            self._otel = tracer.start_as_current_span(self.name)
+            self._otel.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.histogram.observe(time.perf_counter() - self.started)
+        if exc_type is not None and getattr(exc, "status_code", 500) >= 500:
+            errors.labels(self.name).inc()
+        if self._otel is not None:
+            self._otel.__exit__(exc_type, exc, tb)
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+def stage(name: str) -> Any:
+    """
+    Context manager timing a stage of the request path:
+
+        with stage("embedding"):
+            vector = await embedding_service.embed(text)
+    """
+    if not METRICS_ENABLED and tracer is None:
+        return NOOP_SPAN
+    return Span(name, stage_seconds.labels(name))
+
+def traced(name: str) -> Callable:
+    """
+    Decorator timing an async route handler as the stage "route:<name>".
+    The wrapper keeps the handler's signature, so FastAPI dependencies
+    still resolve.
+    """
+    def decorator(handler: Callable) -> Callable:
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            with stage(f"route:{name}"):
+                return await handler(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_error(name: str):
+    """
+    Counts an error that was handled without leaving the stage (logged and swallowed)
+    """
+    errors.labels(name).inc()
+
+def record_cache(cache: str, result: str):
+    cache_requests.labels(cache, result).inc()
+
+def record_miss_fill(outcome: str):
+    miss_fill_events.labels(outcome).inc()
+
+def record_coalesced(namespace: str, via: str):
+    coalesced_requests.labels(namespace, via).inc()
+
+def record_embedding_batch(source: str, size: int):
+    embedding_batch_size.labels(source).observe(size)
+
+def record_es_request(operation: str, seconds: float, response: Any):
+    """
+    Records the wall-clock time of an Elasticsearch request next to the
+    server-side 'took'. For _msearch without a top-level 'took' the
+    slowest search stands in for it.
+
+    Args:
+        operation: Request type ("search", "msearch", ...)
+        seconds: Client-side wall-clock time
+        response: Response body
+    """
+    es_request_seconds.labels(operation).observe(seconds)
+    # Client responses support "in" and indexing but not .get()
+    took = None
+    if "took" in response:
+        took = response["took"]
+    elif "responses" in response:
+        took = max((item.get("took", 0) for item in response["responses"]), default=None)
+    if took is not None:
+        es_took_seconds.labels(operation).observe(took / 1000)
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,197 @@
+from dataclasses import dataclass, field
+from fastapi import Request
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+from .metrics import record_miss_fill, stage
+
+class MissFillQueueFull(Exception):
+    pass
+
+@dataclass
+class MissFillJob:
+    token: str
+    key: str
+    status: str = "pending"
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    attached: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "token": self.token,
+            "status": self.status,
+            "results": self.results,
+            "error": self.error
+        }
+
+@dataclass
+class MissFillStats:
+    submitted: int = 0
+    deduplicated: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+    running: int = 0
+    duration_total: float = 0.0
+
+    def to_dict(self, queue_depth: int) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "running": self.running,
+            "queue_depth": queue_depth,
+            "avg_duration_ms": self.duration_total / finished * 1000 if finished else 0.0
+        }
+
+class MissFillQueue:
+    """
+    Runs search miss-fill work (Google fetch, embedding, indexing) in the
+    background so /api/search can answer immediately.
+
+    Jobs are deduplicated by key: a miss for a query that is already queued
+    or running attaches to the existing job and gets the same token. A
+    fixed number of workers bounds concurrency, and submissions are
+    rejected once max_pending jobs are waiting.
+    """
+
+    def __init__(self, concurrency: int = 2, max_pending: int = 100, result_ttl: float = 300.0):
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.stats = MissFillStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: Dict[str, MissFillJob] = {}
+        self._in_flight: Dict[str, MissFillJob] = {}
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._run_worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [
+            token for token, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl
+        ]
+        for token in expired:
+            del self._jobs[token]
+
+    def submit(self, key: str, work: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> MissFillJob:
+        """
+        Queues a miss-fill job, or attaches to the one in flight for the same key.
+
+        Args:
+            key: Normalized request key used for deduplication
+            work: Zero-argument coroutine factory returning the filled results
+
+        Returns:
+            MissFillJob: The new or existing job
+        """
+        self._prune()
+        job = self._in_flight.get(key)
+        if job is not None:
+            job.attached += 1
+            self.stats.deduplicated += 1
+            record_miss_fill("deduplicated")
+            return job
+
+        if self._queue is None:
+            self.start()
+        job = MissFillJob(token=uuid.uuid4().hex, key=key)
+        try:
+            self._queue.put_nowait((job, work))
+        except asyncio.QueueFull:
+            self.stats.rejected += 1
+            record_miss_fill("rejected")
+            raise MissFillQueueFull(f"{self.max_pending} miss-fill jobs already pending")
+
+        self._jobs[job.token] = job
+        self._in_flight[key] = job
+        self.stats.submitted += 1
+        record_miss_fill("submitted")
+        return job
+
+    def get(self, token: str) -> Optional[MissFillJob]:
+        self._prune()
+        return self._jobs.get(token)
+
+    async def wait(self, token: str, timeout: float) -> Optional[MissFillJob]:
+        """
+        Waits up to timeout seconds for a job to finish
+        """
+        job = self.get(token)
+        if job is None or job.done.is_set() or timeout <= 0:
+            return job
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    async def _run_worker(self):
+        while True:
+            job, work = await self._queue.get()
+            job.status = "running"
+            self.stats.running += 1
+            started = time.perf_counter()
+            try:
+                with stage("miss_fill_job"):
+                    job.results = await work()
+                job.status = "done"
+                self.stats.completed += 1
+                record_miss_fill("completed")
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                self.stats.failed += 1
+                record_miss_fill("failed")
+                logging.error(f"Error in miss-fill job '{job.key}': {str(e)}")
+            finally:
+                self.stats.running -= 1
+                self.stats.duration_total += time.perf_counter() - started
+                job.finished_at = time.monotonic()
+                self._in_flight.pop(job.key, None)
+                job.done.set()
+                self._queue.task_done()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+def create_miss_fill_queue() -> MissFillQueue:
+    """
+    Builds a MissFillQueue configured from environment variables
+    """
+    return MissFillQueue(
+        concurrency=int(os.getenv("MISS_FILL_CONCURRENCY", "2")),
+        max_pending=int(os.getenv("MISS_FILL_MAX_PENDING", "100")),
+        result_ttl=float(os.getenv("MISS_FILL_RESULT_TTL", "300"))
+    )
+
+async def get_miss_fill_queue(request: Request) -> MissFillQueue:
+    """
+    FastAPI dependency returning the application-wide miss-fill queue
+    """
+    return request.app.state.miss_fill_queue
@@ -0,0 +1,129 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+@dataclass
+class ModelSettings:
+    # Hub name or local directory produced by scripts/export_embedding_model.py
+    source: str = DEFAULT_MODEL_NAME
+    # "torch" or "onnx"
+    format: str = "torch"
+    # "int8" applies dynamic quantization to the torch model's linear layers
+    quantize: Optional[str] = None
+    threads: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "ModelSettings":
+        threads = os.getenv("EMBEDDING_MODEL_THREADS")
+        return cls(
+            source=os.getenv("EMBEDDING_MODEL_PATH") or DEFAULT_MODEL_NAME,
+            format=os.getenv("EMBEDDING_MODEL_FORMAT", "torch"),
+            quantize=os.getenv("EMBEDDING_MODEL_QUANTIZE") or None,
+            threads=int(threads) if threads else None
+        )
+
+class ModelLoader:
+    """
+    Loads the tokenizer and model on first use instead of at import time.
+
+    get() is thread-safe: concurrent callers wait for a single load.
+    warm() starts the load on a background thread so the API can answer
+    (and report readiness) while the weights are still loading.
+    """
+
+    def __init__(self, settings: Optional[ModelSettings] = None):
+        self.settings = settings or ModelSettings.from_env()
+        self.state = "not_loaded"
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._model: Optional[Tuple[Any, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._model is not None
+
+    def _load(self) -> Tuple[Any, Any]:
+        # Heavy imports stay out of module import so the API starts fast
+        from transformers import AutoTokenizer
+
+        settings = self.settings
+        tokenizer = AutoTokenizer.from_pretrained(settings.source)
+
+        if settings.format == "onnx":
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+            model = ORTModelForFeatureExtraction.from_pretrained(settings.source)
+        elif settings.format == "torch":
+            import torch
+            from transformers import AutoModel
+
+            if settings.threads:
+                torch.set_num_threads(settings.threads)
+            model = AutoModel.from_pretrained(settings.source)
+            model.eval()
+            if settings.quantize == "int8":
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            raise ValueError(f"Unknown embedding model format '{settings.format}'")
+
+        return tokenizer, model
+
+    def get(self) -> Tuple[Any, Any]:
+        """
+        Returns the (tokenizer, model) pair, loading it if needed
+        """
+        if self._model is not None:
+            return self._model
+
+        with self._lock:
+            if self._model is None:
+                self.state = "loading"
+                started = time.perf_counter()
+                try:
+                    self._model = self._load()
+                except Exception as e:
+                    self.state = "failed"
+                    self.error = str(e)
+                    logging.error(f"Error loading embedding model: {str(e)}")
+                    raise
+                self.load_seconds = time.perf_counter() - started
+                self.error = None
+                self.state = "ready"
+                logging.info(
+                    f"Embedding model '{self.settings.source}' ({self.settings.format}) "
+                    f"loaded in {self.load_seconds:.2f}s"
+                )
+        return self._model
+
+    def warm(self) -> threading.Thread:
+        """
+        Loads the model on a background thread
+        """
+        def run():
+            try:
+                self.get()
+            except Exception:
+                pass
+
+        if self.state == "not_loaded":
+            self.state = "loading"
+        thread = threading.Thread(target=run, name="embedding-model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "source": self.settings.source,
+            "format": self.settings.format,
+            "quantize": self.settings.quantize,
+            "load_seconds": self.load_seconds,
+            "error": self.error
+        }
+
+model_loader = ModelLoader()
@@ -1,10 +1,36 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Discriminator, Field, Tag
+from typing import Annotated, Any, List, Optional, Literal, Union
 from datetime import datetime
 
+class SearchFilters(BaseModel):
+    author: Optional[str] = None
+    keywords: Optional[List[str]] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+class RankingOptions(BaseModel):
+    # Unset fields keep the RERANK_* defaults
+    fusion: Optional[Literal["rrf", "linear"]] = None
+    text_weight: Optional[float] = Field(default=None, ge=0)
+    vector_weight: Optional[float] = Field(default=None, ge=0)
+    recency_weight: Optional[float] = Field(default=None, ge=0)
+    popularity_weight: Optional[float] = Field(default=None, ge=0)
+    half_life_days: Optional[float] = Field(default=None, gt=0)
+    candidates: Optional[int] = Field(default=None, ge=1, le=1000)
+
 class SearchQuery(BaseModel):
     query: str
     size: int = Field(default=10, ge=1, le=100)
+    mode: Optional[Literal["script_score", "knn", "hybrid", "rerank"]] = None
+    # Second-stage ranking weights; setting them selects the rerank mode
+    ranking: Optional[RankingOptions] = None
+    # Non-scoring restrictions applied in filter context
+    filters: Optional[SearchFilters] = None
+    # Return immediately with a pending token on a miss instead of waiting for the fill
+    background_fill: Optional[bool] = None
+    # Cursor pagination: set paginate for the first page, then pass back next_cursor
+    paginate: bool = False
+    cursor: Optional[str] = None
 
 class AdvancedSearchQuery(BaseModel):
     title: Optional[str] = None
@@ -14,6 +40,29 @@ class AdvancedSearchQuery(BaseModel):
     keywords: Optional[List[str]] = None
     content: Optional[str] = None
     size: int = Field(default=10, ge=1, le=100)
+    paginate: bool = False
+    cursor: Optional[str] = None
+
+class BatchSearchQuery(SearchQuery):
+    type: Literal["search"] = "search"
+
+class BatchAdvancedSearchQuery(AdvancedSearchQuery):
+    type: Literal["advanced"]
+
+def batch_query_type(value: Any) -> str:
+    # Items without a type are plain searches
+    kind = value.get("type") if isinstance(value, dict) else getattr(value, "type", None)
+    return kind or "search"
+
+class BatchSearchRequest(BaseModel):
+    queries: List[Annotated[
+        Union[Annotated[BatchSearchQuery, Tag("search")], Annotated[BatchAdvancedSearchQuery, Tag("advanced")]],
+        Discriminator(batch_query_type)
+    ]] = Field(min_length=1)
+    # Queue a background miss-fill for searches without results and return its pending token
+    fill_misses: bool = False
+    # Count the searches in the search statistics (batches from the front-end, not from jobs)
+    record_stats: bool = False
 
 class SearchResult(BaseModel):
     title: str
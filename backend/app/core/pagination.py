@@ -0,0 +1,239 @@
+from elasticsearch import ApiError, Elasticsearch, AsyncElasticsearch
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+
+# How long Elasticsearch keeps a point in time open between two pages
+PIT_KEEP_ALIVE = os.getenv("PIT_KEEP_ALIVE", "1m")
+
+class InvalidCursor(ValueError):
+    pass
+
+class ExpiredCursor(InvalidCursor):
+    pass
+
+def raise_if_cursor_expired(error: ApiError):
+    """
+    Raises ExpiredCursor when a page request failed because its point in
+    time or the search context of a shard is gone. Other failures, such as
+    query or shard errors wrapped in a search_phase_execution_exception,
+    are left to the caller.
+    """
+    details = error.body.get("error") if isinstance(error.body, dict) else None
+    types = {error.message}
+    if isinstance(details, dict):
+        types.add(details.get("type"))
+        types.update(cause.get("type") for cause in details.get("root_cause") or [] if isinstance(cause, dict))
+    if "search_context_missing_exception" in types:
+        raise ExpiredCursor("Cursor expired; restart pagination without a cursor") from error
+
+def params_fingerprint(params: Dict[str, Any]) -> str:
+    """
+    Short hash of the request parameters a cursor was issued for
+    """
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+def encode_cursor(pit_id: str, search_after: List[Any], fingerprint: str) -> str:
+    """
+    Builds an opaque cursor token for the next page
+    """
+    payload = json.dumps({"pit": pit_id, "after": search_after, "fp": fingerprint}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, fingerprint: str) -> Tuple[str, List[Any]]:
+    """
+    Returns the point in time id and search_after values of a cursor.
+
+    Raises:
+        InvalidCursor: If the token is malformed or was issued for other parameters
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        pit_id, search_after = payload["pit"], payload["after"]
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+        raise InvalidCursor("Malformed cursor")
+    if payload.get("fp") != fingerprint:
+        raise InvalidCursor("Cursor does not belong to this query")
+    return pit_id, search_after
+
+def build_page_body(
+    body: Dict[str, Any],
+    pit_id: str,
+    size: int,
+    search_after: Optional[List[Any]] = None,
+    keep_alive: str = PIT_KEEP_ALIVE
+) -> Dict[str, Any]:
+    """
+    Turns a search body into a point-in-time page request. The sort gets
+    the _shard_doc tiebreaker so search_after never skips or repeats hits.
+    """
+    page = {key: value for key, value in body.items() if key not in ("from", "size", "sort")}
+    page["size"] = size
+    page["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+    page["sort"] = list(body.get("sort", [{"_score": "desc"}])) + [{"_shard_doc": "asc"}]
+    page["track_total_hits"] = False
+    if search_after is not None:
+        page["search_after"] = search_after
+    return page
+
+def next_page(response: Dict[str, Any], pit_id: str, size: int) -> Tuple[List[Dict[str, Any]], str, bool]:
+    """
+    Returns the hits of a page, the (possibly refreshed) PIT id and whether more pages may follow
+    """
+    if 'error' in response:
+        raise Exception(f"Search request failed: {response['error']}")
+    hits = response['hits']['hits']
+    return hits, response.get('pit_id', pit_id), len(hits) == size
+
+def search_page(
+    client: Elasticsearch,
+    index_name: str,
+    body: Dict[str, Any],
+    size: int,
+    fingerprint: str,
+    cursor: Optional[str] = None,
+    keep_alive: str = PIT_KEEP_ALIVE
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetches one page of a search with search_after over a point in time.
+
+    Args:
+        client: Elasticsearch client
+        index_name: Index name, used when opening the point in time
+        body: Search body (query and optional sort)
+        size: Page size
+        fingerprint: params_fingerprint of the request, bound into the cursor
+        cursor: Token returned with the previous page, None for the first page
+        keep_alive: PIT keep-alive extended by every page
+
+    Returns:
+        Tuple[List[Dict], Optional[str]]: The page hits and the next cursor (None on the last page)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed, or ExpiredCursor once its point in time is gone
+    """
+    if cursor is None:
+        pit_id, search_after = client.open_point_in_time(index=index_name, keep_alive=keep_alive)['id'], None
+    else:
+        pit_id, search_after = decode_cursor(cursor, fingerprint)
+
+    try:
+        response = client.search(body=build_page_body(body, pit_id, size, search_after, keep_alive))
+    except Exception as e:
+        if cursor is None:
+            # Nobody holds a cursor for the point in time opened for this page
+            close_point_in_time(client, pit_id)
+        elif isinstance(e, ApiError):
+            raise_if_cursor_expired(e)
+        raise
+    hits, pit_id, more = next_page(response, pit_id, size)
+    if not more:
+        close_point_in_time(client, pit_id)
+        return hits, None
+    return hits, encode_cursor(pit_id, hits[-1]['sort'], fingerprint)
+
+async def async_search_page(
+    client: AsyncElasticsearch,
+    index_name: str,
+    body: Dict[str, Any],
+    size: int,
+    fingerprint: str,
+    cursor: Optional[str] = None,
+    keep_alive: str = PIT_KEEP_ALIVE
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Async version of search_page
+    """
+    if cursor is None:
+        pit_id, search_after = (await client.open_point_in_time(index=index_name, keep_alive=keep_alive))['id'], None
+    else:
+        pit_id, search_after = decode_cursor(cursor, fingerprint)
+
+    try:
+        response = await client.search(body=build_page_body(body, pit_id, size, search_after, keep_alive))
+    except Exception as e:
+        if cursor is None:
+            # Nobody holds a cursor for the point in time opened for this page
+            await async_close_point_in_time(client, pit_id)
+        elif isinstance(e, ApiError):
+            raise_if_cursor_expired(e)
+        raise
+    hits, pit_id, more = next_page(response, pit_id, size)
+    if not more:
+        await async_close_point_in_time(client, pit_id)
+        return hits, None
+    return hits, encode_cursor(pit_id, hits[-1]['sort'], fingerprint)
+
+def close_point_in_time(client: Elasticsearch, pit_id: str):
+    try:
+        client.close_point_in_time(id=pit_id)
+    except Exception as e:
+        logging.warning(f"Error closing point in time: {str(e)}")
+
+async def async_close_point_in_time(client: AsyncElasticsearch, pit_id: str):
+    try:
+        await client.close_point_in_time(id=pit_id)
+    except Exception as e:
+        logging.warning(f"Error closing point in time: {str(e)}")
+
+def iterate_hits(
+    client: Elasticsearch,
+    index_name: str,
+    body: Dict[str, Any],
+    batch_size: int = 500,
+    limit: Optional[int] = None,
+    keep_alive: str = PIT_KEEP_ALIVE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields every hit of a search, one page at a time, over a point in time
+    that is closed when the iteration ends or is abandoned
+    """
+    pit_id = client.open_point_in_time(index=index_name, keep_alive=keep_alive)['id']
+    search_after = None
+    returned = 0
+    try:
+        while limit is None or returned < limit:
+            size = batch_size if limit is None else min(batch_size, limit - returned)
+            response = client.search(body=build_page_body(body, pit_id, size, search_after, keep_alive))
+            hits, pit_id, more = next_page(response, pit_id, size)
+            yield from hits
+            returned += len(hits)
+            if not more:
+                break
+            search_after = hits[-1]['sort']
+    finally:
+        close_point_in_time(client, pit_id)
+
+async def async_iterate_hits(
+    client: AsyncElasticsearch,
+    index_name: str,
+    body: Dict[str, Any],
+    batch_size: int = 500,
+    limit: Optional[int] = None,
+    keep_alive: str = PIT_KEEP_ALIVE
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async version of iterate_hits
+    """
+    pit_id = (await client.open_point_in_time(index=index_name, keep_alive=keep_alive))['id']
+    search_after = None
+    returned = 0
+    try:
+        while limit is None or returned < limit:
+            size = batch_size if limit is None else min(batch_size, limit - returned)
+            response = await client.search(body=build_page_body(body, pit_id, size, search_after, keep_alive))
+            hits, pit_id, more = next_page(response, pit_id, size)
+            for hit in hits:
+                yield hit
+            returned += len(hits)
+            if not more:
+                break
+            search_after = hits[-1]['sort']
+    finally:
+        await async_close_point_in_time(client, pit_id)
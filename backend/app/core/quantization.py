@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List
+import logging
+import math
+import os
+
+import numpy as np
+
+# Levels of VECTOR_QUANTIZATION. All but byte keep float vectors in
+# _source and choose how Elasticsearch indexes them for kNN:
+#   default  Elasticsearch's default index_options (int8_hnsw since 8.14)
+#   float    hnsw over float32 vectors, 4 bytes per dimension
+#   int8     int8_hnsw, scalar quantized to 1 byte per dimension
+#   int4     int4_hnsw, half a byte per dimension
+#   bbq      bbq_hnsw, better binary quantization, 1 bit per dimension
+# For int8, int4 and bbq Elasticsearch keeps the raw floats on disk and
+# rescores the oversampled kNN candidates with them (knn.rescore_vector).
+#   byte     element_type byte: vectors are stored as int8 everywhere,
+#            including _source, and the top kNN candidates are rescored
+#            here against the float query vector
+QUANTIZATION_LEVELS = ("default", "float", "int8", "int4", "bbq", "byte")
+
+INDEX_OPTION_TYPES = {"float": "hnsw", "int8": "int8_hnsw", "int4": "int4_hnsw", "bbq": "bbq_hnsw", "byte": "hnsw"}
+
+# Unit-length vectors have components in [-1, 1]
+BYTE_SCALE = 127.0
+
+@dataclass
+class VectorQuantization:
+    """
+    How document and query vectors are stored, sent and rescored for one
+    quantization level
+    """
+    level: str = "default"
+    # kNN candidates fetched per requested hit for float rescoring; 1 disables it
+    oversample: float = 3.0
+
+    def __post_init__(self):
+        if self.level not in QUANTIZATION_LEVELS:
+            raise ValueError(f"Unknown vector quantization '{self.level}', expected one of {QUANTIZATION_LEVELS}")
+
+    @classmethod
+    def from_env(cls) -> "VectorQuantization":
+        return cls(
+            level=os.getenv("VECTOR_QUANTIZATION", "default"),
+            oversample=float(os.getenv("VECTOR_RESCORE_OVERSAMPLE", "3"))
+        )
+
+    @property
+    def element_type(self) -> str:
+        return "byte" if self.level == "byte" else "float"
+
+    @property
+    def rescores_in_es(self) -> bool:
+        return self.level in ("int8", "int4", "bbq") and self.oversample > 1
+
+    @property
+    def rescores_locally(self) -> bool:
+        return self.level == "byte" and self.oversample > 1
+
+    @property
+    def script_scale(self) -> float:
+        """
+        Factor bringing a script dotProduct of encoded vectors back to the float range
+        """
+        return 1.0 / (BYTE_SCALE * BYTE_SCALE) if self.level == "byte" else 1.0
+
+    def vector_mapping(self, dims: int, similarity: str) -> Dict[str, Any]:
+        """
+        Mapping of the dense_vector field
+        """
+        mapping = {
+            "type": "dense_vector",
+            "dims": dims,
+            "index": True,
+            "similarity": similarity
+        }
+        if self.level in INDEX_OPTION_TYPES:
+            mapping["index_options"] = {"type": INDEX_OPTION_TYPES[self.level]}
+        if self.level == "byte":
+            mapping["element_type"] = "byte"
+            # Rounding leaves byte vectors with slightly different lengths,
+            # which dot_product assumes equal
+            if similarity == "dot_product":
+                mapping["similarity"] = "cosine"
+        return mapping
+
+    def encode(self, vectors: Any) -> np.ndarray:
+        """
+        Converts float vectors (one or a matrix) to what the index stores and
+        queries with: float32, or int8 for the byte level
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.level != "byte":
+            return vectors
+        return np.clip(np.rint(vectors * BYTE_SCALE), -BYTE_SCALE, BYTE_SCALE).astype(np.int8)
+
+    def decode(self, stored: Any) -> np.ndarray:
+        """
+        Float32 approximation of stored vectors
+        """
+        vectors = np.asarray(stored, dtype=np.float32)
+        return vectors / BYTE_SCALE if self.level == "byte" else vectors
+
+    def candidates(self, size: int) -> int:
+        """
+        kNN hits to fetch for `size` results: more when they are rescored here
+        """
+        return math.ceil(size * self.oversample) if self.rescores_locally else size
+
+    def knn_options(self) -> Dict[str, Any]:
+        """
+        Extra knn clause options: float rescoring by Elasticsearch for the quantized float levels
+        """
+        return {"rescore_vector": {"oversample": self.oversample}} if self.rescores_in_es else {}
+
+    def rescore(self, hits: List[Dict[str, Any]], query_vector: Any, size: int) -> List[Dict[str, Any]]:
+        """
+        Reorders kNN hits by the similarity of the float query vector to
+        their stored vectors and keeps the top `size`. The stored vectors
+        are only quantized on one side, which ranks closer to the float
+        order than int8 against int8.
+
+        Args:
+            hits: kNN hits with the vector in _source
+            query_vector: Float query vector
+            size: Hits to keep
+
+        Returns:
+            The top hits, with the rescored similarity as _score
+        """
+        rows = [row for row, hit in enumerate(hits) if hit['_source'].get('vector') is not None]
+        if not rows:
+            return hits[:size]
+        query = np.asarray(query_vector, dtype=np.float32)
+        vectors = self.decode([hits[row]['_source']['vector'] for row in rows])
+        norms = np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+        scores = vectors @ query / norms
+        order = np.argsort(-scores, kind="stable")[:size]
+        return [{**hits[rows[position]], '_score': float(scores[position])} for position in order]
+
+def create_vector_quantization() -> VectorQuantization:
+    quantization = VectorQuantization.from_env()
+    if quantization.level != "default":
+        logging.info(
+            f"Vector quantization '{quantization.level}' "
+            f"(float rescoring {'off' if quantization.oversample <= 1 else f'x{quantization.oversample:g}'})"
+        )
+    return quantization
+
+vector_quantization = create_vector_quantization()
@@ -0,0 +1,179 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Union
+
+from .index import build_index_mapping, build_stats_mapping
+
+class QueryValidationError(ValueError):
+    pass
+
+def mapping_fields(mapping: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Flattens an index mapping into {field path: type}, including multi-fields
+    such as title.keyword and keywords.text
+    """
+    fields = {}
+
+    def visit(properties: Dict[str, Any], prefix: str):
+        for name, definition in properties.items():
+            path = f"{prefix}{name}"
+            fields[path] = definition.get("type", "object")
+            for subname, subfield in definition.get("fields", {}).items():
+                fields[f"{path}.{subname}"] = subfield["type"]
+            if "properties" in definition:
+                visit(definition["properties"], f"{path}.")
+
+    visit(mapping["mappings"]["properties"], "")
+    return fields
+
+DOCUMENT_FIELDS = mapping_fields(build_index_mapping())
+STATS_FIELDS = mapping_fields(build_stats_mapping())
+
+# Which field types each clause can target
+TEXT_TYPES = {"text"}
+EXACT_TYPES = {"keyword", "long", "integer", "double", "float", "date", "boolean"}
+RANGE_TYPES = {"date", "long", "integer", "double", "float"}
+
+def check_field(field: str, allowed_types: set, fields: Dict[str, str] = DOCUMENT_FIELDS) -> str:
+    """
+    Validates a field (optionally boosted, e.g. "title^3") against the mapping.
+
+    Raises:
+        QueryValidationError: If the field is not mapped or has an unsuitable type
+    """
+    name = field.split("^", 1)[0]
+    field_type = fields.get(name)
+    if field_type is None:
+        raise QueryValidationError(f"Unknown field '{name}'")
+    if field_type not in allowed_types:
+        raise QueryValidationError(
+            f"Field '{name}' is mapped as {field_type}, expected one of {sorted(allowed_types)}"
+        )
+    return field
+
+def format_date(value: Union[str, date, datetime, None]) -> Optional[str]:
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+def match(field: str, query: str, fuzziness: Optional[str] = "AUTO", fields: Dict[str, str] = DOCUMENT_FIELDS) -> Dict[str, Any]:
+    check_field(field, TEXT_TYPES, fields)
+    clause: Dict[str, Any] = {"query": query}
+    if fuzziness:
+        clause["fuzziness"] = fuzziness
+    return {"match": {field: clause}}
+
+def multi_match(query: str, field_list: List[str], fuzziness: Optional[str] = "AUTO", fields: Dict[str, str] = DOCUMENT_FIELDS) -> Dict[str, Any]:
+    for field in field_list:
+        check_field(field, TEXT_TYPES, fields)
+    clause: Dict[str, Any] = {"query": query, "fields": list(field_list)}
+    if fuzziness:
+        clause["fuzziness"] = fuzziness
+    return {"multi_match": clause}
+
+def term(field: str, value: Any, fields: Dict[str, str] = DOCUMENT_FIELDS) -> Dict[str, Any]:
+    check_field(field, EXACT_TYPES, fields)
+    return {"term": {field: value}}
+
+def terms(field: str, values: List[Any], fields: Dict[str, str] = DOCUMENT_FIELDS) -> Dict[str, Any]:
+    check_field(field, EXACT_TYPES, fields)
+    return {"terms": {field: list(values)}}
+
+def prefix(field: str, value: str, fields: Dict[str, str] = DOCUMENT_FIELDS) -> Dict[str, Any]:
+    check_field(field, {"keyword"}, fields)
+    return {"prefix": {field: value}}
+
+def date_range(
+    field: str,
+    gte: Union[str, date, datetime, None] = None,
+    lte: Union[str, date, datetime, None] = None,
+    fields: Dict[str, str] = DOCUMENT_FIELDS
+) -> Dict[str, Any]:
+    """
+    Builds a range over a date field with yyyy-MM-dd bounds
+    """
+    check_field(field, {"date"}, fields)
+    bounds: Dict[str, Any] = {"format": "yyyy-MM-dd"}
+    if gte is not None:
+        bounds["gte"] = format_date(gte)
+    if lte is not None:
+        bounds["lte"] = format_date(lte)
+    return {"range": {field: bounds}}
+
+class BoolQuery:
+    """
+    Composable bool query.
+
+    Scoring clauses go in must/should; exact and range clauses go in
+    filter, where they are not scored and ES can cache them per segment.
+    """
+
+    def __init__(self):
+        self.musts: List[Dict[str, Any]] = []
+        self.filters: List[Dict[str, Any]] = []
+        self.shoulds: List[Dict[str, Any]] = []
+        self.must_nots: List[Dict[str, Any]] = []
+
+    def must(self, *clauses: Dict[str, Any]) -> "BoolQuery":
+        self.musts.extend(clauses)
+        return self
+
+    def filter(self, *clauses: Dict[str, Any]) -> "BoolQuery":
+        self.filters.extend(clauses)
+        return self
+
+    def should(self, *clauses: Dict[str, Any]) -> "BoolQuery":
+        self.shoulds.extend(clauses)
+        return self
+
+    def must_not(self, *clauses: Dict[str, Any]) -> "BoolQuery":
+        self.must_nots.extend(clauses)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the query clause; a single scoring clause without filters is
+        returned as is, and an empty query matches everything
+        """
+        if not (self.filters or self.shoulds or self.must_nots):
+            if not self.musts:
+                return {"match_all": {}}
+            if len(self.musts) == 1:
+                return self.musts[0]
+
+        clause = {}
+        for key, values in (
+            ("must", self.musts),
+            ("filter", self.filters),
+            ("should", self.shoulds),
+            ("must_not", self.must_nots)
+        ):
+            if values:
+                clause[key] = values
+        return {"bool": clause}
+
+def build_filter_clauses(
+    author: Optional[str] = None,
+    keywords: Optional[List[str]] = None,
+    date_from: Union[str, date, datetime, None] = None,
+    date_to: Union[str, date, datetime, None] = None
+) -> List[Dict[str, Any]]:
+    """
+    Builds the non-scoring document filters shared by /api/search and
+    /api/advanced-search
+    """
+    filters = []
+    if author:
+        filters.append(term("author", author))
+    if keywords:
+        filters.append(terms("keywords", keywords))
+    if date_from or date_to:
+        filters.append(date_range("publication_date", date_from, date_to))
+    return filters
+
+def with_filters(query: Dict[str, Any], filters: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Restricts a query clause to documents matching every filter
+    """
+    if not filters:
+        return query
+    return BoolQuery().must(query).filter(*filters).to_dict()
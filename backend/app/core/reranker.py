@@ -0,0 +1,253 @@
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import math
+import os
+
+import numpy as np
+
+from .quantization import vector_quantization
+from .query_dsl import with_filters
+
+FUSION_STRATEGIES = ("rrf", "linear")
+
+# Script field holding the query similarity computed by Elasticsearch
+SIMILARITY_FIELD = "vector_similarity"
+
+@dataclass
+class RankingWeights:
+    """
+    Second-stage ranking configuration, chosen per request.
+
+    fusion combines the text and vector signals: "rrf" sums weighted
+    reciprocal ranks, "linear" blends the scores. recency decays with the
+    age of publication_date (half_life_days) and popularity grows with
+    log(search_count); both are added on the same 0..1 scale.
+    """
+    fusion: str = "rrf"
+    text_weight: float = 1.0
+    vector_weight: float = 1.0
+    recency_weight: float = 0.0
+    popularity_weight: float = 0.0
+    half_life_days: float = 365.0
+    candidates: int = 100
+    rank_constant: int = 60
+
+    def __post_init__(self):
+        if self.fusion not in FUSION_STRATEGIES:
+            raise ValueError(f"Unknown fusion strategy '{self.fusion}', expected one of {FUSION_STRATEGIES}")
+
+def default_ranking_weights() -> RankingWeights:
+    """
+    Builds the ranking used when a request does not set its own, from environment variables
+    """
+    return RankingWeights(
+        fusion=os.getenv("RERANK_FUSION", "rrf"),
+        text_weight=float(os.getenv("RERANK_TEXT_WEIGHT", "1.0")),
+        vector_weight=float(os.getenv("RERANK_VECTOR_WEIGHT", "1.0")),
+        recency_weight=float(os.getenv("RERANK_RECENCY_WEIGHT", "0.0")),
+        popularity_weight=float(os.getenv("RERANK_POPULARITY_WEIGHT", "0.0")),
+        half_life_days=float(os.getenv("RERANK_HALF_LIFE_DAYS", "365")),
+        candidates=int(os.getenv("RERANK_CANDIDATES", "100"))
+    )
+
+def ranking_weights(overrides: Optional[Dict[str, Any]] = None) -> RankingWeights:
+    """
+    Returns the default ranking with the fields a request set replaced
+    """
+    weights = default_ranking_weights()
+    if not overrides:
+        return weights
+    return replace(weights, **{key: value for key, value in overrides.items() if value is not None})
+
+def build_candidate_bodies(
+    text_query: Dict[str, Any],
+    query_vector: np.ndarray,
+    candidates: int,
+    num_candidates: int,
+    filters: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Builds the first-stage retrievals: the top BM25 and top kNN candidates.
+    Elasticsearch returns each candidate's cosine similarity to the query as
+    a script field, so the stored vectors are not shipped back.
+    """
+    query_vector = vector_quantization.encode(query_vector)
+    source = {"excludes": ["vector", "title_completion"]}
+    script_fields = {
+        SIMILARITY_FIELD: {
+            "script": {
+                "source": "doc['vector'].size() == 0 ? -1.0 : cosineSimilarity(params.query_vector, 'vector')",
+                "params": {"query_vector": query_vector}
+            }
+        }
+    }
+    knn = {
+        "field": "vector",
+        "query_vector": query_vector,
+        "k": candidates,
+        "num_candidates": max(num_candidates, candidates),
+        **vector_quantization.knn_options()
+    }
+    if filters:
+        knn["filter"] = filters
+    return [
+        {"size": candidates, "query": with_filters(text_query, filters), "_source": source, "script_fields": script_fields},
+        {"size": candidates, "knn": knn, "_source": source, "script_fields": script_fields}
+    ]
+
+def parse_dates(values: List[Optional[str]]) -> np.ndarray:
+    """
+    Parses ISO dates and timestamps to day precision; missing or malformed values become NaT
+    """
+    days = [str(value)[:10] if value else "NaT" for value in values]
+    try:
+        return np.array(days, dtype="datetime64[D]")
+    except ValueError:
+        parsed = []
+        for day in days:
+            try:
+                parsed.append(np.datetime64(day, "D"))
+            except ValueError:
+                parsed.append(np.datetime64("NaT"))
+        return np.array(parsed, dtype="datetime64[D]")
+
+def candidate_features(
+    hit_lists: List[List[Dict[str, Any]]],
+    query_vector: np.ndarray,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Merges the retrieved hit lists into one candidate matrix. The vector
+    similarity comes from the script field when Elasticsearch computed it,
+    otherwise from the stored vector in _source.
+
+    Args:
+        hit_lists: BM25 hits first, then vector hits
+        query_vector: Query embedding
+        now: Reference time for recency (default: current UTC time)
+
+    Returns:
+        Dict: The candidate hits and one array per feature, aligned with them
+    """
+    hits: List[Dict[str, Any]] = []
+    positions: Dict[str, int] = {}
+    text_scores: List[float] = []
+    for hit in hit_lists[0] if hit_lists else []:
+        positions[hit['_id']] = len(hits)
+        hits.append(hit)
+        text_scores.append(hit.get('_score') or 0.0)
+    for hits_of_list in hit_lists[1:]:
+        for hit in hits_of_list:
+            if hit['_id'] not in positions:
+                positions[hit['_id']] = len(hits)
+                hits.append(hit)
+                text_scores.append(0.0)
+
+    count = len(hits)
+    # Not in place: the query vector is shared with the embedding cache
+    query = np.asarray(query_vector, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    similarity = np.full(count, -1.0)
+    has_vector = np.zeros(count, dtype=bool)
+    stored_rows, stored = [], []
+    for row, hit in enumerate(hits):
+        computed = hit.get('fields', {}).get(SIMILARITY_FIELD)
+        if computed and computed[0] > -1.0:
+            similarity[row] = computed[0]
+            has_vector[row] = True
+            continue
+        vector = hit['_source'].get('vector')
+        if vector is not None and len(vector) == len(query):
+            stored_rows.append(row)
+            stored.append(vector)
+
+    # Hits fetched with their vectors (local vector index): one conversion for all of them
+    if stored:
+        vectors = np.asarray(stored, dtype=np.float32)
+        norms = np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+        similarity[stored_rows] = vectors @ query / norms
+        has_vector[stored_rows] = True
+
+    text = np.asarray(text_scores, dtype=np.float64)
+    in_text = np.zeros(count, dtype=bool)
+    in_text[:len(hit_lists[0]) if hit_lists else 0] = True
+
+    today = np.datetime64((now or datetime.now(timezone.utc)).date(), "D")
+    dates = parse_dates([hit['_source'].get('publication_date') for hit in hits])
+    age_days = np.where(np.isnat(dates), np.inf, (today - dates).astype("timedelta64[D]").astype(np.float64))
+    searches = np.asarray([hit['_source'].get('search_count') or 0 for hit in hits], dtype=np.float64)
+
+    return {
+        "hits": hits,
+        "text": text,
+        "in_text": in_text,
+        "similarity": similarity,
+        "has_vector": has_vector,
+        "age_days": age_days,
+        "searches": searches
+    }
+
+def rank_positions(scores: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """
+    1-based rank of every candidate by score (ties by candidate order); absent candidates get 0
+    """
+    order = np.lexsort((np.arange(len(scores)), -scores))
+    order = order[present[order]]
+    ranks = np.zeros(len(scores), dtype=np.float64)
+    ranks[order] = np.arange(1, len(order) + 1)
+    return ranks
+
+def fuse(features: Dict[str, Any], weights: RankingWeights) -> np.ndarray:
+    """
+    Scores the candidate matrix with the fusion strategy plus the recency
+    and popularity terms
+    """
+    text, similarity = features["text"], features["similarity"]
+    if weights.fusion == "rrf":
+        # Weighted reciprocal ranks, scaled so a candidate ranked first everywhere scores 1
+        total = 0.0
+        score = np.zeros(len(text))
+        for weight, values, present in (
+            (weights.text_weight, text, features["in_text"]),
+            (weights.vector_weight, similarity, features["has_vector"])
+        ):
+            ranks = rank_positions(values, present)
+            score += weight * np.where(ranks > 0, 1.0 / (weights.rank_constant + ranks), 0.0)
+            total += weight / (weights.rank_constant + 1)
+        score /= max(total, 1e-12)
+    else:
+        max_text = text.max() if len(text) and text.max() > 0 else 1.0
+        score = (
+            weights.text_weight * text / max_text
+            + weights.vector_weight * np.where(features["has_vector"], (similarity + 1.0) / 2.0, 0.0)
+        )
+
+    if weights.recency_weight:
+        decay = math.log(2) / weights.half_life_days
+        age = np.clip(features["age_days"], 0.0, None)
+        score = score + weights.recency_weight * np.exp(-decay * age)
+    if weights.popularity_weight:
+        popularity = np.log1p(features["searches"])
+        peak = popularity.max() if len(popularity) else 0.0
+        if peak > 0:
+            score = score + weights.popularity_weight * popularity / peak
+    return score
+
+def rerank(
+    hit_lists: List[List[Dict[str, Any]]],
+    query_vector: np.ndarray,
+    weights: RankingWeights,
+    size: int,
+    now: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """
+    Re-ranks the first-stage candidates and returns the top hits with the
+    fused score as _score. Ties keep the BM25-then-kNN candidate order.
+    """
+    features = candidate_features(hit_lists, query_vector, now)
+    if not features["hits"]:
+        return []
+    scores = fuse(features, weights)
+    order = np.lexsort((np.arange(len(scores)), -scores))[:size]
+    return [{**features["hits"][row], '_score': float(scores[row])} for row in order.tolist()]
@@ -0,0 +1,270 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Protocol, Tuple
+import hashlib
+import json
+import logging
+import os
+import time
+
+from .metrics import record_cache
+
+GENERATION_KEY = "indexify:index_generation"
+
+# Parameters matched through analyzed text fields, where case does not change results
+CASE_INSENSITIVE_PARAMS = {"query", "title", "content"}
+
+class IndexGeneration:
+    """
+    Counter bumped every time documents are written to the index.
+    Cached results from an older generation are never served.
+    """
+
+    def __init__(self):
+        self.value = 0
+
+    def bump(self):
+        self.value += 1
+
+index_generation = IndexGeneration()
+
+class SharedCacheBackend(Protocol):
+    """
+    Subset of the redis.asyncio client used by the shared cache tier
+    """
+
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None) -> Any: ...
+
+    async def incrby(self, key: str, amount: int = 1) -> int: ...
+
+class InMemorySharedCache:
+    """
+    Local stand-in for a Redis-compatible shared tier (tests, benchmarks,
+    single-process deployments)
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    async def incrby(self, key: str, amount: int = 1) -> int:
+        current = int(await self.get(key) or 0) + amount
+        self._data[key] = (str(current).encode("utf-8"), None)
+        return current
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    stale_writes: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_writes": self.stale_writes
+        }
+
+def normalize_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalizes request parameters so equivalent requests share a cache key
+    """
+    normalized = {}
+    for key, value in params.items():
+        if value is None or value == []:
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.split())
+            if key in CASE_INSENSITIVE_PARAMS:
+                value = value.lower()
+        elif isinstance(value, (list, tuple)):
+            value = sorted(str(item) for item in value)
+        elif hasattr(value, "isoformat"):
+            value = value.isoformat()
+        normalized[key] = value
+    return normalized
+
+class ResultCache:
+    """
+    Two-tier cache for search results.
+
+    The first tier is an in-process LRU with a TTL; the optional second
+    tier is shared between workers through a Redis-compatible backend.
+    Entries are tagged with the index generation, so any write to the
+    index invalidates every cached result at once.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 60.0,
+        shared: Optional[SharedCacheBackend] = None,
+        shared_ttl: int = 300,
+        generation: IndexGeneration = index_generation
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.generation = generation
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._published_generation = generation.value
+
+    @staticmethod
+    def make_key(namespace: str, params: Dict[str, Any]) -> str:
+        payload = json.dumps(normalize_params(params), sort_keys=True, default=str)
+        return f"{namespace}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+    async def current_generation(self) -> int:
+        """
+        Returns the generation entries must match. With a shared tier,
+        local bumps are published first so every worker sees them.
+        """
+        if self.shared is None:
+            return self.generation.value
+        try:
+            delta = self.generation.value - self._published_generation
+            if delta:
+                generation = await self.shared.incrby(GENERATION_KEY, delta)
+                self._published_generation += delta
+                return generation
+            return int(await self.shared.get(GENERATION_KEY) or 0)
+        except Exception as e:
+            logging.error(f"Error reading shared index generation: {str(e)}")
+            return self.generation.value
+
+    async def get(self, namespace: str, params: Dict[str, Any]) -> Optional[Any]:
+        value, _ = await self.lookup(namespace, params)
+        return value
+
+    async def lookup(self, namespace: str, params: Dict[str, Any]) -> Tuple[Optional[Any], int]:
+        """
+        Returns the cached value (or None) and the index generation it was
+        looked up at. Pass the generation to set() when storing the result
+        computed after a miss, so it is dropped if the index changed meanwhile.
+        """
+        key = self.make_key(namespace, params)
+        generation = await self.current_generation()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at, entry_generation = entry
+            if entry_generation != generation:
+                del self._entries[key]
+                self.stats.invalidations += 1
+            elif expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+            else:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                record_cache("result", "hit")
+                return value, generation
+
+        if self.shared is not None:
+            try:
+                raw = await self.shared.get(f"indexify:{generation}:{key}")
+            except Exception as e:
+                logging.error(f"Error reading shared result cache: {str(e)}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._put_local(key, value, generation)
+                self.stats.shared_hits += 1
+                record_cache("result", "shared_hit")
+                return value, generation
+
+        self.stats.misses += 1
+        record_cache("result", "miss")
+        return None, generation
+
+    def _put_local(self, key: str, value: Any, generation: int):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl, generation)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def set(self, namespace: str, params: Dict[str, Any], value: Any, generation: Optional[int] = None):
+        """
+        Stores a result. With the generation returned by lookup(), a result
+        computed while documents were written is not stored: it may predate
+        the write and would otherwise be served as current.
+        """
+        key = self.make_key(namespace, params)
+        current = await self.current_generation()
+        if generation is not None and generation != current:
+            self.stats.stale_writes += 1
+            return
+        generation = current
+        self._put_local(key, value, generation)
+
+        if self.shared is not None:
+            try:
+                await self.shared.set(
+                    f"indexify:{generation}:{key}",
+                    json.dumps(value, default=str).encode("utf-8"),
+                    ex=self.shared_ttl
+                )
+            except Exception as e:
+                logging.error(f"Error writing shared result cache: {str(e)}")
+
+def create_shared_backend() -> Optional[SharedCacheBackend]:
+    """
+    Connects to the shared tier configured by RESULT_CACHE_REDIS_URL.
+    "memory://" selects the in-process stand-in.
+    """
+    url = os.getenv("RESULT_CACHE_REDIS_URL")
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemorySharedCache()
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        logging.error("RESULT_CACHE_REDIS_URL is set but the redis package is not installed")
+        return None
+    return redis.from_url(url)
+
+def create_result_cache() -> ResultCache:
+    """
+    Builds a ResultCache configured from environment variables
+    """
+    return ResultCache(
+        max_entries=int(os.getenv("RESULT_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("RESULT_CACHE_TTL", "60")),
+        shared=create_shared_backend(),
+        shared_ttl=int(os.getenv("RESULT_CACHE_SHARED_TTL", "300"))
+    )
+
+result_cache = create_result_cache()
@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Optional
+import hashlib
+import logging
+import os
+import time
+import zlib
+
+import numpy as np
+
+MAGIC = 0x454D4243  # "EMBC"
+HEADER = np.dtype([("magic", "<u4"), ("dims", "<u4"), ("slots", "<u8"), ("ways", "<u4"), ("clock", "<u4")])
+
+def slot_dtype(dims: int) -> np.dtype:
+    return np.dtype([("key", "<u8"), ("checksum", "<u4"), ("stamp", "<u4"), ("vector", "<f4", (dims,))])
+
+def key_hash(key: str) -> int:
+    # 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+def slot_checksum(hashed: int, vector: np.ndarray) -> int:
+    """
+    CRC of the key hash and the vector together, so a slot whose key and
+    vector were published by two interleaved writers never validates
+    """
+    return zlib.crc32(vector.tobytes(), zlib.crc32(hashed.to_bytes(8, "little")))
+
+@dataclass
+class SharedCacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    torn_reads: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "torn_reads": self.torn_reads
+        }
+
+class SharedEmbeddingCache:
+    """
+    Fixed-size embedding cache in a named shared-memory segment, so every
+    worker process on the host reads the vectors any of them computed.
+
+    The segment is a set-associative table: a key hashes to a set of
+    `ways` slots and a full set overwrites its least recently written
+    slot. There are no cross-process locks. A writer clears the slot key,
+    writes the vector and the CRC of key and vector, then publishes the key;
+    a reader copies the vector and only trusts it if the key still matches
+    and the CRC covers that key and vector, so a read racing with a write,
+    or a slot left with one writer's key and another's vector, is a miss,
+    never a wrong vector.
+
+    The first process to open a name creates the segment; the others
+    attach to it. Only the creator unlinks it on close.
+    """
+
+    def __init__(self, name: str, dims: int = 384, slots: int = 65536, ways: int = 8):
+        self.name = name
+        self.ways = ways
+        self.stats = SharedCacheStats()
+        slots = max(ways, slots - slots % ways)
+        size = HEADER.itemsize + slots * slot_dtype(dims).itemsize
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.owner = True
+        except FileExistsError:
+            self._shm = self._attach(name)
+            self.owner = False
+        # Workers share their parent's resource tracker, which would unlink
+        # the segment as soon as one of them exits; the owner unlinks it instead
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+
+        header = np.ndarray((1,), dtype=HEADER, buffer=self._shm.buf)
+        if self.owner:
+            header[0] = (0, dims, slots, ways, 0)
+            header["magic"] = MAGIC
+        else:
+            self._wait_for_header(header)
+            stored_dims = int(header["dims"][0])
+            if stored_dims != dims:
+                del header
+                self._shm.close()
+                raise ValueError(f"Segment '{name}' holds {stored_dims}-dim vectors, expected {dims}")
+            slots, ways = int(header["slots"][0]), int(header["ways"][0])
+            self.ways = ways
+        self._header = header
+        self.dims = dims
+        self.slots = slots
+        self._table = np.ndarray((slots // ways, ways), dtype=slot_dtype(dims), buffer=self._shm.buf, offset=HEADER.itemsize)
+
+    @staticmethod
+    def _attach(name: str, timeout: float = 5.0) -> shared_memory.SharedMemory:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+                break
+            except ValueError:
+                # The creator has not sized the segment yet
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+        return shm
+
+    @staticmethod
+    def _wait_for_header(header: np.ndarray, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while header["magic"][0] != MAGIC:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Shared embedding cache segment was never initialized")
+            time.sleep(0.01)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        hashed = key_hash(key)
+        row = self._table[hashed % len(self._table)]
+        for way in np.flatnonzero(row["key"] == hashed):
+            vector = row["vector"][way].copy()
+            if row["key"][way] == hashed and row["checksum"][way] == slot_checksum(hashed, vector):
+                self.stats.hits += 1
+                return vector
+            self.stats.torn_reads += 1
+        self.stats.misses += 1
+        return None
+
+    def put(self, key: str, vector: np.ndarray):
+        hashed = key_hash(key)
+        row = self._table[hashed % len(self._table)]
+        matches = np.flatnonzero(row["key"] == hashed)
+        way = int(matches[0]) if len(matches) else int(np.argmin(row["stamp"]))
+        values = np.asarray(vector, dtype=np.float32)
+        # Processes may race on the clock; an approximate recency is enough for eviction
+        clock = (int(self._header["clock"][0]) + 1) & 0xFFFFFFFF
+        self._header["clock"] = clock
+        row["key"][way] = 0
+        row["vector"][way] = values
+        row["checksum"][way] = slot_checksum(hashed, values)
+        row["stamp"][way] = clock
+        row["key"][way] = hashed
+        self.stats.writes += 1
+
+    def occupancy(self) -> int:
+        return int(np.count_nonzero(self._table["key"]))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "slots": self.slots,
+            "ways": self.ways,
+            "size_mb": self._shm.size / 1024 / 1024,
+            "occupied": self.occupancy(),
+            **self.stats.to_dict()
+        }
+
+    def close(self):
+        self._table = None
+        self._header = None
+        self._shm.close()
+        if self.owner:
+            try:
+                # unlink() unregisters the name again
+                resource_tracker.register(self._shm._name, "shared_memory")
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+def create_shared_embedding_cache(dims: int = 384) -> Optional[SharedEmbeddingCache]:
+    """
+    Opens the segment named by EMBEDDING_SHARED_CACHE, if set
+    """
+    name = os.getenv("EMBEDDING_SHARED_CACHE")
+    if not name:
+        return None
+    try:
+        cache = SharedEmbeddingCache(
+            name,
+            dims=dims,
+            slots=int(os.getenv("EMBEDDING_SHARED_CACHE_SLOTS", "65536")),
+            ways=int(os.getenv("EMBEDDING_SHARED_CACHE_WAYS", "8"))
+        )
+    except Exception as e:
+        logging.error(f"Error opening shared embedding cache '{name}': {str(e)}")
+        return None
+    logging.info(f"{'Created' if cache.owner else 'Attached to'} shared embedding cache '{name}' ({cache.slots} slots)")
+    return cache
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+import asyncio
+import json
+import logging
+import os
+import time
+
+from .metrics import record_coalesced
+from .result_cache import IndexGeneration, index_generation, normalize_params
+
+T = TypeVar("T")
+
+@dataclass
+class CoalescingStats:
+    leaders: int = 0
+    coalesced: int = 0
+    window_hits: int = 0
+    errors: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        calls = self.leaders + self.coalesced + self.window_hits
+        return {
+            "calls": calls,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "window_hits": self.window_hits,
+            "absorbed_rate": (self.coalesced + self.window_hits) / calls if calls else 0.0,
+            "errors": self.errors
+        }
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent requests: the first caller for a key
+    (the leader) runs the work and every caller that arrives while it is
+    in flight awaits the same result instead of repeating it.
+
+    With a window, a successful result keeps answering the key for that
+    many seconds after it finished, which also absorbs requests that
+    arrive just after the leader. Results from before an index write are
+    not reused. Errors are shared with the callers already waiting but
+    never kept.
+
+    The work runs in its own task, so a leader whose client disconnects
+    does not cancel it for the others.
+    """
+
+    def __init__(self, window: float = 0.0, enabled: bool = True, generation: IndexGeneration = index_generation):
+        self.window = window
+        self.enabled = enabled
+        self.generation = generation
+        self.stats: Dict[str, CoalescingStats] = {}
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._recent: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(namespace: str, params: Dict[str, Any], normalize: bool = True) -> str:
+        params = normalize_params(params) if normalize else params
+        return f"{namespace}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    def _stats(self, namespace: str) -> CoalescingStats:
+        stats = self.stats.get(namespace)
+        if stats is None:
+            stats = self.stats[namespace] = CoalescingStats()
+        return stats
+
+    def _recent_result(self, key: str) -> Tuple[bool, Any]:
+        now = time.monotonic()
+        # Entries share one window, so the oldest expire first
+        while self._recent:
+            oldest_key, (_, expires_at, _) = next(iter(self._recent.items()))
+            if expires_at > now:
+                break
+            del self._recent[oldest_key]
+        entry = self._recent.get(key)
+        if entry is None or entry[2] != self.generation.value:
+            return False, None
+        return True, entry[0]
+
+    def _finish(self, key: str, generation: int, task: asyncio.Task):
+        self._in_flight.pop(key, None)
+        if self.window > 0 and not task.cancelled() and task.exception() is None:
+            self._recent.pop(key, None)
+            self._recent[key] = (task.result(), time.monotonic() + self.window, generation)
+
+    async def do(
+        self,
+        namespace: str,
+        params: Dict[str, Any],
+        work: Callable[[], Awaitable[T]],
+        normalize: bool = True
+    ) -> T:
+        """
+        Returns the result of work() for the request, shared with identical concurrent requests.
+
+        Args:
+            namespace: Request type ("search", "suggestions", ...), kept in the stats
+            params: Request parameters; equivalent spellings share a key (see normalize_params)
+            work: Zero-argument coroutine factory computing the result
+            normalize: Normalize the parameters; off where case or spacing changes the result
+
+        Returns:
+            The result of the leader's work() call
+        """
+        if not self.enabled:
+            return await work()
+
+        key = self.make_key(namespace, params, normalize)
+        stats = self._stats(namespace)
+        if self.window > 0:
+            found, value = self._recent_result(key)
+            if found:
+                stats.window_hits += 1
+                record_coalesced(namespace, "window")
+                return value
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            stats.coalesced += 1
+            record_coalesced(namespace, "in_flight")
+        else:
+            stats.leaders += 1
+            task = asyncio.ensure_future(work())
+            self._in_flight[key] = task
+            generation = self.generation.value
+            task.add_done_callback(lambda done: self._finish(key, generation, done))
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "in_flight": len(self._in_flight),
+            "namespaces": {namespace: stats.to_dict() for namespace, stats in sorted(self.stats.items())}
+        }
+
+def create_singleflight() -> SingleFlight:
+    """
+    Builds a SingleFlight configured from environment variables
+    """
+    window = float(os.getenv("COALESCE_WINDOW_MS", "0")) / 1000
+    enabled = os.getenv("COALESCE_ENABLED", "true").lower() == "true"
+    if enabled and window:
+        logging.info(f"Coalescing identical requests with a {window * 1000:.0f}ms window")
+    return SingleFlight(window=window, enabled=enabled)
+
+singleflight = create_singleflight()
@@ -0,0 +1,263 @@
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from elasticsearch.helpers import async_streaming_bulk, scan, streaming_bulk
+from fastapi import Request
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+# Painless script applied to existing stats documents; new ones come from the upsert.
+# is_trending is owned by the trending tracker's snapshots.
+STATS_UPSERT_SCRIPT = """
+    ctx._source.count += params.n;
+    if (ctx._source.last_searched == null || ctx._source.last_searched.compareTo(params.now) < 0) {
+        ctx._source.last_searched = params.now;
+    }
+"""
+
+def normalize_stats_query(query: str) -> str:
+    """
+    Normalizes a query the same way for every writer of the stats index
+    (search counts and trending snapshots), so they update one document
+    """
+    return " ".join(query.lower().split())
+
+def stats_document_id(query: str) -> str:
+    """
+    Uses the normalized query as the stats document id, hashing queries
+    that exceed the Elasticsearch id length limit
+    """
+    if len(query.encode("utf-8")) <= 512:
+        return query
+    return hashlib.sha1(query.encode("utf-8")).hexdigest()
+
+def plan_stats_collapse(hits: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Groups stats documents by normalized query and merges each group that
+    is not already one document under its stats_document_id: counts are
+    summed, the latest last_searched is kept, and the trending fields come
+    from the document the trending tracker wrote, if any.
+
+    Returns:
+        Tuple[List[Dict], List[str]]: The merged documents (with their "_id")
+        and the ids of the documents they replace
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for hit in hits:
+        key = normalize_stats_query(hit["_source"].get("query") or "")
+        if key:
+            groups.setdefault(key, []).append(hit)
+
+    documents, replaced = [], []
+    for key, group in groups.items():
+        doc_id = stats_document_id(key)
+        if len(group) == 1 and group[0]["_id"] == doc_id and group[0]["_source"].get("query") == key:
+            continue
+        current = next((hit["_source"] for hit in group if hit["_id"] == doc_id), {})
+        dates = [hit["_source"]["last_searched"] for hit in group if hit["_source"].get("last_searched")]
+        documents.append({
+            **current,
+            "_id": doc_id,
+            "query": key,
+            "count": sum(hit["_source"].get("count") or 0 for hit in group),
+            "last_searched": max(dates) if dates else None,
+            "is_trending": any(hit["_source"].get("is_trending") for hit in group)
+        })
+        replaced.extend(hit["_id"] for hit in group if hit["_id"] != doc_id)
+    return documents, replaced
+
+def collapse_stats_documents(client: Elasticsearch, index_name: str, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Migrates a stats index written before documents were keyed by query:
+    every query ends up in one document under its stats_document_id, so
+    the aggregator's upserts and the trending snapshots update it instead
+    of adding a second one. Run it with the backend stopped, as counts
+    flushed meanwhile to a merged query would be overwritten.
+
+    Returns:
+        Dict: Documents scanned, queries merged, replaced ids and bulk errors
+    """
+    started = time.perf_counter()
+    stats_index = f"{index_name}_stats"
+    hits = list(scan(client, index=stats_index, query={"query": {"match_all": {}}}))
+    documents, replaced = plan_stats_collapse(hits)
+    report = {"documents": len(hits), "queries": len(documents), "replaced": replaced, "errors": 0}
+    if dry_run:
+        return report
+
+    def actions():
+        for document in documents:
+            source = {key: value for key, value in document.items() if key != "_id"}
+            yield {"_op_type": "index", "_index": stats_index, "_id": document["_id"], "_source": source}
+        for doc_id in replaced:
+            yield {"_op_type": "delete", "_index": stats_index, "_id": doc_id}
+
+    for ok, item in streaming_bulk(client, actions(), raise_on_error=False, raise_on_exception=False, refresh=True):
+        if not ok:
+            report["errors"] += 1
+            logging.error(f"Error collapsing search statistics: {item}")
+    report["seconds"] = time.perf_counter() - started
+    logging.info(
+        f"Collapsed {len(hits)} stats documents into {len(documents)} merged queries "
+        f"({len(replaced)} replaced) in {report['seconds']:.1f}s"
+    )
+    return report
+
+class SearchStatsAggregator:
+    """
+    Counts searches in memory and writes them behind the request path.
+
+    record() is a dict increment; pending counts are flushed as one bulk
+    request of scripted upserts every flush_interval seconds, when
+    max_pending distinct queries are waiting, and on shutdown.
+    """
+
+    def __init__(
+        self,
+        client: AsyncElasticsearch,
+        index_name: str,
+        flush_interval: float = 5.0,
+        max_pending: int = 1000
+    ):
+        self.client = client
+        self.stats_index = f"{index_name}_stats"
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._counts: Dict[str, int] = {}
+        self._last_searched: Dict[str, datetime] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._threshold_flush: Optional[asyncio.Task] = None
+
+    def record(self, query: str):
+        """
+        Counts one search for a query
+        """
+        key = normalize_stats_query(query)
+        if not key:
+            return
+        self._counts[key] = self._counts.get(key, 0) + 1
+        self._last_searched[key] = datetime.utcnow()
+
+        if len(self._counts) >= self.max_pending and (
+            self._threshold_flush is None or self._threshold_flush.done()
+        ):
+            self._threshold_flush = asyncio.get_running_loop().create_task(self.flush())
+
+    @property
+    def pending(self) -> int:
+        return sum(self._counts.values())
+
+    def _build_actions(self, counts: Dict[str, int], last_searched: Dict[str, datetime]) -> List[dict]:
+        actions = []
+        for query, n in counts.items():
+            now = last_searched[query].isoformat()
+            actions.append({
+                "_op_type": "update",
+                "_index": self.stats_index,
+                "_id": stats_document_id(query),
+                "retry_on_conflict": 3,
+                "script": {
+                    "source": STATS_UPSERT_SCRIPT,
+                    "lang": "painless",
+                    "params": {"n": n, "now": now}
+                },
+                "upsert": {
+                    "query": query,
+                    "count": n,
+                    "last_searched": now,
+                    "is_trending": False
+                }
+            })
+        return actions
+
+    async def flush(self) -> int:
+        """
+        Writes pending counts in a single bulk request.
+
+        Returns:
+            int: Number of searches flushed
+        """
+        async with self._flush_lock:
+            if not self._counts:
+                return 0
+
+            # Swap the buffers so new searches keep counting during the flush
+            counts, self._counts = self._counts, {}
+            last_searched, self._last_searched = self._last_searched, {}
+            queries = list(counts.keys())
+
+            flushed = 0
+            position = 0
+            failed: Dict[str, int] = {}
+            try:
+                async for ok, item in async_streaming_bulk(
+                    self.client,
+                    self._build_actions(counts, last_searched),
+                    raise_on_error=False,
+                    raise_on_exception=False
+                ):
+                    query = queries[position]
+                    position += 1
+                    if ok:
+                        flushed += counts[query]
+                    else:
+                        failed[query] = counts[query]
+                        logging.error(f"Error flushing search statistics for '{query}': {item}")
+            except Exception as e:
+                logging.error(f"Error flushing search statistics: {str(e)}")
+                for query in queries[position:]:
+                    failed[query] = counts[query]
+
+            # Failed counts go back to the buffer so they are retried on the next flush
+            for query, n in failed.items():
+                self._counts[query] = self._counts.get(query, 0) + n
+                self._last_searched.setdefault(query, last_searched[query])
+
+            logging.info(f"Flushed {flushed} searches for {len(counts) - len(failed)} queries")
+            return flushed
+
+    async def _run_flusher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """
+        Starts the periodic flush task
+        """
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._run_flusher())
+
+    async def stop(self):
+        """
+        Stops the periodic flush and writes any pending counts
+        """
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+def create_stats_aggregator(client: AsyncElasticsearch, index_name: str) -> SearchStatsAggregator:
+    """
+    Builds a SearchStatsAggregator configured from environment variables
+    """
+    return SearchStatsAggregator(
+        client=client,
+        index_name=index_name,
+        flush_interval=float(os.getenv("STATS_FLUSH_INTERVAL", "5")),
+        max_pending=int(os.getenv("STATS_MAX_PENDING", "1000"))
+    )
+
+async def get_stats_aggregator(request: Request) -> SearchStatsAggregator:
+    """
+    FastAPI dependency returning the application-wide stats aggregator
+    """
+    return request.app.state.stats_aggregator
@@ -0,0 +1,321 @@
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import heapq
+import logging
+import os
+import time
+
+from .suggestions import SearchSuggestion
+from .trending import TrendingTracker, trending_tracker
+
+def normalize_suggestion_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+class _Entry:
+    """
+    A suggestion candidate: a searched query, a document title or both
+    """
+
+    __slots__ = ("text", "key", "count", "score", "title")
+
+    def __init__(self, text: str, key: str, title: bool = False):
+        self.text = text
+        self.key = key
+        self.count = 0
+        # Forward-decayed search weight in the trending tracker's scale
+        self.score = 0.0
+        # Titles are kept until restart; query-only entries can be evicted
+        self.title = title
+
+    def ranks_before(self, other: "_Entry") -> bool:
+        if self.score != other.score:
+            return self.score > other.score
+        if self.count != other.count:
+            return self.count > other.count
+        return self.key < other.key
+
+def _rank_key(entry: _Entry) -> Tuple[float, int, str]:
+    # Sort key matching _Entry.ranks_before
+    return (-entry.score, -entry.count, entry.key)
+
+class _Node:
+    __slots__ = ("children", "top", "keys")
+
+    def __init__(self):
+        self.children: Optional[Dict[str, "_Node"]] = None
+        self.top: List[_Entry] = []
+        # Keys inserted through this node; it is pruned when evictions bring it to zero
+        self.keys = 0
+
+class SuggestionIndex:
+    """
+    In-process prefix trie answering /api/suggestions without network I/O.
+
+    Every node keeps its top_k entries ordered by time-decayed search score
+    (then lifetime count), so a lookup is a walk of len(prefix) nodes plus a
+    slice. Entries come from the stats stream (full query prefixes) and
+    from indexed documents (the start of each title word and each keyword,
+    like the phrase_prefix query it replaces). Scores use the trending
+    tracker's forward decay, so they only grow and the per-node top-k stays
+    exact under incremental updates.
+
+    Keys are cut at max_key_length characters to bound memory; longer
+    prefixes walk to that depth and filter the node's candidates. Once
+    max_queries distinct queries are held, new ones are only admitted when
+    the trending tracker counts them among its heavy hitters, and each one
+    admitted evicts the lowest scoring query, so there are never more than
+    max_queries of them. Once max_titles titles are held, further titles
+    are skipped.
+    """
+
+    def __init__(
+        self,
+        top_k: int = 10,
+        max_key_length: int = 32,
+        max_title_words: int = 6,
+        max_queries: int = 100000,
+        max_titles: int = 100000,
+        trending: Optional[TrendingTracker] = None
+    ):
+        self.top_k = top_k
+        self.max_key_length = max_key_length
+        self.max_title_words = max_title_words
+        self.max_queries = max_queries
+        self.max_titles = max_titles
+        self.trending = trending or trending_tracker
+        self.trending.on_rescale(self._rescale)
+        self.ready = False
+        self._root = _Node()
+        self._entries: Dict[str, _Entry] = {}
+        self._queries = 0
+        self._titles = 0
+        self._nodes = 1
+        # Min-heap of (score, count, key) pushed on every query update; items
+        # that no longer match their entry are skipped and compacted away
+        self._query_heap: List[Tuple[float, int, str]] = []
+
+    def _rescale(self, factor: float):
+        # Multiplying every score by the same factor keeps all top-k lists and the heap in order
+        for entry in self._entries.values():
+            entry.score *= factor
+        self._query_heap = [(score * factor, count, key) for score, count, key in self._query_heap]
+
+    def _update_top(self, node: _Node, entry: _Entry):
+        top = node.top
+        if entry in top:
+            position = top.index(entry)
+        elif len(top) < self.top_k:
+            top.append(entry)
+            position = len(top) - 1
+        elif entry.ranks_before(top[-1]):
+            top[-1] = entry
+            position = len(top) - 1
+        else:
+            return
+
+        # Counts only grow, so an entry can only move towards the front
+        while position > 0 and entry.ranks_before(top[position - 1]):
+            top[position], top[position - 1] = top[position - 1], entry
+            position -= 1
+
+    def _insert(self, key: str, entry: _Entry, new: bool = False):
+        node = self._root
+        self._update_top(node, entry)
+        for char in key[:self.max_key_length]:
+            if node.children is None:
+                node.children = {}
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+                self._nodes += 1
+            node = child
+            if new:
+                node.keys += 1
+            self._update_top(node, entry)
+
+    def _subtree_size(self, node: _Node) -> int:
+        return 1 + sum(self._subtree_size(child) for child in (node.children or {}).values())
+
+    def _refill_top(self, node: _Node):
+        # The best remaining entries below a node are in the top lists of its children
+        candidates = {id(entry): entry for entry in node.top}
+        for child in (node.children or {}).values():
+            candidates.update((id(entry), entry) for entry in child.top)
+        node.top = sorted(candidates.values(), key=_rank_key)[:self.top_k]
+
+    def _remove_query(self, entry: _Entry):
+        """
+        Drops a query-only entry from the trie, pruning the nodes no other key uses
+        """
+        del self._entries[entry.key]
+        self._queries -= 1
+        path = [self._root]
+        for char in entry.key[:self.max_key_length]:
+            parent = path[-1]
+            child = parent.children[char]
+            child.keys -= 1
+            if child.keys == 0:
+                del parent.children[char]
+                self._nodes -= self._subtree_size(child)
+                break
+            path.append(child)
+        for node in reversed(path):
+            if entry in node.top:
+                full = len(node.top) == self.top_k
+                node.top.remove(entry)
+                if full:
+                    self._refill_top(node)
+
+    def _evict_queries(self):
+        while self._queries > self.max_queries and self._query_heap:
+            score, count, key = heapq.heappop(self._query_heap)
+            entry = self._entries.get(key)
+            # Stale items: the entry was evicted, became a title or was searched again
+            if entry is None or entry.title or entry.score != score or entry.count != count:
+                continue
+            self._remove_query(entry)
+        if len(self._query_heap) > 2 * self._queries + 1024:
+            self._query_heap = [
+                (entry.score, entry.count, entry.key) for entry in self._entries.values() if not entry.title
+            ]
+            heapq.heapify(self._query_heap)
+
+    def _title_keys(self, title: str, keywords: Iterable[str]) -> List[str]:
+        words = normalize_suggestion_text(title).split()
+        keys = [" ".join(words[position:]) for position in range(min(len(words), self.max_title_words))]
+        keys.extend(normalize_suggestion_text(keyword) for keyword in keywords)
+        return [key for key in dict.fromkeys(keys) if key]
+
+    def add_query(self, query: str, count: int = 1, score: Optional[float] = None):
+        """
+        Counts searches for a query and refreshes its rank on every prefix.
+
+        Args:
+            query: The searched text
+            count: Number of searches to add to the lifetime count
+            score: Scaled trending weight to add; defaults to count searches made now
+        """
+        key = normalize_suggestion_text(query)
+        if not key:
+            return
+        entry = self._entries.get(key)
+        new = entry is None
+        if new:
+            if self._queries >= self.max_queries and not self.trending.tracks(key):
+                return
+            entry = self._entries[key] = _Entry(query.strip(), key)
+            self._queries += 1
+        entry.count += count
+        entry.score += count * self.trending.weight() if score is None else score
+        self._insert(entry.key, entry, new)
+        if not entry.title:
+            heapq.heappush(self._query_heap, (entry.score, entry.count, key))
+            self._evict_queries()
+
+    def add_document(self, document: Dict[str, Any]):
+        """
+        Makes a document title reachable from its words and keywords
+        """
+        title = document.get("title") or ""
+        key = normalize_suggestion_text(title)
+        if not key:
+            return
+        entry = self._entries.get(key)
+        if entry is None or not entry.title:
+            if self._titles >= self.max_titles:
+                return
+            if entry is None:
+                entry = self._entries[key] = _Entry(title.strip(), key)
+            else:
+                # A searched query becomes a title, which is no longer evicted
+                self._queries -= 1
+            entry.title = True
+            self._titles += 1
+        for key in self._title_keys(title, document.get("keywords") or []):
+            self._insert(key, entry, new=True)
+
+    def add_documents(self, documents: Iterable[Dict[str, Any]]):
+        for document in documents:
+            self.add_document(document)
+
+    def suggest(self, prefix: str, size: int = 5) -> List[SearchSuggestion]:
+        """
+        Returns up to size suggestions for a prefix, most searched first
+        """
+        key = normalize_suggestion_text(prefix)
+        if not key:
+            return []
+
+        node = self._root
+        for char in key[:self.max_key_length]:
+            if node.children is None or char not in node.children:
+                return []
+            node = node.children[char]
+
+        candidates = node.top
+        if len(key) > self.max_key_length:
+            candidates = [entry for entry in candidates if key in entry.key]
+        return [
+            SearchSuggestion(
+                text=entry.text,
+                count=entry.count,
+                trending=self.trending.is_trending(entry.score)
+            )
+            for entry in candidates[:size]
+        ]
+
+    async def load(self, client: AsyncElasticsearch, index_name: str):
+        """
+        Builds the trie from the stats index and the indexed titles, then
+        marks it ready. Updates that arrive while loading are kept.
+        """
+        started = time.perf_counter()
+        try:
+            async for hit in async_scan(
+                client, index=f"{index_name}_stats", query={"_source": ["query", "count", "trending_rank"]}
+            ):
+                source = hit["_source"]
+                rank = source.get("trending_rank")
+                self.add_query(
+                    source["query"],
+                    source.get("count", 0),
+                    score=self.trending.from_rank(rank) if rank is not None else 0.0
+                )
+
+            async for hit in async_scan(
+                client, index=index_name, query={"_source": ["title", "keywords"]}
+            ):
+                self.add_document(hit["_source"])
+
+            self.ready = True
+            logging.info(
+                f"Suggestion index loaded: {len(self._entries)} entries, {self._nodes} nodes "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        except Exception as e:
+            logging.error(f"Error loading suggestion index: {str(e)}")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "entries": len(self._entries),
+            "queries": self._queries,
+            "titles": self._titles,
+            "nodes": self._nodes,
+            "top_k": self.top_k
+        }
+
+def create_suggestion_index() -> SuggestionIndex:
+    """
+    Builds a SuggestionIndex configured from environment variables
+    """
+    return SuggestionIndex(
+        top_k=int(os.getenv("SUGGESTION_TOP_K", "10")),
+        max_key_length=int(os.getenv("SUGGESTION_MAX_KEY_LENGTH", "32")),
+        max_title_words=int(os.getenv("SUGGESTION_MAX_TITLE_WORDS", "6")),
+        max_queries=int(os.getenv("SUGGESTION_MAX_QUERIES", "100000")),
+        max_titles=int(os.getenv("SUGGESTION_MAX_TITLES", "100000"))
+    )
+
+suggestion_index = create_suggestion_index()
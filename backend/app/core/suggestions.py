@@ -1,8 +1,10 @@
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, AsyncElasticsearch
 from typing import List, Dict, Any
 import logging
 from dataclasses import dataclass
 from datetime import datetime
+from .query_dsl import STATS_FIELDS, prefix, term
+from .stats_aggregator import normalize_stats_query, stats_document_id
 
 @dataclass
 class SearchSuggestion:
@@ -17,6 +19,32 @@ class SearchSuggestion:
             "trending": self.trending
         }
 
+def build_stats_update(existing_stats: Dict[str, Any], query: str, now: datetime) -> Dict[str, Any]:
+    """
+    Builds the update or index request for a query given its current stats hit
+    """
+    if existing_stats['hits']['hits']:
+        doc_id = existing_stats['hits']['hits'][0]['_id']
+        current_count = existing_stats['hits']['hits'][0]['_source']['count']
+        return {
+            "id": doc_id,
+            "body": {
+                "doc": {
+                    "count": current_count + 1,
+                    "last_searched": now
+                }
+            }
+        }
+    return {
+        "id": stats_document_id(normalize_stats_query(query)),
+        "document": {
+            "query": normalize_stats_query(query),
+            "count": 1,
+            "last_searched": now,
+            "is_trending": False
+        }
+    }
+
 def update_search_stats(client: Elasticsearch, index_name: str, query: str):
     """
     Updates search statistics
@@ -28,37 +56,106 @@ def update_search_stats(client: Elasticsearch, index_name: str, query: str):
         existing_stats = client.search(
             index=stats_index,
             body={
-                "query": {"term": {"query.keyword": query.lower()}}
+                "query": term("query", normalize_stats_query(query), fields=STATS_FIELDS)
             }
         )
 
-        if existing_stats['hits']['hits']:
-            doc_id = existing_stats['hits']['hits'][0]['_id']
-            current_count = existing_stats['hits']['hits'][0]['_source']['count']
-            client.update(
-                index=stats_index,
-                id=doc_id,
-                body={
-                    "doc": {
-                        "count": current_count + 1,
-                        "last_searched": now,
-                        "is_trending": current_count > 5
-                    }
-                }
-            )
+        request = build_stats_update(existing_stats, query, now)
+        if "body" in request:
+            client.update(index=stats_index, **request)
         else:
-            client.index(
-                index=stats_index,
-                document={
-                    "query": query.lower(),
-                    "count": 1,
-                    "last_searched": now,
-                    "is_trending": False
-                }
-            )
+            client.index(index=stats_index, **request)
+    except Exception as e:
+        logging.error(f"Error updating search statistics: {str(e)}")
+
+async def async_update_search_stats(client: AsyncElasticsearch, index_name: str, query: str):
+    """
+    Async version of update_search_stats
+    """
+    try:
+        stats_index = f"{index_name}_stats"
+        now = datetime.utcnow()
+
+        existing_stats = await client.search(
+            index=stats_index,
+            body={
+                "query": term("query", normalize_stats_query(query), fields=STATS_FIELDS)
+            }
+        )
+
+        request = build_stats_update(existing_stats, query, now)
+        if "body" in request:
+            await client.update(index=stats_index, **request)
+        else:
+            await client.index(index=stats_index, **request)
     except Exception as e:
         logging.error(f"Error updating search statistics: {str(e)}")
 
+def build_stats_suggestion_query(query: str, size: int) -> Dict[str, Any]:
+    """
+    Builds the prefix query over search statistics, most trending first.
+    trending_rank is comparable across snapshots, unlike trending_score.
+    """
+    return {
+        "query": prefix("query", query.lower(), fields=STATS_FIELDS),
+        "sort": [
+            {"trending_rank": {"order": "desc", "unmapped_type": "double", "missing": "_last"}},
+            {"count": "desc"}
+        ],
+        "size": size
+    }
+
+def build_completion_query(query: str, size: int) -> Dict[str, Any]:
+    """
+    Builds the phrase prefix query over titles and keywords
+    """
+    return {
+        "query": {
+            "multi_match": {
+                "query": query,
+                "fields": ["title^3", "keywords.text"],
+                "type": "phrase_prefix"
+            }
+        },
+        "size": size
+    }
+
+def add_stats_suggestions(
+    suggestions: List[SearchSuggestion],
+    seen_texts: set,
+    stats_response: Dict[str, Any]
+):
+    """
+    Adds suggestions from statistics
+    """
+    for hit in stats_response['hits']['hits']:
+        source = hit['_source']
+        if source['query'] not in seen_texts:
+            suggestions.append(SearchSuggestion(
+                text=source['query'],
+                count=source['count'],
+                trending=source.get('is_trending', False)
+            ))
+            seen_texts.add(source['query'])
+
+def add_completion_suggestions(
+    suggestions: List[SearchSuggestion],
+    seen_texts: set,
+    completion_response: Dict[str, Any]
+):
+    """
+    Fills with suggestions from titles and keywords
+    """
+    for hit in completion_response['hits']['hits']:
+        text = hit['_source']['title']
+        if text not in seen_texts:
+            suggestions.append(SearchSuggestion(
+                text=text,
+                count=0,
+                trending=False
+            ))
+            seen_texts.add(text)
+
 def get_search_suggestions(
     client: Elasticsearch,
     index_name: str,
@@ -69,60 +166,123 @@ def get_search_suggestions(
     Retrieves suggestions based on title, keywords, and search statistics
     """
     try:
+        suggestions = []
+        seen_texts = set()
+
         # Search in search statistics
         stats_response = client.search(
             index=f"{index_name}_stats",
-            body={
-                "query": {
-                    "prefix": {"query.keyword": query.lower()}
-                },
-                "sort": [{"count": "desc"}],
-                "size": size
-            }
+            body=build_stats_suggestion_query(query, size)
         )
+        add_stats_suggestions(suggestions, seen_texts, stats_response)
 
+        # Fill with suggestions from titles and keywords
+        if len(suggestions) < size:
+            completion_response = client.search(
+                index=index_name,
+                body=build_completion_query(query, size - len(suggestions))
+            )
+            add_completion_suggestions(suggestions, seen_texts, completion_response)
+
+        return suggestions
+
+    except Exception as e:
+        logging.error(f"Error retrieving suggestions: {str(e)}")
+        return []
+
+async def async_get_search_suggestions(
+    client: AsyncElasticsearch,
+    index_name: str,
+    query: str,
+    size: int = 5
+) -> List[SearchSuggestion]:
+    """
+    Async version of get_search_suggestions
+    """
+    try:
         suggestions = []
         seen_texts = set()
 
-        # Add suggestions from statistics
-        for hit in stats_response['hits']['hits']:
-            source = hit['_source']
-            if source['query'] not in seen_texts:
-                suggestions.append(SearchSuggestion(
-                    text=source['query'],
-                    count=source['count'],
-                    trending=source['is_trending']
-                ))
-                seen_texts.add(source['query'])
+        stats_response = await client.search(
+            index=f"{index_name}_stats",
+            body=build_stats_suggestion_query(query, size)
+        )
+        add_stats_suggestions(suggestions, seen_texts, stats_response)
 
-        # Fill with suggestions from titles and keywords
         if len(suggestions) < size:
-            completion_response = client.search(
+            completion_response = await client.search(
                 index=index_name,
-                body={
-                    "query": {
-                        "multi_match": {
-                            "query": query,
-                            "fields": ["title^3", "keywords.text"],  #
-                            "type": "phrase_prefix"
-                        }
-                    },
-                "size": size - len(suggestions)
+                body=build_completion_query(query, size - len(suggestions))
+            )
+            add_completion_suggestions(suggestions, seen_texts, completion_response)
+
+        return suggestions
+
+    except Exception as e:
+        logging.error(f"Error retrieving suggestions: {str(e)}")
+        return []
+
+def build_completion_suggester_query(query: str, size: int) -> Dict[str, Any]:
+    """
+    Builds a completion suggester request over the title.completion subfield
+    """
+    return {
+        "_source": ["title"],
+        "suggest": {
+            "title_suggest": {
+                "prefix": query,
+                "completion": {
+                    "field": "title.completion",
+                    "size": size,
+                    "skip_duplicates": True
+                }
+            }
+        }
     }
-)
-
-            for hit in completion_response['hits']['hits']:
-                text = hit['_source']['title']
-                if text not in seen_texts:
-                    suggestions.append(SearchSuggestion(
-                        text=text,
-                        count=0,
-                        trending=False
-                    ))
-                    seen_texts.add(text)
 
+def add_completion_suggester_suggestions(
+    suggestions: List[SearchSuggestion],
+    seen_texts: set,
+    suggest_response: Dict[str, Any],
+    size: int
+):
+    """
+    Fills with titles returned by the completion suggester
+    """
+    for entry in suggest_response.get('suggest', {}).get('title_suggest', []):
+        for option in entry['options']:
+            if len(suggestions) >= size:
+                return
+            text = option.get('_source', {}).get('title', option['text'])
+            if text not in seen_texts:
+                suggestions.append(SearchSuggestion(text=text, count=0, trending=False))
+                seen_texts.add(text)
+
+async def async_get_completion_suggestions(
+    client: AsyncElasticsearch,
+    index_name: str,
+    query: str,
+    size: int = 5
+) -> List[SearchSuggestion]:
+    """
+    Retrieves suggestions from search statistics and the completion
+    suggester in a single _msearch round trip
+    """
+    try:
+        suggestions = []
+        seen_texts = set()
+
+        responses = (await client.msearch(searches=[
+            {"index": f"{index_name}_stats"},
+            build_stats_suggestion_query(query, size),
+            {"index": index_name},
+            build_completion_suggester_query(query, size)
+        ]))['responses']
+
+        add_stats_suggestions(suggestions, seen_texts, responses[0])
+        add_completion_suggester_suggestions(suggestions, seen_texts, responses[1], size)
         return suggestions
 
     except Exception as e:
         logging.error(f"Error retrieving suggestions: {str(e)}")
-        return []
\ No newline at end of file
+        return []
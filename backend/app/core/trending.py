@@ -0,0 +1,309 @@
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_streaming_bulk
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+
+import numpy as np
+
+from .index import TRENDING_STATS_PROPERTIES
+from .stats_aggregator import normalize_stats_query, stats_document_id
+
+# Scaled weights are renormalized before exp() gets anywhere near float overflow
+RESCALE_EXPONENT = 30.0
+
+class CountMinSketch:
+    """
+    Fixed-size frequency sketch. Estimates never undercount; with
+    conservative updates the overcount stays small for heavy keys.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.float64)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key: str) -> np.ndarray:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=4 * self.depth).digest()
+        return np.frombuffer(digest, dtype=np.uint32) % self.width
+
+    def add(self, key: str, weight: float) -> float:
+        columns = self._columns(key)
+        current = self.table[self._rows, columns]
+        estimate = current.min() + weight
+        self.table[self._rows, columns] = np.maximum(current, estimate)
+        return float(estimate)
+
+    def estimate(self, key: str) -> float:
+        return float(self.table[self._rows, self._columns(key)].min())
+
+    def scale(self, factor: float):
+        self.table *= factor
+
+class TrendingTracker:
+    """
+    Exponentially decayed search counts with bounded memory.
+
+    Uses forward decay: a search at time t adds exp((t - origin) / tau),
+    so stored values only grow and their order is the order of the decayed
+    scores at any instant. The decayed score is the stored value times
+    exp(-(now - origin) / tau). A count-min sketch holds every query and a
+    heavy-hitters table keeps the `capacity` highest-scoring ones.
+
+    All heavy hitters are snapshotted to the stats index every
+    snapshot_interval seconds with `trending_score` (decayed score at the
+    snapshot), `trending_rank` (log score plus t / tau, comparable across
+    snapshots) and `is_trending` (decayed score >= threshold).
+    """
+
+    def __init__(
+        self,
+        half_life: float = 3600.0,
+        threshold: float = 5.0,
+        capacity: int = 1000,
+        width: int = 2048,
+        depth: int = 4,
+        snapshot_interval: float = 60.0
+    ):
+        self.tau = half_life / math.log(2)
+        self.threshold = threshold
+        self.capacity = capacity
+        self.snapshot_interval = snapshot_interval
+        self.sketch = CountMinSketch(width, depth)
+        self._origin = time.time()
+        self._heavy: Dict[str, float] = {}
+        self._min_key: Optional[str] = None
+        self._rescale_listeners: List[Callable[[float], None]] = []
+        self._snapshotted: Set[str] = set()
+        self._client: Optional[AsyncElasticsearch] = None
+        self._stats_index: Optional[str] = None
+        self._snapshotter: Optional[asyncio.Task] = None
+
+    def on_rescale(self, listener: Callable[[float], None]):
+        """
+        Registers a callback for values stored in the tracker's scale, called
+        with the factor every stored value must be multiplied by
+        """
+        self._rescale_listeners.append(listener)
+
+    def _rescale(self, now: float):
+        factor = math.exp(-(now - self._origin) / self.tau)
+        self.sketch.scale(factor)
+        for key in self._heavy:
+            self._heavy[key] *= factor
+        self._origin = now
+        for listener in self._rescale_listeners:
+            listener(factor)
+
+    def weight(self, now: Optional[float] = None) -> float:
+        """
+        Scaled weight of one search happening now
+        """
+        now = time.time() if now is None else now
+        exponent = (now - self._origin) / self.tau
+        if exponent > RESCALE_EXPONENT:
+            self._rescale(now)
+            exponent = 0.0
+        return math.exp(exponent)
+
+    def decay(self, scaled: float, now: Optional[float] = None) -> float:
+        """
+        Converts a scaled value into the decayed score at `now`
+        """
+        now = time.time() if now is None else now
+        return scaled * math.exp(-(now - self._origin) / self.tau)
+
+    def to_rank(self, scaled: float) -> float:
+        return math.log(scaled) + self._origin / self.tau if scaled > 0 else float("-inf")
+
+    def from_rank(self, rank: float) -> float:
+        return math.exp(rank - self._origin / self.tau)
+
+    def _track(self, key: str, scaled: float):
+        if key in self._heavy or len(self._heavy) < self.capacity:
+            self._heavy[key] = scaled
+            if key == self._min_key:
+                self._min_key = None
+            return
+
+        if self._min_key is None:
+            self._min_key = min(self._heavy, key=self._heavy.get)
+        if scaled > self._heavy[self._min_key]:
+            del self._heavy[self._min_key]
+            self._heavy[key] = scaled
+            self._min_key = None
+
+    def record(self, query: str, count: int = 1, now: Optional[float] = None):
+        """
+        Counts searches for a query
+        """
+        key = normalize_stats_query(query)
+        if key:
+            self._track(key, self.sketch.add(key, count * self.weight(now)))
+
+    def tracks(self, query: str) -> bool:
+        return normalize_stats_query(query) in self._heavy
+
+    def score(self, query: str, now: Optional[float] = None) -> float:
+        key = normalize_stats_query(query)
+        scaled = self._heavy.get(key)
+        if scaled is None:
+            scaled = self.sketch.estimate(key)
+        return self.decay(scaled, now)
+
+    def is_trending(self, scaled: float, now: Optional[float] = None) -> bool:
+        return self.decay(scaled, now) >= self.threshold
+
+    def top(self, size: int = 10, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Returns the heavy hitters with their decayed scores, highest first
+        """
+        items = sorted(self._heavy.items(), key=lambda item: item[1], reverse=True)[:size]
+        return [(key, self.decay(scaled, now)) for key, scaled in items]
+
+    def _build_snapshot_actions(self, now: float) -> List[dict]:
+        updated = datetime.fromtimestamp(now, tz=timezone.utc).isoformat()
+        actions = []
+        for key, scaled in self._heavy.items():
+            score = self.decay(scaled, now)
+            fields = {
+                "trending_score": score,
+                "trending_rank": self.to_rank(scaled),
+                "trending_updated": updated,
+                "is_trending": score >= self.threshold
+            }
+            actions.append({
+                "_op_type": "update",
+                "_index": self._stats_index,
+                "_id": stats_document_id(key),
+                "retry_on_conflict": 3,
+                "doc": fields,
+                "upsert": {"query": key, "count": 0, **fields}
+            })
+
+        # Queries that fell out of the heavy hitters are no longer trending
+        for key in self._snapshotted - set(self._heavy):
+            actions.append({
+                "_op_type": "update",
+                "_index": self._stats_index,
+                "_id": stats_document_id(key),
+                "retry_on_conflict": 3,
+                "doc": {"is_trending": False, "trending_updated": updated}
+            })
+        self._snapshotted = set(self._heavy)
+        return actions
+
+    async def snapshot(self) -> int:
+        """
+        Writes the trending state of the heavy hitters to the stats index.
+
+        Returns:
+            int: Number of stats documents updated
+        """
+        if self._client is None:
+            return 0
+        written = 0
+        try:
+            async for ok, item in async_streaming_bulk(
+                self._client,
+                self._build_snapshot_actions(time.time()),
+                raise_on_error=False,
+                raise_on_exception=False
+            ):
+                if ok:
+                    written += 1
+                elif item.get("update", {}).get("status") != 404:
+                    logging.error(f"Error writing trending snapshot: {item}")
+        except Exception as e:
+            logging.error(f"Error writing trending snapshot: {str(e)}")
+        return written
+
+    async def ensure_mapping(self):
+        """
+        Adds the trending fields to a stats index created before they existed,
+        so snapshots are typed and restore() can sort on trending_rank
+        """
+        try:
+            await self._client.indices.put_mapping(index=self._stats_index, properties=TRENDING_STATS_PROPERTIES)
+        except Exception as e:
+            logging.error(f"Error adding the trending fields to '{self._stats_index}': {str(e)}")
+
+    async def restore(self):
+        """
+        Reloads the last snapshot so scores survive restarts
+        """
+        try:
+            response = await self._client.search(
+                index=self._stats_index,
+                query={"exists": {"field": "trending_rank"}},
+                sort=[{"trending_rank": "desc"}],
+                source=["query", "trending_rank"],
+                size=self.capacity
+            )
+            for hit in response["hits"]["hits"]:
+                source = hit["_source"]
+                if source.get("trending_rank") is None:
+                    continue
+                key = normalize_stats_query(source["query"])
+                self._track(key, self.sketch.add(key, self.from_rank(source["trending_rank"])))
+        except Exception as e:
+            logging.error(f"Error restoring trending snapshot: {str(e)}")
+
+    async def _run_snapshotter(self):
+        await self.ensure_mapping()
+        await self.restore()
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await self.snapshot()
+
+    def start(self, client: AsyncElasticsearch, index_name: str):
+        """
+        Restores the last snapshot and starts the periodic snapshot task
+        """
+        self._client = client
+        self._stats_index = f"{index_name}_stats"
+        if self._snapshotter is None or self._snapshotter.done():
+            self._snapshotter = asyncio.get_running_loop().create_task(self._run_snapshotter())
+
+    async def stop(self):
+        """
+        Stops the periodic snapshot and writes a final one
+        """
+        if self._snapshotter is not None:
+            self._snapshotter.cancel()
+            try:
+                await self._snapshotter
+            except asyncio.CancelledError:
+                pass
+            self._snapshotter = None
+        await self.snapshot()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "tracked": len(self._heavy),
+            "capacity": self.capacity,
+            "half_life": self.tau * math.log(2),
+            "threshold": self.threshold,
+            "sketch_bytes": self.sketch.table.nbytes
+        }
+
+def create_trending_tracker() -> TrendingTracker:
+    """
+    Builds a TrendingTracker configured from environment variables
+    """
+    return TrendingTracker(
+        half_life=float(os.getenv("TRENDING_HALF_LIFE", "3600")),
+        threshold=float(os.getenv("TRENDING_THRESHOLD", "5")),
+        capacity=int(os.getenv("TRENDING_CAPACITY", "1000")),
+        width=int(os.getenv("TRENDING_SKETCH_WIDTH", "2048")),
+        depth=int(os.getenv("TRENDING_SKETCH_DEPTH", "4")),
+        snapshot_interval=float(os.getenv("TRENDING_SNAPSHOT_INTERVAL", "60"))
+    )
+
+trending_tracker = create_trending_tracker()
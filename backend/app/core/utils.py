@@ -1,10 +1,181 @@
-from typing import List
+from typing import Dict, List, Optional
+import itertools
+import json
+import logging
+import math
+import os
+import re
+import threading
+
+import numpy as np
+
+# Words of letters, optionally joined by hyphens or apostrophes ("state-of-the-art", "o'neil")
+KEYWORD_TOKEN = re.compile(r"[^\W\d_]+(?:['’-][^\W\d_]+)*")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how however i if in into is it its itself just may me might more
+most must my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those through
+to too under until up upon us very via was we were what when where which while who whom why will with
+within without would you your yours yourself yourselves
+one two three first second new use used using based like get make many much well way see also etc
+el la los las un una unos unas de del al y o u en con por para sin sobre entre es son fue ser como que
+se su sus lo le les mas pero este esta estos estas ese esa
+abstract article articles paper papers pdf html http https www com org net page pages home site read
+more click free online available view download
+""".split())
+
+class KeywordExtractor:
+    """
+    Ranks the words of a text by TF-IDF against document frequencies kept
+    incrementally from every ingested document.
+
+    Ties are broken by first position in the text, so the same text and
+    corpus statistics always give the same keywords. Until the corpus has
+    statistics, keywords are the most frequent words, earliest first.
+    """
+
+    def __init__(self, size: int = 5, min_length: int = 3, max_terms: int = 500000):
+        self.size = size
+        self.min_length = min_length
+        self.max_terms = max_terms
+        self.documents = 0
+        self._df: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _update(self, terms: List[str], document_counts: np.ndarray, documents: int) -> np.ndarray:
+        """
+        Adds a batch to the document frequencies and returns the updated
+        frequencies of its terms
+        """
+        self.documents += documents
+        df = np.empty(len(terms), dtype=np.float64)
+        for position, (term, count) in enumerate(zip(terms, document_counts.tolist())):
+            df[position] = self._df[term] = self._df.get(term, 0) + count
+        if len(self._df) > self.max_terms:
+            # Terms seen in a single document make up the long tail of the vocabulary
+            self._df = {term: count for term, count in self._df.items() if count > 1}
+        return df
+
+    def idf(self, term: str) -> float:
+        return math.log((1 + self.documents) / (1 + self._df.get(term, 0))) + 1.0
+
+    def extract(self, text: str, size: Optional[int] = None, update: bool = True) -> List[str]:
+        return self.extract_batch([text], size, update)[0]
+
+    def extract_batch(self, texts: List[str], size: Optional[int] = None, update: bool = True) -> List[List[str]]:
+        """
+        Extracts keywords for a batch of texts in one vectorized pass.
+
+        Args:
+            texts: Texts to extract keywords from
+            size: Keywords per text (default: the extractor's size)
+            update: Add the texts to the document frequencies first
+
+        Returns:
+            List[List[str]]: Keywords of each text, best first
+        """
+        size = size or self.size
+        token_lists = [KEYWORD_TOKEN.findall(text.lower()) for text in texts]
+        tokens = list(itertools.chain.from_iterable(token_lists))
+
+        # Batch vocabulary in order of first occurrence; stopwords and short words are dropped per term
+        vocabulary = list(dict.fromkeys(tokens))
+        keep_term = np.fromiter(
+            (len(term) >= self.min_length and term not in STOPWORDS for term in vocabulary),
+            dtype=bool,
+            count=len(vocabulary)
+        )
+        term_index = {term: position for position, term in enumerate(vocabulary)}
+        flat = np.fromiter(map(term_index.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        docs = np.repeat(np.arange(len(texts)), [len(doc_tokens) for doc_tokens in token_lists])
+        positions = np.arange(len(flat))
+
+        kept = keep_term[flat]
+        flat, docs, positions = flat[kept], docs[kept], positions[kept]
+        lengths = np.bincount(docs, minlength=len(texts))
+
+        # One (document, term) pair per distinct word, with its count and first position
+        pairs, first, counts = np.unique(docs * len(vocabulary) + flat, return_index=True, return_counts=True)
+        pair_docs, pair_terms = pairs // max(len(vocabulary), 1), pairs % max(len(vocabulary), 1)
+
+        batch_terms = np.flatnonzero(np.bincount(pair_terms, minlength=len(vocabulary)))
+        terms = [vocabulary[term] for term in batch_terms.tolist()]
+        with self._lock:
+            if update:
+                df_terms = self._update(
+                    terms, np.bincount(pair_terms, minlength=len(vocabulary))[batch_terms], len(texts)
+                )
+            else:
+                df_terms = np.fromiter((self._df.get(term, 0) for term in terms), dtype=np.float64, count=len(terms))
+            documents = self.documents
+        df = np.zeros(len(vocabulary), dtype=np.float64)
+        df[batch_terms] = df_terms
+        idf = np.log((1 + documents) / (1 + df)) + 1.0
+
+        scores = counts / lengths[pair_docs] * idf[pair_terms]
+        order = np.lexsort((positions[first], -scores, pair_docs))
+        pair_docs, pair_terms = pair_docs[order], pair_terms[order]
+        group_starts = np.searchsorted(pair_docs, np.arange(len(texts)))
+        ranks = np.arange(len(pair_docs)) - group_starts[pair_docs]
+        keep = ranks < size
+
+        keywords: List[List[str]] = [[] for _ in texts]
+        for doc, term in zip(pair_docs[keep].tolist(), pair_terms[keep].tolist()):
+            keywords[doc].append(vocabulary[term])
+        return keywords
+
+    def save(self, path: str):
+        """
+        Writes the document frequencies to a JSON file
+        """
+        with self._lock:
+            payload = {"documents": self.documents, "df": self._df}
+            with open(path, "w") as f:
+                json.dump(payload, f)
+        logging.info(f"Saved keyword statistics for {self.documents} documents to '{path}'")
+
+    def load(self, path: str):
+        with open(path) as f:
+            payload = json.load(f)
+        with self._lock:
+            self.documents = payload["documents"]
+            self._df = payload["df"]
+        logging.info(f"Loaded keyword statistics for {self.documents} documents from '{path}'")
+
+    def status(self) -> Dict[str, int]:
+        return {"documents": self.documents, "terms": len(self._df)}
+
+def create_keyword_extractor() -> KeywordExtractor:
+    """
+    Builds a KeywordExtractor configured from environment variables,
+    restoring saved statistics from KEYWORD_STATS_PATH when present
+    """
+    extractor = KeywordExtractor(
+        size=int(os.getenv("KEYWORD_COUNT", "5")),
+        min_length=int(os.getenv("KEYWORD_MIN_LENGTH", "3")),
+        max_terms=int(os.getenv("KEYWORD_MAX_TERMS", "500000"))
+    )
+    path = os.getenv("KEYWORD_STATS_PATH")
+    if path and os.path.exists(path):
+        try:
+            extractor.load(path)
+        except Exception as e:
+            logging.error(f"Error loading keyword statistics: {str(e)}")
+    return extractor
+
+keyword_extractor = create_keyword_extractor()
 
 def extract_keywords(text: str) -> List[str]:
     """
-    Extract keywords text using basic NLP techniques
+    Extract keywords from text, ranked by TF-IDF against the ingested documents
+    """
+    return keyword_extractor.extract(text)
+
+def extract_keywords_batch(texts: List[str]) -> List[List[str]]:
+    """
+    Batch version of extract_keywords, used for whole ingest batches
     """
-    words = text.lower().split()
-    # Delete common and short  words
-    keywords = [word for word in words if len(word) > 3]
-    return list(set(keywords))[:5]  # 5 unique keywords
+    return keyword_extractor.extract_batch(texts)
@@ -0,0 +1,320 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan
+
+class VectorIndex:
+    """
+    In-process index of normalized embeddings for cosine top-k search.
+
+    Vectors live in one contiguous float32 matrix (memory-mapped when
+    loaded from a snapshot). Small indexes are searched by brute force;
+    once trained, an IVF structure (k-means coarse centroids with inverted
+    lists) restricts each query to the n_probe closest lists.
+    """
+
+    def __init__(
+        self,
+        dims: int = 384,
+        n_lists: int = 0,
+        n_probe: int = 8,
+        ivf_threshold: int = 50000
+    ):
+        self.dims = dims
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.ivf_threshold = ivf_threshold
+        self._vectors = np.zeros((0, dims), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists: List[np.ndarray] = []
+        # False while the vectors of the indexed documents are still missing (see build())
+        self.ready = True
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Bytes used by the vector matrix and IVF structures
+        """
+        total = self._vectors[:self._size].nbytes + self._alive[:self._size].nbytes
+        if self._centroids is not None:
+            total += self._centroids.nbytes + self._assignments[:self._size].nbytes
+            total += sum(rows.nbytes for rows in self._lists)
+        return total
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        if needed <= self._vectors.shape[0] and not isinstance(self._vectors, np.memmap):
+            return
+        # Grow geometrically; a memory-mapped snapshot is copied into RAM on first write
+        capacity = max(needed, 2 * self._vectors.shape[0], 1024)
+        vectors = np.zeros((capacity, self.dims), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        assignments = np.full(capacity, -1, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        self._vectors, self._alive, self._assignments = vectors, alive, assignments
+
+    def add(self, ids: Sequence[str], vectors) -> int:
+        """
+        Adds or replaces vectors.
+
+        Args:
+            ids: Document ids
+            vectors: Matrix or list of vectors, one row per id
+
+        Returns:
+            int: Number of vectors added
+        """
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dims))
+        self.delete([doc_id for doc_id in ids if doc_id in self._rows])
+
+        self._reserve(len(ids))
+        start = self._size
+        end = start + len(ids)
+        self._vectors[start:end] = matrix
+        self._alive[start:end] = True
+        for offset, doc_id in enumerate(ids):
+            self._ids.append(doc_id)
+            self._rows[doc_id] = start + offset
+        self._size = end
+
+        if self._centroids is not None:
+            assignments = np.argmax(matrix @ self._centroids.T, axis=1).astype(np.int32)
+            self._assignments[start:end] = assignments
+            for list_id in np.unique(assignments):
+                new_rows = np.arange(start, end, dtype=np.int64)[assignments == list_id]
+                self._lists[list_id] = np.concatenate([self._lists[list_id], new_rows])
+        elif self.n_lists and len(self) >= self.ivf_threshold:
+            self.train()
+        return len(ids)
+
+    def delete(self, ids: Sequence[str]) -> int:
+        """
+        Removes vectors by id. Rows are tombstoned and reclaimed by compact().
+
+        Returns:
+            int: Number of vectors removed
+        """
+        removed = 0
+        for doc_id in ids:
+            row = self._rows.pop(doc_id, None)
+            if row is not None:
+                if isinstance(self._vectors, np.memmap):
+                    self._reserve(0)
+                self._alive[row] = False
+                removed += 1
+        return removed
+
+    def compact(self):
+        """
+        Drops tombstoned rows and rebuilds the inverted lists
+        """
+        rows = np.flatnonzero(self._alive[:self._size])
+        self._vectors = np.ascontiguousarray(self._vectors[rows])
+        self._alive = np.ones(len(rows), dtype=bool)
+        self._ids = [self._ids[row] for row in rows]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._size = len(rows)
+        if self._centroids is not None:
+            self._assignments = np.ascontiguousarray(self._assignments[rows])
+            self._build_lists()
+
+    def _build_lists(self):
+        assignments = self._assignments[:self._size]
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]].astype(np.int64) for i in range(len(self._centroids))]
+
+    def train(self, n_lists: Optional[int] = None, iterations: int = 10, sample_size: int = 100000, seed: int = 0):
+        """
+        Trains the IVF coarse quantizer with spherical k-means and assigns every vector
+        """
+        rows = np.flatnonzero(self._alive[:self._size])
+        n_lists = n_lists or self.n_lists or max(1, int(np.sqrt(len(rows))))
+        n_lists = min(n_lists, len(rows))
+        if n_lists == 0:
+            return
+        rng = np.random.default_rng(seed)
+        sample = self._vectors[rng.choice(rows, size=min(sample_size, len(rows)), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = self._normalize(sums)
+
+        self.n_lists = n_lists
+        self._centroids = centroids.astype(np.float32)
+        if isinstance(self._vectors, np.memmap):
+            self._reserve(0)
+        # Assign in chunks to bound the temporary score matrix
+        for start in range(0, self._size, 65536):
+            end = min(start + 65536, self._size)
+            self._assignments[start:end] = np.argmax(self._vectors[start:end] @ self._centroids.T, axis=1)
+        self._build_lists()
+        logging.info(f"Trained IVF vector index with {n_lists} lists over {len(rows)} vectors")
+
+    def search(self, query_vector, k: int = 10, n_probe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Returns the k most similar documents by cosine similarity.
+
+        Args:
+            query_vector: Query embedding
+            k: Number of results
+            n_probe: Inverted lists scanned when the IVF structure is trained
+
+        Returns:
+            List[Tuple[str, float]]: (document id, similarity) pairs, best first
+        """
+        if not self._rows:
+            return []
+        query = self._normalize(np.asarray(query_vector, dtype=np.float32).reshape(1, self.dims))[0]
+
+        if self._centroids is not None:
+            probes = min(n_probe or self.n_probe, len(self._centroids))
+            closest = np.argpartition(-(self._centroids @ query), probes - 1)[:probes]
+            rows = np.concatenate([self._lists[i] for i in closest])
+            rows = rows[self._alive[rows]]
+            scores = self._vectors[rows] @ query
+        else:
+            rows = None
+            scores = self._vectors[:self._size] @ query
+            scores[~self._alive[:self._size]] = -np.inf
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        results = []
+        for position in top:
+            if not np.isfinite(scores[position]):
+                continue
+            row = rows[position] if rows is not None else position
+            results.append((self._ids[row], float(scores[position])))
+        return results
+
+    async def build(self, client: AsyncElasticsearch, index_name: str, batch_size: int = 1000):
+        """
+        Adds the vector of every indexed document, then marks the index
+        ready. Documents added meanwhile by miss-fills are kept.
+        """
+        started = time.perf_counter()
+        ids: List[str] = []
+        vectors: List[list] = []
+        try:
+            async for hit in async_scan(client, index=index_name, query={"_source": ["vector"]}, size=batch_size):
+                vector = hit["_source"].get("vector")
+                if vector is None or len(vector) != self.dims:
+                    continue
+                ids.append(hit["_id"])
+                vectors.append(vector)
+                if len(ids) >= batch_size:
+                    self.add(ids, vectors)
+                    ids, vectors = [], []
+            if ids:
+                self.add(ids, vectors)
+            self.ready = True
+            logging.info(f"Built vector index with {len(self)} vectors in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            logging.error(f"Error building vector index: {str(e)}")
+
+    def save(self, path: str):
+        """
+        Writes a compacted snapshot to a directory
+        """
+        self.compact()
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self._vectors[:self._size])
+        if self._centroids is not None:
+            np.save(os.path.join(path, "centroids.npy"), self._centroids)
+            np.save(os.path.join(path, "assignments.npy"), self._assignments[:self._size])
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump({
+                "dims": self.dims,
+                "n_lists": self.n_lists,
+                "n_probe": self.n_probe,
+                "ivf_threshold": self.ivf_threshold,
+                "ids": self._ids
+            }, f)
+        logging.info(f"Saved vector index with {len(self)} vectors to '{path}'")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorIndex":
+        """
+        Loads a snapshot, memory-mapping the vector matrix by default
+        """
+        with open(os.path.join(path, "index.json")) as f:
+            meta = json.load(f)
+        index = cls(
+            dims=meta["dims"],
+            n_lists=meta["n_lists"],
+            n_probe=meta["n_probe"],
+            ivf_threshold=meta["ivf_threshold"]
+        )
+        index._vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        index._size = index._vectors.shape[0]
+        index._alive = np.ones(index._size, dtype=bool)
+        index._ids = meta["ids"]
+        index._rows = {doc_id: row for row, doc_id in enumerate(index._ids)}
+        index._assignments = np.full(index._size, -1, dtype=np.int32)
+
+        centroids_path = os.path.join(path, "centroids.npy")
+        if os.path.exists(centroids_path):
+            index._centroids = np.load(centroids_path)
+            index._assignments = np.load(os.path.join(path, "assignments.npy"))
+            index._build_lists()
+        return index
+
+def load_vector_index() -> Optional[VectorIndex]:
+    """
+    Loads the local vector index configured by VECTOR_INDEX_PATH, if any.
+    A missing snapshot starts an empty index that is built from Elasticsearch
+    at startup (VectorIndex.build) and saved there on shutdown.
+    """
+    path = os.getenv("VECTOR_INDEX_PATH")
+    if not path:
+        return None
+    if os.path.exists(os.path.join(path, "index.json")):
+        index = VectorIndex.load(path)
+        logging.info(f"Loaded vector index with {len(index)} vectors from '{path}'")
+        return index
+    index = VectorIndex(
+        dims=int(os.getenv("VECTOR_DIMS", "384")),
+        n_lists=int(os.getenv("VECTOR_INDEX_LISTS", "0")),
+        n_probe=int(os.getenv("VECTOR_INDEX_PROBES", "8"))
+    )
+    index.ready = False
+    return index
+
+local_vector_index = load_vector_index()
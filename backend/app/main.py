@@ -1,12 +1,83 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import os
 from dotenv import load_dotenv
 from api.routes.routes import router
+from core.client import create_async_client
+from core.embeddings import embedding_service
+from core.stats_aggregator import create_stats_aggregator
+from core.vector_index import local_vector_index
+from core.embedding_backends import embedding_backend
+from core.google_search import google_search
+from core.miss_fill import create_miss_fill_queue
+from core.suggestion_index import suggestion_index
+from core.trending import trending_tracker
+from core.index_lifecycle import async_resolve_index_aliases
+from core.index import async_vector_similarity
+from core.custom_search import set_script_similarity
+from core.dedup import deduplicator
+from core.utils import keyword_extractor
+from core.metrics import render_metrics
 
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model in the background so "/" and /health answer immediately
+    # (nothing to load when an embedding server holds the model)
+    embedding_backend.warm()
+    # One pooled Elasticsearch client for the whole application lifetime
+    app.state.es_client = create_async_client()
+    # Searches go through the read alias, miss-fill writes through the write alias
+    app.state.index_aliases = await async_resolve_index_aliases(app.state.es_client, os.getenv("INDEX_NAME"))
+    # script_score uses dotProduct only on indices whose mapping guarantees unit vectors
+    set_script_similarity(await async_vector_similarity(app.state.es_client, app.state.index_aliases.read))
+    app.state.stats_aggregator = create_stats_aggregator(app.state.es_client, os.getenv("INDEX_NAME"))
+    app.state.stats_aggregator.start()
+    app.state.miss_fill_queue = create_miss_fill_queue()
+    app.state.miss_fill_queue.start()
+    # Decayed trending scores, restored from and snapshotted to the stats index
+    trending_tracker.start(app.state.es_client, os.getenv("INDEX_NAME"))
+    # Build the suggestion trie behind startup; /api/suggestions uses ES until it is ready
+    suggestion_loader = None
+    if os.getenv("SUGGESTION_BACKEND", "memory") == "memory":
+        suggestion_loader = asyncio.create_task(
+            suggestion_index.load(app.state.es_client, app.state.index_aliases.read)
+        )
+    # Vectors of the indexed documents for a new local vector index; searches use ES kNN until it is built
+    vector_index_loader = None
+    if local_vector_index is not None and not local_vector_index.ready:
+        vector_index_loader = asyncio.create_task(
+            local_vector_index.build(app.state.es_client, app.state.index_aliases.read)
+        )
+    # Near-duplicate signatures of indexed documents, for ingest-time dedup
+    dedup_loader = None
+    if deduplicator.enabled:
+        dedup_loader = asyncio.create_task(deduplicator.load(app.state.es_client, app.state.index_aliases.read))
+    yield
+    if suggestion_loader is not None:
+        suggestion_loader.cancel()
+    if dedup_loader is not None:
+        dedup_loader.cancel()
+    if vector_index_loader is not None:
+        vector_index_loader.cancel()
+    await app.state.miss_fill_queue.stop()
+    # Pending search counts and trending scores are written before the client goes away
+    await app.state.stats_aggregator.stop()
+    await trending_tracker.stop()
+    await embedding_service.close()
+    await google_search.close()
+    # A partly built index is not saved, so the next start builds it again
+    if local_vector_index is not None and local_vector_index.ready:
+        local_vector_index.save(os.getenv("VECTOR_INDEX_PATH"))
+    if os.getenv("KEYWORD_STATS_PATH"):
+        keyword_extractor.save(os.getenv("KEYWORD_STATS_PATH"))
+    await app.state.es_client.close()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     os.getenv("FRONTEND_URL"),
@@ -28,4 +99,22 @@ app.add_middleware(
 async def root():
     return {"message": "API running"}
 
-app.include_router(router) 
\ No newline at end of file
+@app.get("/health")
+async def health():
+    # With an embedding server this is a socket round trip, kept off the event loop
+    model = await asyncio.get_running_loop().run_in_executor(None, embedding_backend.status)
+    ready = model.get("state") == "ready"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "model": model}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Stage latencies, cache and miss-fill counters, Elasticsearch timings and
+    embedding batch sizes in the Prometheus text format
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+app.include_router(router) 
@@ -0,0 +1,97 @@
+"""
+Throughput of /api/search/batch against the same queries sent as N
+sequential /api/search calls and as N concurrent ones, on the app served
+by uvicorn with the fake Elasticsearch (load_test.py's stand-ins).
+
+The result and embedding caches are disabled in the server and every
+round uses queries not seen before, so each mode pays for its embeddings
+and Elasticsearch requests.
+
+Usage (from the backend directory):
+
+    python benchmarks/batch_search.py --batch-sizes 10 50 100 --rounds 5 --es-latency-ms 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import StandIns, start_server  # noqa: E402
+from workload import make_corpus, make_query_log  # noqa: E402
+
+async def sequential(client: httpx.AsyncClient, queries: list[str]):
+    for query in queries:
+        response = await client.post("/api/search", json={"query": query, "background_fill": True})
+        response.raise_for_status()
+
+async def concurrent(client: httpx.AsyncClient, queries: list[str]):
+    responses = await asyncio.gather(*(
+        client.post("/api/search", json={"query": query, "background_fill": True}) for query in queries
+    ))
+    for response in responses:
+        response.raise_for_status()
+
+async def batch(client: httpx.AsyncClient, queries: list[str]):
+    response = await client.post("/api/search/batch", json={"queries": [{"query": query} for query in queries]})
+    response.raise_for_status()
+    errors = [item["error"] for item in response.json()["responses"] if "error" in item]
+    if errors:
+        raise RuntimeError(f"Batch search errors: {errors[:3]}")
+
+async def run(args, stand_ins: StandIns, queries: list[str]):
+    modes = {"sequential": sequential, "concurrent": concurrent, "batch": batch}
+    limits = httpx.Limits(max_connections=max(args.batch_sizes))
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=120, limits=limits) as client:
+        await batch(client, queries[:10])
+        position = 10
+        for size in args.batch_sizes:
+            for name, mode in modes.items():
+                timings = []
+                before = stand_ins.call("counts")["es_requests"]
+                for _ in range(args.rounds):
+                    # A fresh set of distinct queries per round and mode
+                    round_queries = [f"{queries[(position + i) % len(queries)]} {position + i}" for i in range(size)]
+                    position += size
+                    started = time.perf_counter()
+                    await mode(client, round_queries)
+                    timings.append(time.perf_counter() - started)
+                es_requests = (stand_ins.call("counts")["es_requests"] - before) / (args.rounds * size)
+                wall = statistics.median(timings)
+                print(
+                    f"N={size:<4} {name:<11} {size / wall:8.1f} queries/s  "
+                    f"median={wall * 1000:8.1f}ms  es_requests/query={es_requests:.2f}"
+                )
+
+def main(args):
+    os.environ.update({"RESULT_CACHE_SIZE": "0", "EMBEDDING_CACHE_SIZE": "0", "COALESCE_ENABLED": "false"})
+    corpus = make_corpus(args.documents)
+    queries = [query["query"] for query in make_query_log(args.distinct_queries, corpus)]
+    stand_ins = StandIns(corpus, [], args)
+    process = start_server(args, stand_ins)
+    try:
+        asyncio.run(run(args, stand_ins, queries))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        stand_ins.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--distinct-queries", type=int, default=2000)
+    parser.add_argument("--es-latency-ms", type=float, default=5.0)
+    parser.add_argument("--embedding-ms", type=float, default=5.0, help="Simulated model time per synthetic batch")
+    parser.add_argument("--real-embeddings", dest="synthetic_embeddings", action="store_false")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--verbose", action="store_true")
+    parser.set_defaults(google_latency_ms=0.0, google_error_rate=0.0, stats_searches=0)
+    main(parser.parse_args())
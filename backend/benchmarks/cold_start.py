@@ -0,0 +1,146 @@
+"""
+Measures API cold start: time to import main.py, time until "/" answers,
+time until the embedding model is ready (/health returns 200) and the
+resident memory of the whole uvicorn process tree, for 1..N workers.
+
+Trees without /health load the model eagerly at import, so "/" answering
+means ready; running the script on an older checkout gives the "before"
+numbers.
+
+Usage (from the backend directory):
+
+    python benchmarks/cold_start.py --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import List
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+IMPORT_PROBE = (
+    "import resource, time; started = time.perf_counter(); import main; "
+    "print(time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+
+def status_code(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+def process_tree(root_pid: int) -> List[int]:
+    """
+    A process and all its descendants, from /proc
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except OSError:
+            continue
+
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+def read_kb(path: str, field: str) -> int:
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def process_tree_rss(root_pid: int) -> int:
+    """
+    Sums VmRSS (bytes) of a process and all its descendants using /proc
+    """
+    return sum(read_kb(f"/proc/{pid}/status", "VmRSS:") for pid in process_tree(root_pid)) * 1024
+
+def process_tree_pss(root_pid: int) -> int:
+    """
+    Sums Pss (bytes) of a process and all its descendants: pages shared by
+    several processes (shared memory, copy-on-write) are split between
+    them instead of counted in full by each, as RSS does
+    """
+    return sum(read_kb(f"/proc/{pid}/smaps_rollup", "Pss:") for pid in process_tree(root_pid)) * 1024
+
+def measure_import() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=APP_DIR, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return {"import_seconds": float(output[-2]), "import_max_rss_mb": int(output[-1]) / 1024}
+
+def measure_server(workers: int, port: int, timeout: float) -> dict:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers)],
+        cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{port}"
+    first_response = ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            if first_response is None and status_code(f"{base}/") == 200:
+                first_response = time.perf_counter() - started
+            if first_response is not None:
+                health = status_code(f"{base}/health")
+                if health == 200 or health == 404:
+                    ready = time.perf_counter() - started
+                    break
+            time.sleep(0.05)
+        # Give every worker time to finish loading before reading memory
+        time.sleep(2)
+        rss = process_tree_rss(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {
+        "workers": workers,
+        "first_response_seconds": first_response,
+        "ready_seconds": ready,
+        "rss_mb": rss / 1024 / 1024
+    }
+
+def seconds(value) -> str:
+    return f"{value:.2f}s" if value is not None else "timeout"
+
+def main(args):
+    results = {"import": measure_import(), "servers": []}
+    print(f"import main: {results['import']['import_seconds']:.2f}s, max RSS {results['import']['import_max_rss_mb']:.0f} MB")
+    for workers in args.workers:
+        result = measure_server(workers, args.port, args.timeout)
+        results["servers"].append(result)
+        print(
+            f"workers={workers}: first response {seconds(result['first_response_seconds'])}, "
+            f"ready {seconds(result['ready_seconds'])}, RSS {result['rss_mb']:.0f} MB"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output")
+    main(parser.parse_args())
@@ -0,0 +1,74 @@
+"""
+Evaluates embedding backends: recall@k and embedding throughput.
+
+The corpus is a JSONL file of {"id", "title", "abstract"} documents. Queries
+come from a JSONL file of {"query", "relevant": [ids]}; without one, each
+document's title is used as the query for its own abstract.
+
+Usage (from the backend directory):
+
+    python benchmarks/embedding_eval.py --corpus corpus.jsonl --backends minilm minilm-cls
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core.embedding_backends import create_embedding_backend  # noqa: E402
+
+def read_jsonl(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def embed_all(backend, texts: list[str], batch_size: int) -> tuple[np.ndarray, float]:
+    started = time.perf_counter()
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(backend.embed(texts[start:start + batch_size]))
+    elapsed = time.perf_counter() - started
+    matrix = np.asarray(vectors, dtype=np.float32)
+    # Rank by cosine for every backend so unnormalized ones are compared fairly
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    return matrix, len(texts) / elapsed
+
+def main(args):
+    corpus = read_jsonl(args.corpus)
+    ids = [str(doc["id"]) for doc in corpus]
+    if args.queries:
+        queries = read_jsonl(args.queries)
+    else:
+        queries = [{"query": doc["title"], "relevant": [str(doc["id"])]} for doc in corpus[:args.max_queries]]
+        corpus = [{**doc, "title": ""} for doc in corpus]
+    texts = [f"{doc.get('title', '')} {doc.get('abstract', '')}".strip() for doc in corpus]
+
+    for name in args.backends:
+        backend = create_embedding_backend(name)
+        backend.embed(["warm up"])
+        doc_vectors, docs_per_second = embed_all(backend, texts, args.batch_size)
+        query_vectors, _ = embed_all(backend, [q["query"] for q in queries], args.batch_size)
+
+        scores = query_vectors @ doc_vectors.T
+        top = np.argsort(-scores, axis=1)[:, :max(args.k)]
+        line = [f"{name:<12}", f"docs/s={docs_per_second:8.1f}"]
+        for k in args.k:
+            recall = np.mean([
+                len({ids[i] for i in row[:k]} & set(q["relevant"])) / len(q["relevant"])
+                for row, q in zip(top, queries)
+            ])
+            line.append(f"recall@{k}={recall:.3f}")
+        print(" ".join(line))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", required=True)
+    parser.add_argument("--queries")
+    parser.add_argument("--max-queries", type=int, default=1000)
+    parser.add_argument("--backends", nargs="+", default=["minilm", "minilm-cls"])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10])
+    main(parser.parse_args())
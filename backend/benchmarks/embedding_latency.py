@@ -0,0 +1,91 @@
+"""
+Compares query-embedding latency of the per-request path (one synchronous
+forward pass inside the async handler) against the batched EmbeddingService.
+
+Usage (from the backend directory):
+
+    python benchmarks/embedding_latency.py --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core.custom_search import generate_embedding, generate_embeddings  # noqa: E402
+from core.embeddings import EmbeddingService  # noqa: E402
+
+WORDS = [
+    "search", "engine", "vector", "semantic", "python", "elastic", "index",
+    "neural", "ranking", "query", "embedding", "model", "retrieval", "text"
+]
+
+def make_queries(count: int, distinct: int) -> list[str]:
+    rng = random.Random(42)
+    pool = [" ".join(rng.sample(WORDS, 3)) for _ in range(distinct)]
+    return [rng.choice(pool) for _ in range(count)]
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run(handler, queries: list[str], concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(text: str):
+        async with semaphore:
+            started = time.perf_counter()
+            await handler(text)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(q) for q in queries))
+    return latencies
+
+async def per_request(text: str):
+    # Mirrors the old /api/search handler: blocking call on the event loop
+    generate_embedding(text)
+
+def report(name: str, latencies: list[float], elapsed: float):
+    print(
+        f"{name:<12} p50={percentile(latencies, 50):8.2f}ms "
+        f"p99={percentile(latencies, 99):8.2f}ms "
+        f"mean={statistics.mean(latencies):8.2f}ms "
+        f"throughput={len(latencies) / elapsed:8.1f} req/s"
+    )
+
+async def main(args):
+    queries = make_queries(args.requests, args.distinct)
+
+    started = time.perf_counter()
+    latencies = await run(per_request, queries, args.concurrency)
+    report("per-request", latencies, time.perf_counter() - started)
+
+    service = EmbeddingService(
+        embed_batch=generate_embeddings,
+        max_batch_size=args.batch_size,
+        max_wait_ms=args.max_wait_ms,
+        cache_size=args.cache_size,
+        workers=args.workers
+    )
+    started = time.perf_counter()
+    latencies = await run(service.embed, queries, args.concurrency)
+    report("batched", latencies, time.perf_counter() - started)
+    print(service.stats.to_dict())
+    await service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--distinct", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--cache-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,435 @@
+"""
+In-process Elasticsearch stand-in for benchmarks.
+
+It speaks enough of the REST API for the backend's code paths (document
+index/update, _bulk, _search with scroll, point in time + search_after and
+completion suggest, terms aggregations, _msearch, index management with aliases, templates,
+settings, _reindex, _rollover and tasks) and can add a fixed
+per-request delay to emulate the network round trip to a real cluster.
+Search scoring is a plain token-overlap count; it is meant for measuring
+request patterns, not relevance.
+"""
+import fnmatch
+import json
+import re
+import threading
+import time
+import uuid
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+TOKEN = re.compile(r"\w+")
+
+def _query_text(node: Any) -> List[str]:
+    """
+    Collects every "query" string found anywhere in a query body.
+    """
+    texts = []
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "query" and isinstance(value, str):
+                texts.append(value)
+            else:
+                texts.extend(_query_text(value))
+    elif isinstance(node, list):
+        for value in node:
+            texts.extend(_query_text(value))
+    return texts
+
+class FakeElasticsearch:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.indices: Dict[str, Dict[str, dict]] = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.scrolls: Dict[str, Tuple[List[dict], int]] = {}
+        self.pits: Dict[str, str] = {}
+        self.aliases: Dict[str, Dict[str, dict]] = {}
+        self.settings: Dict[str, dict] = {}
+        self.templates: Dict[str, dict] = {}
+        self.tasks: Dict[str, dict] = {}
+        # Token sets of searched documents, reused while the text fields are unchanged
+        self._tokens: Dict[Tuple[str, str], Tuple[tuple, set]] = {}
+
+    def tokens(self, name: str, doc_id: str, source: dict) -> set:
+        text = (source.get("title", ""), source.get("abstract", ""), source.get("query", ""))
+        cached = self._tokens.get((name, doc_id))
+        if cached is not None and cached[0] == text:
+            return cached[1]
+        tokens = {t.lower() for t in TOKEN.findall(json.dumps(text[0]) + " " + str(text[1]) + " " + str(text[2]))}
+        self._tokens[(name, doc_id)] = (text, tokens)
+        return tokens
+
+    def resolve(self, name: str, write: bool = False) -> List[str]:
+        """
+        Expands aliases; a write goes to the alias' write index (or its only index).
+        """
+        indices = []
+        for part in name.split(","):
+            members = self.aliases.get(part)
+            if members is None:
+                indices.append(part)
+            elif write:
+                writers = [index for index, meta in members.items() if meta.get("is_write_index")]
+                indices.append((writers or list(members))[0])
+            else:
+                indices.extend(members)
+        return indices
+
+    def create_index(self, name: str, body: dict):
+        self.indices.setdefault(name, {})
+        settings = {"refresh_interval": "1s", "number_of_replicas": "1"}
+        for template in sorted(self.templates.values(), key=lambda t: t.get("priority", 0)):
+            if any(fnmatch.fnmatch(name, pattern) for pattern in template.get("index_patterns", [])):
+                settings.update(template.get("template", {}).get("settings", {}))
+        settings.update(body.get("settings", {}))
+        self.settings[name] = {key: str(value) for key, value in settings.items() if not isinstance(value, dict)}
+        for alias, meta in body.get("aliases", {}).items():
+            self.aliases.setdefault(alias, {})[name] = meta
+
+    def update_aliases(self, actions: List[dict]):
+        for action in actions:
+            (op, meta), = action.items()
+            if op == "add":
+                self.aliases.setdefault(meta["alias"], {})[meta["index"]] = {
+                    key: value for key, value in meta.items() if key not in ("index", "alias")
+                }
+            elif op == "remove":
+                self.aliases.get(meta["alias"], {}).pop(meta["index"], None)
+                if not self.aliases.get(meta["alias"]):
+                    self.aliases.pop(meta["alias"], None)
+            elif op == "remove_index":
+                self.indices.pop(meta["index"], None)
+
+    def reindex(self, body: dict) -> Dict[str, Any]:
+        dest = self.resolve(body["dest"]["index"], write=True)[0]
+        create_only = body["dest"].get("op_type") == "create"
+        created = 0
+        for source_index in self.resolve(body["source"]["index"]):
+            for doc_id, source in list(self.indices.get(source_index, {}).items()):
+                docs = self.indices.setdefault(dest, {})
+                if create_only and doc_id in docs:
+                    continue
+                docs[doc_id] = dict(source)
+                created += 1
+        return {"took": 1, "total": created, "created": created, "updated": 0, "failures": []}
+
+    def rollover(self, alias: str, body: dict) -> Dict[str, Any]:
+        old_index = self.resolve(alias, write=True)[0]
+        prefix, _, number = old_index.rpartition("-")
+        new_index = f"{prefix}-{int(number) + 1:06d}"
+        self.create_index(new_index, {"aliases": body.get("aliases", {})})
+        self.aliases[alias][old_index] = {"is_write_index": False}
+        self.aliases[alias][new_index] = {"is_write_index": True}
+        return {"acknowledged": True, "old_index": old_index, "new_index": new_index, "rolled_over": True}
+
+    def index(self, index: str, doc_id: Optional[str], source: dict) -> Dict[str, Any]:
+        index = self.resolve(index, write=True)[0]
+        docs = self.indices.setdefault(index, {})
+        doc_id = doc_id or uuid.uuid4().hex
+        result = "updated" if doc_id in docs else "created"
+        docs[doc_id] = source
+        return {"_index": index, "_id": doc_id, "result": result, "status": 201 if result == "created" else 200}
+
+    def update(self, index: str, doc_id: str, body: dict) -> Dict[str, Any]:
+        index = self.resolve(index, write=True)[0]
+        docs = self.indices.setdefault(index, {})
+        if doc_id not in docs:
+            if "upsert" in body:
+                docs[doc_id] = dict(body["upsert"])
+                return {"_index": index, "_id": doc_id, "result": "created", "status": 201}
+            return {"_index": index, "_id": doc_id, "status": 404, "error": {"type": "document_missing_exception"}}
+        docs[doc_id].update(body.get("doc", {}))
+        script = body.get("script")
+        if isinstance(script, dict) and "count" in docs[doc_id]:
+            docs[doc_id]["count"] += script.get("params", {}).get("n", 1)
+        return {"_index": index, "_id": doc_id, "result": "updated", "status": 200}
+
+    def search(self, index: str, body: dict, scroll: bool = False) -> Dict[str, Any]:
+        started = time.perf_counter()
+        size = body.get("size", 10)
+        terms = {t.lower() for text in _query_text(body.get("query", {})) for t in TOKEN.findall(text)}
+        hits = []
+        for name in self.resolve(index):
+            for doc_id, source in self.indices.get(name, {}).items():
+                if terms:
+                    score = float(len(terms & self.tokens(name, doc_id, source)))
+                    if score == 0:
+                        continue
+                else:
+                    score = 1.0
+                hits.append({"_index": name, "_id": doc_id, "_score": score, "_source": source})
+        hits.sort(key=lambda hit: (-hit["_score"], hit["_index"], hit["_id"]))
+        if "pit" in body:
+            # Sort values are [score, position]; search_after resumes after the position
+            for position, hit in enumerate(hits):
+                hit["sort"] = [hit["_score"], position]
+            if "search_after" in body:
+                hits = hits[body["search_after"][-1] + 1:]
+        response = {
+            "took": int((time.perf_counter() - started) * 1000),
+            "timed_out": False,
+            "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+            "hits": {"total": {"value": len(hits), "relation": "eq"}, "max_score": hits[0]["_score"] if hits else None, "hits": hits[:size]}
+        }
+        if "pit" in body:
+            response["pit_id"] = body["pit"]["id"]
+        if "aggs" in body:
+            response["aggregations"] = {
+                name: self.terms_aggregation(index, agg["terms"])
+                for name, agg in body["aggs"].items() if "terms" in agg
+            }
+        if scroll:
+            scroll_id = uuid.uuid4().hex
+            self.scrolls[scroll_id] = (hits[size:], size)
+            response["_scroll_id"] = scroll_id
+        if "suggest" in body:
+            response["suggest"] = {
+                name: self.complete(index, suggester)
+                for name, suggester in body["suggest"].items()
+            }
+        return response
+
+    def terms_aggregation(self, index: str, terms: dict) -> Dict[str, Any]:
+        """
+        Terms aggregation over every document of the index (the query is not applied).
+        """
+        include = set(terms["include"]) if "include" in terms else None
+        counts: Dict[Any, int] = {}
+        for name in self.resolve(index):
+            for source in self.indices.get(name, {}).values():
+                values = source.get(terms["field"])
+                for value in values if isinstance(values, list) else [values]:
+                    if value is not None and (include is None or value in include):
+                        counts[value] = counts.get(value, 0) + 1
+        buckets = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))[:terms.get("size", 10)]
+        return {"buckets": [{"key": key, "doc_count": count} for key, count in buckets]}
+
+    def complete(self, index: str, suggester: dict) -> List[dict]:
+        """
+        Completion suggester over titles: matches the prefix at the start of the title.
+        """
+        prefix = suggester.get("prefix", "").lower()
+        size = suggester.get("completion", {}).get("size", 5)
+        options = []
+        for name in self.resolve(index):
+            for doc_id, source in self.indices.get(name, {}).items():
+                title = str(source.get("title", ""))
+                if title.lower().startswith(prefix):
+                    options.append({"text": title, "_index": name, "_id": doc_id, "_score": 1.0, "_source": source})
+        return [{"text": prefix, "offset": 0, "length": len(prefix), "options": options[:size]}]
+
+    def scroll(self, scroll_id: str) -> Dict[str, Any]:
+        remaining, size = self.scrolls.get(scroll_id, ([], 10))
+        self.scrolls[scroll_id] = (remaining[size:], size)
+        return {
+            "_scroll_id": scroll_id,
+            "timed_out": False,
+            "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+            "hits": {"total": {"value": len(remaining), "relation": "eq"}, "hits": remaining[:size]}
+        }
+
+    def bulk(self, lines: List[str], default_index: Optional[str]) -> Dict[str, Any]:
+        items = []
+        iterator = iter(lines)
+        for line in iterator:
+            action = json.loads(line)
+            op, meta = next(iter(action.items()))
+            index = meta.get("_index", default_index)
+            if op == "delete":
+                index = self.resolve(index, write=True)[0]
+                found = self.indices.get(index, {}).pop(meta["_id"], None) is not None
+                items.append({op: {"_index": index, "_id": meta["_id"], "status": 200 if found else 404}})
+                continue
+            body = json.loads(next(iterator))
+            if op == "update":
+                items.append({op: self.update(index, meta["_id"], body)})
+            else:
+                items.append({op: self.index(index, meta.get("_id"), body)})
+        errors = any(item[next(iter(item))]["status"] >= 300 for item in items)
+        return {"took": 1, "errors": errors, "items": items}
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeElasticsearch/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def es(self) -> FakeElasticsearch:
+        return self.server.es
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, payload: Optional[dict] = None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _dispatch(self):
+        raw = self._body()
+        with self.es.lock:
+            self.es.requests += 1
+        if self.es.latency:
+            time.sleep(self.es.latency)
+
+        path, _, query_string = self.path.partition("?")
+        path = path.strip("/")
+        parts = [unquote(part) for part in path.split("/")] if path else []
+        with self.es.lock:
+            status, payload = self._route(parts, raw, query_string)
+        self._send(status, payload)
+
+    def _route(self, parts: List[str], raw: bytes, query_string: str = ""):
+        es = self.es
+        if not parts:
+            return 200, {"version": {"number": "8.15.0"}, "tagline": "You Know, for Search"}
+        if parts[0] == "_index_template" and len(parts) == 2:
+            es.templates[parts[1]] = json.loads(raw or b"{}")
+            return 200, {"acknowledged": True}
+        if parts == ["_aliases"]:
+            es.update_aliases(json.loads(raw)["actions"])
+            return 200, {"acknowledged": True}
+        if parts[0] == "_alias" and len(parts) == 2:
+            members = {alias: indices for alias, indices in es.aliases.items() if alias in parts[1].split(",")}
+            if not members:
+                return 404, {"error": f"alias [{parts[1]}] missing", "status": 404}
+            found: Dict[str, Any] = {}
+            for alias, indices in members.items():
+                for index, meta in indices.items():
+                    found.setdefault(index, {"aliases": {}})["aliases"][alias] = meta
+            return 200, found
+        if parts == ["_reindex"]:
+            response = es.reindex(json.loads(raw))
+            if "wait_for_completion=false" in query_string:
+                task_id = f"fake:{uuid.uuid4().hex[:8]}"
+                es.tasks[task_id] = {"completed": True, "task": {"status": response}, "response": response}
+                return 200, {"task": task_id}
+            return 200, response
+        if parts[0] == "_tasks" and len(parts) == 2:
+            task = es.tasks.get(parts[1])
+            return (200, task) if task else (404, {"error": "task missing", "status": 404})
+        if len(parts) == 2 and parts[1] == "_settings":
+            index = es.resolve(parts[0])[0]
+            if self.command == "PUT":
+                body = json.loads(raw)
+                es.settings.setdefault(index, {}).update(
+                    {key: str(value) for key, value in body.get("index", body).items()}
+                )
+                return 200, {"acknowledged": True}
+            return 200, {index: {"settings": {"index": es.settings.get(index, {})}}}
+        if len(parts) == 2 and parts[1] == "_mapping":
+            return 200, {"acknowledged": True}
+        if len(parts) == 2 and parts[1] == "_rollover":
+            return 200, es.rollover(parts[0], json.loads(raw or b"{}"))
+        if parts[-1] == "_bulk":
+            lines = [line for line in raw.decode().splitlines() if line.strip()]
+            return 200, es.bulk(lines, parts[0] if len(parts) > 1 else None)
+        if parts[-1] == "_msearch":
+            lines = [json.loads(line) for line in raw.decode().splitlines() if line.strip()]
+            default_index = parts[0] if len(parts) > 1 else ",".join(es.indices)
+            responses = []
+            for header, body in zip(lines[0::2], lines[1::2]):
+                response = es.search(header.get("index", default_index), body)
+                response["status"] = 200
+                responses.append(response)
+            return 200, {"took": 1, "responses": responses}
+        if parts[-2:] == ["_search", "scroll"]:
+            body = json.loads(raw or b"{}")
+            if self.command == "DELETE":
+                for scroll_id in body.get("scroll_id", []):
+                    es.scrolls.pop(scroll_id, None)
+                return 200, {"succeeded": True, "num_freed": 1}
+            return 200, es.scroll(body["scroll_id"])
+        if parts[-1] == "_pit":
+            if self.command == "DELETE":
+                found = es.pits.pop(json.loads(raw or b"{}").get("id"), None) is not None
+                return 200, {"succeeded": found, "num_freed": int(found)}
+            pit_id = uuid.uuid4().hex
+            es.pits[pit_id] = ",".join(es.resolve(parts[0]))
+            return 200, {"id": pit_id}
+        if parts[-1] == "_search" and "pit" in json.loads(raw or b"{}"):
+            body = json.loads(raw)
+            if body["pit"]["id"] not in es.pits:
+                return 404, {"error": {"type": "search_context_missing_exception"}, "status": 404}
+            return 200, es.search(es.pits[body["pit"]["id"]], body)
+        if parts[-1] == "_search":
+            return 200, es.search(
+                parts[0] if len(parts) > 1 else ",".join(es.indices),
+                json.loads(raw or b"{}"),
+                scroll="scroll=" in query_string
+            )
+        if parts[-1] == "_refresh":
+            return 200, {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+        if len(parts) >= 2 and parts[1] == "_doc":
+            doc_id = parts[2] if len(parts) > 2 else None
+            if self.command == "GET":
+                for index in es.resolve(parts[0]):
+                    source = es.indices.get(index, {}).get(doc_id)
+                    if source is not None:
+                        return 200, {"_index": index, "_id": doc_id, "found": True, "_source": source}
+                return 404, {"_index": parts[0], "_id": doc_id, "found": False}
+            if self.command == "DELETE":
+                index = es.resolve(parts[0], write=True)[0]
+                found = es.indices.get(index, {}).pop(doc_id, None) is not None
+                return (200 if found else 404), {"_index": index, "_id": doc_id, "result": "deleted" if found else "not_found"}
+            result = es.index(parts[0], doc_id, json.loads(raw))
+            return result["status"], result
+        if len(parts) == 3 and parts[1] == "_update":
+            result = es.update(parts[0], parts[2], json.loads(raw))
+            return result["status"], result
+        if len(parts) == 1:
+            if self.command == "HEAD":
+                return (200 if parts[0] in es.indices or parts[0] in es.aliases else 404), None
+            if self.command == "PUT":
+                es.create_index(parts[0], json.loads(raw or b"{}"))
+                return 200, {"acknowledged": True, "index": parts[0]}
+            if self.command == "DELETE":
+                es.indices.pop(parts[0], None)
+                return 200, {"acknowledged": True}
+        return 404, {"error": {"type": "unsupported", "reason": f"{self.command} /{'/'.join(parts)}"}, "status": 404}
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _dispatch
+
+class FakeElasticsearchServer:
+    """
+    Runs a FakeElasticsearch on a background thread.
+
+        with FakeElasticsearchServer(latency_ms=2) as server:
+            client = Elasticsearch(server.url)
+    """
+
+    def __init__(self, latency_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.es = FakeElasticsearch(latency_ms=latency_ms)
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.es = self.es
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeElasticsearchServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeElasticsearchServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,133 @@
+"""
+Advanced-search latency with exact/range criteria scored in `bool.must`
+(the previous query builder) versus the same criteria in filter context.
+
+Runs against ES_URL when it is set, otherwise against the in-process fake
+Elasticsearch. The fake ignores filters and has no filter cache, so it
+only measures the request path; the query-cache effect needs a real
+cluster. Build time of both query bodies is reported either way.
+
+Usage (from the backend directory):
+
+    ES_URL=http://localhost:9200 python benchmarks/filter_context.py --documents 100000 --queries 500
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from elasticsearch import Elasticsearch  # noqa: E402
+from elasticsearch.helpers import bulk  # noqa: E402
+from core.custom_search import build_advanced_query  # noqa: E402
+from core.index import build_index_mapping  # noqa: E402
+from fake_es import FakeElasticsearchServer  # noqa: E402
+
+AUTHORS = [f"author-{i}" for i in range(50)]
+KEYWORDS = [f"topic-{i}" for i in range(200)]
+WORDS = "search vector neural ranking index query semantic retrieval learning elastic".split()
+
+def build_must_query(title, author, date_from, date_to, keywords, size=10) -> dict:
+    # The previous builder: every criterion scored under bool.must
+    must = [{"match": {"title": {"query": title, "fuzziness": "AUTO"}}}]
+    if author:
+        must.append({"term": {"author": author}})
+    if date_from or date_to:
+        must.append({"range": {"publication_date": {"gte": date_from, "lte": date_to, "format": "yyyy-MM-dd"}}})
+    if keywords:
+        must.append({"terms": {"keywords": keywords}})
+    return {
+        "size": size,
+        "query": {"bool": {"must": must}},
+        "sort": [{"_score": "desc"}, {"publication_date": {"order": "desc", "missing": "_last"}}]
+    }
+
+def make_documents(rng: random.Random, count: int, index_name: str):
+    start = date(2015, 1, 1)
+    for i in range(count):
+        yield {
+            "_index": index_name,
+            "_id": str(i),
+            "_source": {
+                "title": " ".join(rng.choice(WORDS) for _ in range(6)),
+                "author": rng.choice(AUTHORS),
+                "keywords": rng.sample(KEYWORDS, 3),
+                "publication_date": (start + timedelta(days=rng.randrange(3650))).isoformat()
+            }
+        }
+
+def make_criteria(rng: random.Random, count: int) -> list[tuple]:
+    # A small set of filter combinations repeated, as real traffic does
+    filters = [
+        (rng.choice(AUTHORS), f"{2015 + rng.randrange(5)}-01-01", f"{2020 + rng.randrange(5)}-12-31", rng.sample(KEYWORDS, 2))
+        for _ in range(20)
+    ]
+    return [(rng.choice(WORDS), *rng.choice(filters)) for _ in range(count)]
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def measure(name: str, client: Elasticsearch, index_name: str, bodies: list[dict]):
+    timings = []
+    for body in bodies:
+        started = time.perf_counter()
+        client.search(index=index_name, body=body, request_cache=False)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(
+        f"{name:<8} p50={percentile(timings, 0.5):7.2f}ms p99={percentile(timings, 0.99):7.2f}ms "
+        f"mean={statistics.mean(timings):7.2f}ms"
+    )
+
+def measure_build(name: str, builder, criteria: list[tuple]) -> list[dict]:
+    started = time.perf_counter()
+    bodies = [builder(*c) for c in criteria]
+    print(f"{name:<8} build={(time.perf_counter() - started) / len(criteria) * 1e6:6.1f}us/query")
+    return bodies
+
+def run(client: Elasticsearch, args):
+    rng = random.Random(0)
+    index_name = "bench_filters"
+    if client.indices.exists(index=index_name):
+        client.indices.delete(index=index_name)
+    client.indices.create(index=index_name, body=build_index_mapping())
+    bulk(client, make_documents(rng, args.documents, index_name), chunk_size=2000, refresh=True)
+
+    criteria = make_criteria(rng, args.queries)
+    must_bodies = measure_build("must", build_must_query, criteria)
+    filter_bodies = measure_build(
+        "filter",
+        lambda title, author, date_from, date_to, keywords: build_advanced_query(
+            title=title, author=author, date_from=date_from, date_to=date_to, keywords=keywords
+        ),
+        criteria
+    )
+
+    # Warm up both shapes once so the first-seen filters do not skew the comparison
+    for body in must_bodies[:20] + filter_bodies[:20]:
+        client.search(index=index_name, body=body)
+    for _ in range(args.rounds):
+        measure("must", client, index_name, must_bodies)
+        measure("filter", client, index_name, filter_bodies)
+    client.indices.delete(index=index_name)
+
+def main(args):
+    es_url = os.getenv("ES_URL")
+    if es_url:
+        run(Elasticsearch(es_url, request_timeout=120), args)
+        return
+    print("ES_URL not set: using the fake Elasticsearch (no filter cache, filters ignored)")
+    with FakeElasticsearchServer() as server:
+        run(Elasticsearch(server.url), args)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=2)
+    main(parser.parse_args())
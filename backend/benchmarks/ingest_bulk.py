@@ -0,0 +1,79 @@
+"""
+Compares the search-miss ingest path before and after batching:
+one embedding + one `index` request per document versus one batched
+embedding call + one `_bulk` request, against the local fake Elasticsearch.
+
+Usage (from the backend directory):
+
+    python benchmarks/ingest_bulk.py --documents 10 --rounds 20 --latency-ms 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from elasticsearch import Elasticsearch  # noqa: E402
+from core.custom_search import generate_embedding, process_search_results  # noqa: E402
+from core.documents import index_document, index_documents  # noqa: E402
+from fake_es import FakeElasticsearchServer  # noqa: E402
+
+def make_results(count: int, round_number: int) -> list[dict]:
+    return [
+        {
+            "title": f"Result {i} for round {round_number} about semantic search",
+            "snippet": f"Snippet number {i} describing vector retrieval and ranking",
+            "link": f"https://example.com/{round_number}/{i}"
+        }
+        for i in range(count)
+    ]
+
+def per_document(client: Elasticsearch, index_name: str, raw_results: list[dict]):
+    # Reproduces the previous miss path: embed and index one document at a time
+    for item in raw_results:
+        text = f"{item.get('title', '')} {item.get('snippet', '')}".strip()
+        document = {
+            "title": item.get("title", ""),
+            "author": "Google Search",
+            "publication_date": None,
+            "abstract": item.get("snippet", ""),
+            "keywords": [],
+            "content": item.get("link", ""),
+            "vector": generate_embedding(text)
+        }
+        index_document(client, index_name, document)
+
+def batched(client: Elasticsearch, index_name: str, raw_results: list[dict]):
+    index_documents(client, index_name, process_search_results(raw_results))
+
+def measure(name: str, fn, server: FakeElasticsearchServer, args) -> None:
+    client = Elasticsearch(server.url)
+    timings = []
+    requests_before = server.es.requests
+    for round_number in range(args.rounds):
+        raw_results = make_results(args.documents, round_number)
+        started = time.perf_counter()
+        fn(client, "bench", raw_results)
+        timings.append((time.perf_counter() - started) * 1000)
+    requests = (server.es.requests - requests_before) / args.rounds
+    print(
+        f"{name:<13} mean={statistics.mean(timings):8.2f}ms "
+        f"median={statistics.median(timings):8.2f}ms "
+        f"es_requests/miss={requests:5.1f}"
+    )
+    client.close()
+
+def main(args):
+    with FakeElasticsearchServer(latency_ms=args.latency_ms) as server:
+        measure("per-document", per_document, server, args)
+        measure("batched+bulk", batched, server, args)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    main(parser.parse_args())
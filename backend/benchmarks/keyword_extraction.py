@@ -0,0 +1,103 @@
+"""
+Keyword extraction throughput (docs/s) on a synthetic corpus with a
+Zipf-distributed vocabulary, or on a JSONL corpus with title/abstract
+fields: the previous whitespace-split extractor versus the TF-IDF
+extractor, one document at a time and in ingest-sized batches.
+
+Usage (from the backend directory):
+
+    python benchmarks/keyword_extraction.py --documents 100000 --batch-sizes 10 1000
+    python benchmarks/keyword_extraction.py --corpus corpus.jsonl
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core.utils import KeywordExtractor  # noqa: E402
+
+FUNCTION_WORDS = "the of and a to in for on with is by from that an as are this at".split()
+
+def legacy_extract_keywords(text: str) -> list[str]:
+    # The previous extractor: whitespace split, length filter, arbitrary set order
+    words = text.lower().split()
+    keywords = [word for word in words if len(word) > 3]
+    return list(set(keywords))[:5]
+
+def word_for(i: int) -> str:
+    # Letters only, as the tokenizer drops digits: 0 -> "kaa", 1 -> "kab", ...
+    letters = ""
+    while True:
+        i, r = divmod(i, 26)
+        letters = chr(ord("a") + r) + letters
+        if i == 0:
+            break
+    return "k" + letters.rjust(2, "a")
+
+def make_corpus(rng: random.Random, count: int, vocabulary: int) -> list[str]:
+    words = [word_for(i) for i in range(vocabulary)]
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(vocabulary)))
+
+    def sentence(length: int) -> str:
+        content = rng.choices(words, cum_weights=cum_weights, k=length)
+        return " ".join(word if rng.random() > 0.3 else f"{rng.choice(FUNCTION_WORDS)} {word}" for word in content)
+
+    return [f"{sentence(rng.randint(5, 12)).capitalize()}. {sentence(rng.randint(20, 40))}." for _ in range(count)]
+
+def load_corpus(path: str, limit: int) -> list[str]:
+    texts = []
+    with open(path) as f:
+        for line in f:
+            document = json.loads(line)
+            texts.append(f"{document.get('title', '')} {document.get('abstract', '')}")
+            if len(texts) >= limit:
+                break
+    return texts
+
+def report(name: str, count: int, seconds: float):
+    print(f"{name:<16} {count / seconds:12,.0f} docs/s  ({seconds:.2f}s)")
+
+def run_batches(texts: list[str], batch_size: int) -> list[list[str]]:
+    extractor = KeywordExtractor()
+    keywords = []
+    for start in range(0, len(texts), batch_size):
+        keywords.extend(extractor.extract_batch(texts[start:start + batch_size]))
+    return keywords
+
+def main(args):
+    rng = random.Random(0)
+    texts = load_corpus(args.corpus, args.documents) if args.corpus else make_corpus(rng, args.documents, args.vocabulary)
+    print(f"{len(texts)} documents")
+
+    started = time.perf_counter()
+    for text in texts:
+        legacy_extract_keywords(text)
+    report("legacy", len(texts), time.perf_counter() - started)
+
+    extractor = KeywordExtractor()
+    started = time.perf_counter()
+    single = [extractor.extract(text) for text in texts]
+    report("tfidf single", len(texts), time.perf_counter() - started)
+    print(f"{'':<16} vocabulary={extractor.status()['terms']}")
+
+    for batch_size in args.batch_sizes:
+        started = time.perf_counter()
+        run_batches(texts, batch_size)
+        report(f"tfidf batch={batch_size}", len(texts), time.perf_counter() - started)
+
+    # Same corpus, same order: keywords must not depend on the run
+    print(f"deterministic={run_batches(texts, args.batch_sizes[0]) == run_batches(texts, args.batch_sizes[0])}")
+    print(f"batch equals single={run_batches(texts, 1) == single}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--corpus", help="JSONL file with title and abstract fields")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 1000])
+    main(parser.parse_args())
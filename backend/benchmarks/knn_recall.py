@@ -0,0 +1,93 @@
+"""
+Latency and recall@k of the vector_text_search modes (script_score, knn,
+hybrid) on a synthetic corpus. Recall is measured against the exact cosine
+top-k computed with NumPy. Needs a real Elasticsearch cluster, since the
+fake stand-in has no vector search:
+
+    ES_URL=http://localhost:9200 python benchmarks/knn_recall.py --documents 20000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from elasticsearch import Elasticsearch  # noqa: E402
+from elasticsearch.helpers import bulk  # noqa: E402
+from core.custom_search import vector_text_search  # noqa: E402
+from core.index import build_index_mapping  # noqa: E402
+from core.quantization import vector_quantization  # noqa: E402
+
+VOCABULARY = [f"term{i}" for i in range(2000)]
+
+def make_corpus(count: int, dims: int, rng: np.random.Generator):
+    vectors = rng.standard_normal((count, dims)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    words = random.Random(7)
+    texts = [" ".join(words.sample(VOCABULARY, 8)) for _ in range(count)]
+    return vectors, texts
+
+def load(client: Elasticsearch, index_name: str, vectors: np.ndarray, texts: list[str], dims: int):
+    if client.indices.exists(index=index_name):
+        client.indices.delete(index=index_name)
+    client.indices.create(index=index_name, body=build_index_mapping(dims))
+    # Stored as the configured VECTOR_QUANTIZATION level expects
+    stored = vector_quantization.encode(vectors)
+    actions = (
+        {
+            "_index": index_name,
+            "_id": str(i),
+            "_source": {"title": text, "abstract": "", "content": "", "keywords": [], "vector": vector.tolist()}
+        }
+        for i, (vector, text) in enumerate(zip(stored, texts))
+    )
+    bulk(client, actions, chunk_size=1000, request_timeout=120)
+    client.indices.refresh(index=index_name)
+
+def main(args):
+    rng = np.random.default_rng(42)
+    vectors, texts = make_corpus(args.documents, args.dims, rng)
+    client = Elasticsearch(os.getenv("ES_URL", "http://localhost:9200"), request_timeout=60)
+    load(client, args.index, vectors, texts, args.dims)
+
+    # Queries are perturbed corpus vectors; their text shares one word with the source document
+    query_ids = rng.choice(args.documents, size=args.queries, replace=False)
+    queries = vectors[query_ids] + 0.1 * rng.standard_normal((args.queries, args.dims)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+    for mode, fusion in [("script_score", "rrf"), ("knn", "rrf"), ("hybrid", "rrf"), ("hybrid", "linear")]:
+        latencies, recalls = [], []
+        for query_vector, doc_id, truth in zip(queries, query_ids, exact):
+            query_text = texts[doc_id].split()[0]
+            started = time.perf_counter()
+            results = vector_text_search(
+                client, args.index, query_text, query_vector,
+                size=args.k, mode=mode, fusion=fusion, num_candidates=args.num_candidates
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            found = {int(result["id"]) for result in results}
+            recalls.append(len(found & set(truth.tolist())) / args.k)
+        latencies.sort()
+        print(
+            f"{mode + '/' + fusion:<20} recall@{args.k}={statistics.mean(recalls):.3f} "
+            f"p50={latencies[len(latencies) // 2]:7.2f}ms "
+            f"p99={latencies[int(len(latencies) * 0.99) - 1]:7.2f}ms"
+        )
+
+    client.indices.delete(index=args.index)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--num-candidates", type=int, default=100)
+    parser.add_argument("--index", default="bench-knn")
+    main(parser.parse_args())
@@ -0,0 +1,511 @@
+"""
+Load-test harness for the API: runs scripted scenarios against the app
+served by uvicorn and reports throughput, p50/p95/p99 latency, errors and
+the server's resident memory, then saves the run as JSON so later runs
+can be compared against it.
+
+By default everything is local: the fake Elasticsearch (fake_es.py)
+loaded with a synthetic Zipfian corpus, the stub Google endpoint
+(stub_google.py) and the app itself each run in their own process, so the
+load generator does not share a GIL with what it measures. Every scenario
+starts from a freshly loaded index and a new server process, so caches
+do not leak between scenarios. --target points the scenarios at a running
+deployment instead (index, Google and memory are then whatever it uses).
+
+Scenarios:
+    search      POST /api/search, queries drawn from the Zipfian query log
+    typeahead   GET /api/suggestions, every prefix of a query typed in turn
+    miss-storm  rounds of concurrent searches for a few queries the index
+                has never seen, all filled from Google at once
+    mixed       search, typeahead keystrokes and misses interleaved
+
+--synthetic-embeddings replaces the model with hash-seeded vectors (plus
+--embedding-ms of simulated model time per batch), which isolates the
+backend from the model and runs without torch.
+
+Usage (from the backend directory):
+
+    python benchmarks/load_test.py --scenarios search typeahead --requests 5000 --concurrency 32
+    python benchmarks/load_test.py --scenarios miss-storm --storm-queries 5 --concurrency 50 --synthetic-embeddings
+    python benchmarks/load_test.py --corpus workload/corpus.jsonl --queries workload/queries.jsonl
+    python benchmarks/load_test.py --compare benchmarks/results/load_test-20260101T000000Z.json
+    python benchmarks/load_test.py --target http://localhost:8000 --scenarios search
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCHMARKS_DIR, "..", "app")
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from cold_start import process_tree_rss  # noqa: E402
+from workload import ZipfSampler, iter_novel_queries, make_corpus, make_query_log, read_jsonl  # noqa: E402
+
+SCENARIOS = ("search", "typeahead", "miss-storm", "mixed")
+INDEX_NAME = "bench"
+
+# Share of requests per kind in the mixed scenario
+MIXED_WEIGHTS = {"search": 0.7, "typeahead": 0.25, "miss": 0.05}
+
+STAGE_SAMPLE = re.compile(r'^indexify_stage_seconds_(?P<kind>sum|count)\{stage="(?P<stage>[^"]+)"\} (?P<value>\S+)$')
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+# --- Stand-ins (own process) ---
+
+def document_key(document: dict) -> str:
+    return hashlib.sha1(document.get("content", document["title"]).encode("utf-8")).hexdigest()
+
+def run_stand_ins(corpus: List[dict], queries: List[dict], args: Dict[str, Any], connection):
+    """
+    Serves the fake Elasticsearch and the stub Google endpoint, answering
+    "reset" (reload the corpus) and "counts" (requests served) commands
+    """
+    from fake_es import FakeElasticsearchServer
+    from stub_google import StubGoogleServer
+
+    es_server = FakeElasticsearchServer(latency_ms=args["es_latency_ms"]).start()
+    google = StubGoogleServer(latency_ms=args["google_latency_ms"], error_rate=args["google_error_rate"]).start()
+    documents = {document_key(document): document for document in corpus}
+    searches = args["stats_searches"]
+    stats = {
+        str(position): {"query": query["query"], "count": max(1, round(query["weight"] * searches))}
+        for position, query in enumerate(queries)
+    }
+
+    def reset():
+        with es_server.es.lock:
+            es_server.es.indices = {
+                INDEX_NAME: {key: dict(document) for key, document in documents.items()},
+                f"{INDEX_NAME}_stats": {key: dict(document) for key, document in stats.items()}
+            }
+            es_server.es.aliases = {}
+
+    reset()
+    connection.send({"es_url": es_server.url, "google_url": google.url})
+    while True:
+        command = connection.recv()
+        if command == "reset":
+            reset()
+            connection.send(True)
+        elif command == "counts":
+            connection.send({"es_requests": es_server.es.requests, "google_requests": google.requests})
+        else:
+            break
+    es_server.stop()
+    google.stop()
+
+class StandIns:
+    def __init__(self, corpus: List[dict], queries: List[dict], args: argparse.Namespace):
+        self.connection, child = multiprocessing.Pipe()
+        options = {
+            "es_latency_ms": args.es_latency_ms,
+            "google_latency_ms": args.google_latency_ms,
+            "google_error_rate": args.google_error_rate,
+            "stats_searches": args.stats_searches
+        }
+        self.process = multiprocessing.Process(target=run_stand_ins, args=(corpus, queries, options, child), daemon=True)
+        self.process.start()
+        urls = self.connection.recv()
+        self.es_url, self.google_url = urls["es_url"], urls["google_url"]
+
+    def call(self, command: str) -> Any:
+        self.connection.send(command)
+        return self.connection.recv()
+
+    def stop(self):
+        self.connection.send("stop")
+        self.process.join(timeout=10)
+
+# --- API server (own process) ---
+
+def serve(args: argparse.Namespace):
+    """
+    Runs the app under uvicorn; called in the server subprocess
+    """
+    os.chdir(APP_DIR)
+    sys.path.insert(0, APP_DIR)
+    if args.synthetic_embeddings:
+        from synthetic_embeddings import install
+        install(args.embedding_ms / 1000)
+
+    import uvicorn
+    import main
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+def wait_until_up(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"API did not answer at {base_url} within {timeout}s")
+
+def start_server(args: argparse.Namespace, stand_ins: StandIns) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        ELASTICSEARCH_CLOUD_ID=stand_ins.es_url,
+        INDEX_NAME=INDEX_NAME,
+        GOOGLE_SEARCH_URL=stand_ins.google_url,
+        GOOGLE_API_KEY="bench",
+        SEARCH_ENGINE_ID="bench"
+    )
+    command = [sys.executable, os.path.abspath(__file__), "serve", "--port", str(args.port)]
+    if args.synthetic_embeddings:
+        command += ["--synthetic-embeddings", "--embedding-ms", str(args.embedding_ms)]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.port}", args.startup_timeout)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+class RssSampler:
+    """
+    Samples the resident memory of the server process tree in the background
+    """
+
+    def __init__(self, pid: Optional[int], interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(process_tree_rss(self.pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        if self.pid is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self.pid is not None:
+            self._thread.join()
+            self.samples.append(process_tree_rss(self.pid))
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        if not self.samples:
+            return {"rss_start_mb": None, "rss_peak_mb": None, "rss_end_mb": None}
+        return {
+            "rss_start_mb": self.samples[0] / 1024 / 1024,
+            "rss_peak_mb": max(self.samples) / 1024 / 1024,
+            "rss_end_mb": self.samples[-1] / 1024 / 1024
+        }
+
+# --- Load generation ---
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Counter = Counter()
+        self.exceptions: Counter = Counter()
+
+    async def send(self, client: httpx.AsyncClient, kind: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            self.exceptions[type(e).__name__] += 1
+            response = None
+        self.latencies.setdefault(kind, []).append((time.perf_counter() - started) * 1000)
+        self.statuses[str(response.status_code) if response is not None else "exception"] += 1
+        return response
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        every = [latency for latencies in self.latencies.values() for latency in latencies]
+        errors = sum(count for status, count in self.statuses.items() if not status.startswith("2"))
+        return {
+            "requests": len(every),
+            "seconds": elapsed,
+            "throughput": len(every) / elapsed if elapsed else 0.0,
+            "errors": errors,
+            "statuses": dict(self.statuses),
+            "exceptions": dict(self.exceptions),
+            **latency_summary(every),
+            "by_kind": {kind: latency_summary(latencies) for kind, latencies in self.latencies.items()}
+        }
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "max_ms": max(latencies, default=0.0)
+    }
+
+class Workload:
+    def __init__(self, queries: List[dict], args: argparse.Namespace):
+        self.queries = ZipfSampler([query["query"] for query in queries], weights=[query["weight"] for query in queries])
+        self.novel = iter_novel_queries(seed=args.seed + 2)
+
+    def next_novel(self) -> str:
+        return next(self.novel)
+
+async def search(recorder: Recorder, client: httpx.AsyncClient, text: str, kind: str = "search"):
+    await recorder.send(client, kind, "POST", "/api/search", json={"query": text, "size": 10})
+
+async def type_query(recorder: Recorder, client: httpx.AsyncClient, text: str, budget: Optional[List[int]] = None):
+    for length in range(1, len(text) + 1):
+        if budget is not None:
+            if budget[0] <= 0:
+                return
+            budget[0] -= 1
+        await recorder.send(client, "typeahead", "GET", "/api/suggestions", params={"query": text[:length]})
+
+async def closed_loop(concurrency: int, total: int, step: Callable[[random.Random, List[int]], Awaitable[None]], seed: int):
+    """
+    Runs `concurrency` users that each call step() until `total` requests were issued
+    """
+    budget = [total]
+
+    async def user(number: int):
+        rng = random.Random(seed * 1000 + number)
+        while budget[0] > 0:
+            await step(rng, budget)
+
+    await asyncio.gather(*(user(number) for number in range(concurrency)))
+
+def scenario_steps(name: str, recorder: Recorder, client: httpx.AsyncClient, workload: Workload):
+    async def search_step(rng: random.Random, budget: List[int]):
+        budget[0] -= 1
+        await search(recorder, client, workload.queries.sample(rng))
+
+    async def typeahead_step(rng: random.Random, budget: List[int]):
+        await type_query(recorder, client, workload.queries.sample(rng), budget)
+
+    async def mixed_step(rng: random.Random, budget: List[int]):
+        draw = rng.random()
+        if draw < MIXED_WEIGHTS["search"]:
+            await search_step(rng, budget)
+        elif draw < MIXED_WEIGHTS["search"] + MIXED_WEIGHTS["typeahead"]:
+            await typeahead_step(rng, budget)
+        else:
+            budget[0] -= 1
+            await search(recorder, client, workload.next_novel(), kind="miss")
+
+    return {"search": search_step, "typeahead": typeahead_step, "mixed": mixed_step}[name]
+
+async def miss_storm(recorder: Recorder, client: httpx.AsyncClient, workload: Workload, args: argparse.Namespace, total: int):
+    """
+    Each round fires `concurrency` searches at once, spread over
+    `storm_queries` queries the index has never seen
+    """
+    for _ in range(max(1, total // args.concurrency)):
+        queries = [workload.next_novel() for _ in range(args.storm_queries)]
+        await asyncio.gather(*(
+            search(recorder, client, queries[position % len(queries)], kind="miss")
+            for position in range(args.concurrency)
+        ))
+
+async def run_load(name: str, base_url: str, workload: Workload, args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        if args.warmup and name != "miss-storm":
+            await closed_loop(args.concurrency, args.warmup, scenario_steps(name, Recorder(), client, workload), args.seed + 7)
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        if name == "miss-storm":
+            await miss_storm(recorder, client, workload, args, args.requests)
+        else:
+            await closed_loop(args.concurrency, args.requests, scenario_steps(name, recorder, client, workload), args.seed)
+        summary = recorder.summary(time.perf_counter() - started)
+
+        server = {}
+        for path in ("/api/cache/stats", "/api/embeddings/stats", "/api/search/pending-stats", "/api/coalescing/stats"):
+            try:
+                response = await client.get(path)
+                if response.status_code == 200:
+                    server[path] = response.json()
+            except httpx.HTTPError:
+                pass
+        summary["server_stats"] = server
+        summary["stages"] = await stage_timings(client)
+    return summary
+
+async def stage_timings(client: httpx.AsyncClient) -> Dict[str, Dict[str, float]]:
+    """
+    Mean time per stage from the server's /metrics histograms
+    """
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return {}
+    if response.status_code != 200:
+        return {}
+    totals: Dict[str, Dict[str, float]] = {}
+    for line in response.text.splitlines():
+        match = STAGE_SAMPLE.match(line)
+        if match:
+            totals.setdefault(match["stage"], {})[match["kind"]] = float(match["value"])
+    return {
+        stage: {"count": int(values.get("count", 0)), "mean_ms": values.get("sum", 0.0) / values["count"] * 1000}
+        for stage, values in sorted(totals.items()) if values.get("count")
+    }
+
+def run_scenario(name: str, queries: List[dict], args: argparse.Namespace, stand_ins: Optional[StandIns]) -> Dict[str, Any]:
+    workload = Workload(queries, args)
+    if args.target:
+        with RssSampler(args.server_pid) as rss:
+            result = asyncio.run(run_load(name, args.target, workload, args))
+        result.update(rss.to_dict())
+        return result
+
+    stand_ins.call("reset")
+    process = start_server(args, stand_ins)
+    try:
+        before = stand_ins.call("counts")
+        with RssSampler(process.pid) as rss:
+            result = asyncio.run(run_load(name, f"http://127.0.0.1:{args.port}", workload, args))
+        after = stand_ins.call("counts")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    result.update(rss.to_dict())
+    result.update({key: after[key] - before[key] for key in after})
+    return result
+
+# --- Reporting ---
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def mb(value: Optional[float]) -> str:
+    return f"{value:.0f}MB" if value is not None else "n/a"
+
+def report(name: str, result: Dict[str, Any]):
+    print(
+        f"{name:<11} {result['throughput']:8.1f} req/s  p50={result['p50_ms']:8.2f}ms "
+        f"p95={result['p95_ms']:8.2f}ms p99={result['p99_ms']:8.2f}ms  errors={result['errors']:<5d} "
+        f"rss peak={mb(result['rss_peak_mb'])}"
+    )
+    if len(result["by_kind"]) > 1:
+        for kind, latencies in result["by_kind"].items():
+            print(f"{'':<11} {kind:<10} p50={latencies['p50_ms']:8.2f}ms p99={latencies['p99_ms']:8.2f}ms")
+    if "es_requests" in result:
+        print(
+            f"{'':<11} es_requests/req={result['es_requests'] / max(result['requests'], 1):.2f} "
+            f"google_requests={result['google_requests']}"
+        )
+
+def compare(previous_path: str, current: Dict[str, Any]):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nvs {previous_path} (commit {previous.get('commit')}):")
+    for name, result in current["scenarios"].items():
+        before = previous["scenarios"].get(name)
+        if before is None:
+            continue
+        changes = []
+        for key in ("throughput", "p50_ms", "p95_ms", "p99_ms", "rss_peak_mb"):
+            if before.get(key) and result.get(key) is not None:
+                changes.append(f"{key} {(result[key] - before[key]) / before[key]:+.1%}")
+        print(f"{name:<11} " + "  ".join(changes))
+
+def load_workload(args: argparse.Namespace):
+    corpus = read_jsonl(args.corpus) if args.corpus else make_corpus(args.documents, seed=args.seed)
+    queries = read_jsonl(args.queries) if args.queries else make_query_log(args.distinct_queries, corpus, args.query_exponent, args.seed + 1)
+    for query in queries:
+        query.setdefault("weight", 1.0)
+    return corpus, queries
+
+def main(args: argparse.Namespace):
+    corpus, queries = load_workload(args)
+    print(f"{len(corpus)} documents, {len(queries)} distinct queries, concurrency={args.concurrency}")
+
+    stand_ins = None if args.target else StandIns(corpus, queries, args)
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key != "command"},
+        "scenarios": {}
+    }
+    try:
+        for name in args.scenarios:
+            results["scenarios"][name] = run_scenario(name, queries, args, stand_ins)
+            report(name, results["scenarios"][name])
+    finally:
+        if stand_ins is not None:
+            stand_ins.stop()
+    results["load_generator_max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    output = args.output or os.path.join(
+        BENCHMARKS_DIR, "results", f"load_test-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results saved to {output}")
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve_parser = argparse.ArgumentParser()
+        serve_parser.add_argument("command")
+        serve_parser.add_argument("--port", type=int, required=True)
+        serve_parser.add_argument("--synthetic-embeddings", action="store_true")
+        serve_parser.add_argument("--embedding-ms", type=float, default=0.0)
+        serve(serve_parser.parse_args())
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=["search", "typeahead", "miss-storm"])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--warmup", type=int, default=200, help="Unrecorded requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--storm-queries", type=int, default=5, help="Distinct new queries per miss-storm round")
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--distinct-queries", type=int, default=2000)
+    parser.add_argument("--query-exponent", type=float, default=1.0)
+    parser.add_argument("--corpus", help="JSONL documents instead of the synthetic corpus")
+    parser.add_argument("--queries", help="JSONL {query, weight} log instead of the synthetic one")
+    parser.add_argument("--stats-searches", type=int, default=100000, help="Searches behind the preloaded query counts")
+    parser.add_argument("--es-latency-ms", type=float, default=2.0)
+    parser.add_argument("--google-latency-ms", type=float, default=150.0)
+    parser.add_argument("--google-error-rate", type=float, default=0.0)
+    parser.add_argument("--synthetic-embeddings", action="store_true")
+    parser.add_argument("--embedding-ms", type=float, default=5.0, help="Simulated model time per synthetic batch")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout (s)")
+    parser.add_argument("--target", help="Base URL of a running deployment; skips the local stand-ins")
+    parser.add_argument("--server-pid", type=int, help="Process whose RSS is sampled with --target")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/load_test-<time>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show the server's log output")
+    main(parser.parse_args())
@@ -0,0 +1,102 @@
+"""
+Per-call overhead of the instrumentation layer: a stage span, a counter
+increment, a histogram observation, the traced() route wrapper and a
+/metrics render. Each timing subtracts an empty loop of the same length.
+
+"span + otel" wraps every span in an OpenTelemetry span from the installed
+API (no-op unless an SDK is configured), as TRACING_ENABLED=true does.
+
+Usage (from the backend directory):
+
+    python benchmarks/metrics_overhead.py --iterations 1000000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core import metrics  # noqa: E402
+
+def per_call_ns(function, iterations: int) -> float:
+    started = time.perf_counter()
+    function(iterations)
+    return (time.perf_counter() - started) / iterations * 1e9
+
+def empty(iterations: int):
+    for _ in range(iterations):
+        pass
+
+def spans(iterations: int):
+    stage = metrics.stage
+    for _ in range(iterations):
+        with stage("benchmark"):
+            pass
+
+def counters(iterations: int):
+    for _ in range(iterations):
+        metrics.record_cache("benchmark", "hit")
+
+def observations(iterations: int):
+    child = metrics.stage_seconds.labels("benchmark")
+    for _ in range(iterations):
+        child.observe(0.003)
+
+def routes(iterations: int):
+    @metrics.traced("benchmark")
+    async def handler():
+        return None
+
+    async def run():
+        for _ in range(iterations):
+            await handler()
+
+    asyncio.run(run())
+
+def direct_calls(iterations: int):
+    async def handler():
+        return None
+
+    async def run():
+        for _ in range(iterations):
+            await handler()
+
+    asyncio.run(run())
+
+def report(name: str, nanoseconds: float):
+    print(f"{name:<22} {nanoseconds:9.1f} ns/call  ({nanoseconds / 1000:.3f} us)")
+
+def main(args):
+    baseline = per_call_ns(empty, args.iterations)
+    report("span", per_call_ns(spans, args.iterations) - baseline)
+    report("counter inc", per_call_ns(counters, args.iterations) - baseline)
+    report("histogram observe", per_call_ns(observations, args.iterations) - baseline)
+    report("traced route", per_call_ns(routes, args.iterations) - per_call_ns(direct_calls, args.iterations))
+
+    metrics.METRICS_ENABLED, tracer = False, metrics.tracer
+    metrics.tracer = None
+    report("span (disabled)", per_call_ns(spans, args.iterations) - baseline)
+    metrics.METRICS_ENABLED = True
+
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("span + otel             skipped (opentelemetry-api not installed)")
+    else:
+        metrics.tracer = trace.get_tracer("indexify")
+        report("span + otel", per_call_ns(spans, args.iterations // 10) - baseline)
+    metrics.tracer = tracer
+
+    started = time.perf_counter()
+    for _ in range(args.renders):
+        text = metrics.render_metrics()
+    print(f"{'render /metrics':<22} {(time.perf_counter() - started) / args.renders * 1e6:9.1f} us/call  "
+          f"({len(text.splitlines())} lines)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000000)
+    parser.add_argument("--renders", type=int, default=1000)
+    main(parser.parse_args())
@@ -0,0 +1,179 @@
+"""
+Memory, disk and recall trade-off of each VECTOR_QUANTIZATION level.
+
+Memory and disk are per vector, from the Elasticsearch sizing formulas for
+HNSW indices: the kNN search needs the (quantized) vectors in the page
+cache, and the quantized float levels keep the raw float32 vectors on
+disk next to the quantized copy for rescoring. The JSON column is the
+vector as the app sends it in the bulk body and stores in _source,
+measured with the client's serializer.
+
+Recall@k is computed offline with NumPy against the exact float top-k,
+scoring every document with a simulation of each quantization:
+
+    int8, int4  per-index quantiles of the components, 255 or 15 levels,
+                query quantized the same way
+    bbq         1 bit per dimension around the corpus centroid, scored with
+                the RaBitQ estimator and a float query
+    byte        components rounded to int8 (x127) on both sides
+
+"rescored" takes the top k * --oversample by the quantized score and
+reorders them with the float query: against the raw floats for int8,
+int4 and bbq (knn.rescore_vector), against the stored int8 vectors for
+byte (VectorQuantization.rescore). The HNSW graph is not simulated, so
+these are the recalls of an exhaustive search over quantized vectors;
+for the live numbers with the graph, run knn_recall.py per level:
+
+    VECTOR_QUANTIZATION=int8 ES_URL=http://localhost:9200 python benchmarks/knn_recall.py
+
+The corpus is clustered synthetic unit vectors, or real embeddings from
+a .npy matrix (--vectors). Usage (from the backend directory):
+
+    python benchmarks/quantization_report.py --documents 50000 --projected-documents 10000000
+"""
+import argparse
+import os
+import sys
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from elasticsearch.serializer import JsonSerializer  # noqa: E402
+from core.quantization import QUANTIZATION_LEVELS, VectorQuantization  # noqa: E402
+
+# "default" is whatever the cluster picks; report the explicit levels
+LEVELS = [level for level in QUANTIZATION_LEVELS if level != "default"]
+
+def make_corpus(count: int, dims: int, clusters: int, spread: float, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dims)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    noise = rng.standard_normal((count, dims)).astype(np.float32) * spread / np.sqrt(dims)
+    vectors = centers[rng.integers(clusters, size=count)] + noise
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def vector_bytes(level: str, dims: int) -> Tuple[float, float]:
+    """
+    (page cache needed by the kNN search, disk) in bytes per vector
+    """
+    float_bytes = 4 * dims
+    quantized = {
+        "float": float_bytes,
+        "int8": dims + 4,
+        "int4": dims / 2 + 4,
+        "bbq": dims / 8 + 14,
+        "byte": dims
+    }[level]
+    if level in ("float", "byte"):
+        return quantized, quantized
+    return quantized, quantized + float_bytes
+
+def json_bytes(quantization: VectorQuantization, vectors: np.ndarray, sample: int = 200) -> float:
+    serializer = JsonSerializer()
+    encoded = quantization.encode(vectors[:sample])
+    return float(np.mean([len(serializer.dumps({"vector": vector})) - len('{"vector":}') for vector in encoded]))
+
+def scalar_quantize(vectors: np.ndarray, lower: float, upper: float, levels: int) -> np.ndarray:
+    step = (upper - lower) / levels
+    return np.rint((np.clip(vectors, lower, upper) - lower) / step) * step + lower
+
+def quantized_scores(level: str, corpus: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """
+    Query-by-document similarities as the quantized index computes them
+    """
+    dims = corpus.shape[1]
+    if level == "float":
+        return queries @ corpus.T
+    if level in ("int8", "int4"):
+        # Elasticsearch's default int8 confidence interval, 1 - 1 / (dims + 1)
+        tail = 0.5 / (dims + 1)
+        lower, upper = np.quantile(corpus, [tail, 1 - tail])
+        levels = 255 if level == "int8" else 15
+        return scalar_quantize(queries, lower, upper, levels) @ scalar_quantize(corpus, lower, upper, levels).T
+    if level == "bbq":
+        centroid = corpus.mean(axis=0)
+        residuals = corpus - centroid
+        lengths = np.maximum(np.linalg.norm(residuals, axis=1), 1e-12)
+        units = residuals / lengths[:, None]
+        codes = np.where(units >= 0, 1.0, -1.0).astype(np.float32) / np.sqrt(dims)
+        # Per-vector corrections stored next to the bits
+        alignment = np.maximum(np.sum(codes * units, axis=1), 1e-6)
+        offsets = corpus @ centroid
+        centered = queries - centroid
+        estimated = (centered @ codes.T) / alignment
+        return estimated * lengths + offsets
+    quantization = VectorQuantization("byte")
+    return quantization.encode(queries).astype(np.float32) @ quantization.encode(corpus).astype(np.float32).T
+
+def recall(found: np.ndarray, exact: np.ndarray) -> float:
+    k = exact.shape[1]
+    return float(np.mean([len(set(row) & set(truth)) / k for row, truth in zip(found.tolist(), exact.tolist())]))
+
+def evaluate(level: str, corpus: np.ndarray, queries: np.ndarray, exact: np.ndarray, args) -> Dict[str, Any]:
+    k = exact.shape[1]
+    scores = quantized_scores(level, corpus, queries)
+    top = np.argsort(-scores, axis=1)
+    result = {"recall": recall(top[:, :k], exact), "rescored": None}
+    if level != "float" and args.oversample > 1:
+        candidates = top[:, :int(np.ceil(k * args.oversample))]
+        # byte indices have no float copy to rescore against
+        quantization = VectorQuantization(level)
+        stored = quantization.decode(quantization.encode(corpus))
+        rescored = []
+        for query, rows in zip(queries, candidates):
+            vectors = stored[rows]
+            similarity = vectors @ query / np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+            rescored.append(rows[np.argsort(-similarity, kind="stable")[:k]])
+        result["rescored"] = recall(np.asarray(rescored), exact)
+    return result
+
+def main(args):
+    rng = np.random.default_rng(42)
+    if args.vectors:
+        corpus = np.load(args.vectors).astype(np.float32)
+        corpus /= np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+    else:
+        corpus = make_corpus(args.documents, args.dims, args.clusters, args.spread, rng)
+    count, dims = corpus.shape
+
+    # Queries are perturbed corpus vectors
+    query_ids = rng.choice(count, size=min(args.queries, count), replace=False)
+    queries = corpus[query_ids] + args.query_noise / np.sqrt(dims) * rng.standard_normal((len(query_ids), dims)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = np.argsort(-(queries @ corpus.T), axis=1)[:, :args.k]
+
+    projected = args.projected_documents or count
+    print(
+        f"{count} documents x {dims} dims, {len(query_ids)} queries, recall@{args.k}, "
+        f"rescoring x{args.oversample:g}; totals for {projected} documents"
+    )
+    print(
+        f"{'level':<7} {'kNN RAM/vec':>11} {'disk/vec':>9} {'JSON/vec':>9} "
+        f"{'kNN RAM':>10} {'disk':>10} {'recall':>7} {'rescored':>9}"
+    )
+    for level in args.levels:
+        memory, disk = vector_bytes(level, dims)
+        json_size = json_bytes(VectorQuantization(level), corpus)
+        result = evaluate(level, corpus, queries, exact, args)
+        rescored = "-" if result["rescored"] is None else f"{result['rescored']:.3f}"
+        print(
+            f"{level:<7} {memory:9.0f} B {disk:7.0f} B {json_size:7.0f} B "
+            f"{memory * projected / 1024 ** 2:7.0f} MB {disk * projected / 1024 ** 2:7.0f} MB "
+            f"{result['recall']:7.3f} {rescored:>9}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--spread", type=float, default=0.6, help="Noise around the cluster centers")
+    parser.add_argument("--query-noise", type=float, default=0.3)
+    parser.add_argument("--vectors", help="Real embeddings as a .npy matrix, instead of the synthetic corpus")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversample", type=float, default=3.0)
+    parser.add_argument("--levels", nargs="+", choices=LEVELS, default=LEVELS)
+    parser.add_argument("--projected-documents", type=int, default=0, help="Document count for the total sizes")
+    main(parser.parse_args())
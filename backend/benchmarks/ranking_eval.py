@@ -0,0 +1,156 @@
+"""
+Offline evaluation of the rerank stage: nDCG@k and re-ranking latency per
+fusion strategy over the same first-stage candidates.
+
+Without --queries, candidates are synthetic: each query gets graded
+documents (0-3) whose vectors, BM25 scores, publication dates and search
+counts are noisy functions of the grade, so every signal helps a little
+and none is sufficient alone. --source-vectors ships the vectors in the
+hits, as the local vector index path does, instead of ES-computed
+similarities.
+
+With --queries (JSONL of {"query", "relevant": {id: grade} or [ids]}) the
+candidates are retrieved from ES_URL with the configured embedding
+backend, once per query, and the retrieval latency is reported too.
+
+Usage (from the backend directory):
+
+    python benchmarks/ranking_eval.py --queries-count 500 --candidates 100
+    ES_URL=http://localhost:9200 python benchmarks/ranking_eval.py --queries queries.jsonl --index documents
+    python benchmarks/ranking_eval.py --weights '{"fusion": "linear", "text_weight": 0.7, "recency_weight": 0.2}'
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core.reranker import SIMILARITY_FIELD, RankingWeights, rerank  # noqa: E402
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+STRATEGIES = {
+    "bm25": RankingWeights(fusion="linear", text_weight=1.0, vector_weight=0.0),
+    "vector": RankingWeights(fusion="linear", text_weight=0.0, vector_weight=1.0),
+    "rrf": RankingWeights(fusion="rrf"),
+    "linear": RankingWeights(fusion="linear"),
+    "rrf+recency": RankingWeights(fusion="rrf", recency_weight=0.3),
+    "rrf+popularity": RankingWeights(fusion="rrf", popularity_weight=0.3),
+    "linear+recency+popularity": RankingWeights(fusion="linear", recency_weight=0.3, popularity_weight=0.3)
+}
+
+def ndcg(ranked_ids: list[str], grades: dict[str, float], k: int) -> float:
+    gains = [grades.get(doc_id, 0.0) for doc_id in ranked_ids[:k]]
+    dcg = sum((2 ** gain - 1) / np.log2(rank + 2) for rank, gain in enumerate(gains))
+    ideal = sorted(grades.values(), reverse=True)[:k]
+    idcg = sum((2 ** gain - 1) / np.log2(rank + 2) for rank, gain in enumerate(ideal))
+    return dcg / idcg if idcg else 0.0
+
+def synthetic_query(rng: np.random.Generator, documents: int, candidates: int, dims: int, source_vectors: bool = False):
+    query = rng.normal(size=dims)
+    grades = rng.choice([0, 1, 2, 3], size=documents, p=[0.85, 0.08, 0.05, 0.02])
+    vectors = np.outer(grades * 0.06, query) + rng.normal(size=(documents, dims))
+    text_match = rng.random(documents) < 0.5 + 0.1 * grades
+    bm25 = np.where(text_match, np.maximum(0.1, 2.0 * grades + rng.normal(0, 2.5, documents)), 0.0)
+    ages = rng.exponential(3650 / (1 + grades))
+    searches = rng.poisson(1 + 2 * grades)
+
+    similarity = vectors @ query / np.linalg.norm(vectors, axis=1) / np.linalg.norm(query)
+
+    def hit(i: int, score: float) -> dict:
+        result = {
+            "_id": str(i),
+            "_score": float(score),
+            "_source": {
+                "publication_date": (date(2026, 1, 1) - timedelta(days=int(ages[i]))).isoformat(),
+                "search_count": int(searches[i])
+            }
+        }
+        # As returned by the rerank retrievals, or with the vector as fetched from the local vector index
+        if source_vectors:
+            result["_source"]["vector"] = vectors[i].tolist()
+        else:
+            result["fields"] = {SIMILARITY_FIELD: [float(similarity[i])]}
+        return result
+
+    text_order = [i for i in np.argsort(-bm25) if text_match[i]][:candidates]
+    vector_order = np.argsort(-similarity)[:candidates]
+    hit_lists = [[hit(i, bm25[i]) for i in text_order], [hit(i, similarity[i]) for i in vector_order]]
+    relevant = {str(i): float(g) for i, g in enumerate(grades) if g > 0}
+    return query.tolist(), hit_lists, relevant
+
+def synthetic_candidates(args):
+    rng = np.random.default_rng(0)
+    return [
+        synthetic_query(rng, args.documents, args.candidates, args.dims, args.source_vectors)
+        for _ in range(args.queries_count)
+    ], []
+
+def es_candidates(args):
+    from elasticsearch import Elasticsearch
+    from core.custom_search import build_msearch, build_text_query
+    from core.embedding_backends import create_embedding_backend
+    from core.reranker import build_candidate_bodies
+
+    client = Elasticsearch(os.environ["ES_URL"], request_timeout=60)
+    backend = create_embedding_backend(os.getenv("EMBEDDING_BACKEND", "minilm"))
+    with open(args.queries) as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+
+    candidates, timings = [], []
+    for item in queries:
+        relevant = item["relevant"]
+        grades = relevant if isinstance(relevant, dict) else {str(doc_id): 1.0 for doc_id in relevant}
+        query_vector = backend.embed([item["query"]])[0]
+        bodies = build_candidate_bodies(build_text_query(item["query"]), query_vector, args.candidates, args.num_candidates)
+        started = time.perf_counter()
+        responses = client.msearch(searches=build_msearch(args.index, bodies))["responses"]
+        timings.append((time.perf_counter() - started) * 1000)
+        candidates.append((query_vector, [response["hits"]["hits"] for response in responses], grades))
+    return candidates, timings
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def main(args):
+    strategies = dict(STRATEGIES)
+    if args.weights:
+        strategies["custom"] = RankingWeights(**json.loads(args.weights))
+
+    candidates, retrieval_ms = es_candidates(args) if args.queries else synthetic_candidates(args)
+    print(f"{len(candidates)} queries, up to {args.candidates} candidates per retrieval")
+    if retrieval_ms:
+        print(f"retrieval (msearch) p50={percentile(retrieval_ms, 0.5):.1f}ms p99={percentile(retrieval_ms, 0.99):.1f}ms")
+
+    for name, weights in strategies.items():
+        scores, timings = [], []
+        for query_vector, hit_lists, grades in candidates:
+            started = time.perf_counter()
+            ranked = rerank(hit_lists, query_vector, weights, args.k, now=NOW)
+            timings.append((time.perf_counter() - started) * 1e6)
+            scores.append(ndcg([hit["_id"] for hit in ranked], grades, args.k))
+        print(
+            f"{name:<26} nDCG@{args.k}={statistics.mean(scores):.4f} "
+            f"rerank p50={percentile(timings, 0.5):7.1f}us p99={percentile(timings, 0.99):7.1f}us"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", help="JSONL queries with graded relevance (needs ES_URL)")
+    parser.add_argument("--index", default=os.getenv("INDEX_NAME"))
+    parser.add_argument("--queries-count", type=int, default=500, help="Synthetic queries")
+    parser.add_argument("--documents", type=int, default=2000, help="Synthetic documents per query")
+    parser.add_argument("--dims", type=int, default=64)
+    parser.add_argument("--candidates", type=int, default=100)
+    parser.add_argument("--num-candidates", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--source-vectors", action="store_true", help="Synthetic hits carry vectors instead of similarities")
+    parser.add_argument("--weights", help="JSON RankingWeights evaluated as the 'custom' strategy")
+    main(parser.parse_args())
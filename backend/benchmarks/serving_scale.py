@@ -0,0 +1,173 @@
+"""
+Resident memory and search throughput as API workers scale from 1 to N,
+for the two ways of serving the model:
+
+    per-worker  uvicorn --workers N, every worker loads its own model and
+                keeps its own embedding cache
+    shared      scripts/serve.py's layout: one embedding server process
+                holds the model, workers embed over its Unix socket and
+                share an embedding cache in shared memory
+
+The model is the synthetic one (synthetic_embeddings.py) with --model-mb
+of touched memory standing in for the weights and --embedding-ms of
+simulated model time per batch; the index is the fake Elasticsearch.
+The result cache is off, so every search asks for a query embedding.
+Memory is summed over the uvicorn process tree and the embedding server,
+as RSS and as PSS; RSS counts shared pages (the shared cache) once per
+process that maps them, PSS splits them between those processes.
+
+Usage (from the backend directory):
+
+    python benchmarks/serving_scale.py --workers 1 2 4 --requests 3000 --concurrency 32
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCHMARKS_DIR, "..", "app")
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, APP_DIR)
+
+from cold_start import process_tree_pss, process_tree_rss  # noqa: E402
+from load_test import INDEX_NAME, Recorder, StandIns, closed_loop, search, wait_until_up  # noqa: E402
+from workload import ZipfSampler, make_corpus, make_query_log  # noqa: E402
+
+MODES = ("per-worker", "shared")
+
+def run_embedding_server(socket_path: str, embedding_ms: float, model_mb: float):
+    from core.embedding_server import serve
+    from synthetic_embeddings import SyntheticBackend
+
+    asyncio.run(serve(socket_path, SyntheticBackend(embedding_ms / 1000, model_mb)))
+
+def start_api(args: argparse.Namespace, stand_ins: StandIns, workers: int, extra_env: Dict[str, str]) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        ELASTICSEARCH_CLOUD_ID=stand_ins.es_url,
+        INDEX_NAME=INDEX_NAME,
+        GOOGLE_SEARCH_URL=stand_ins.google_url,
+        GOOGLE_API_KEY="bench",
+        SEARCH_ENGINE_ID="bench",
+        RESULT_CACHE_SIZE="0",
+        SUGGESTION_BACKEND="query",
+        SYNTHETIC_EMBEDDING_MS=str(args.embedding_ms),
+        SYNTHETIC_MODEL_MB=str(args.model_mb),
+        PYTHONPATH=os.pathsep.join([BENCHMARKS_DIR, os.environ.get("PYTHONPATH", "")]),
+        **extra_env
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "synthetic_embeddings:create_app", "--factory",
+            "--port", str(args.port), "--workers", str(workers), "--log-level", "warning"
+        ],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.port}", args.startup_timeout)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+async def drive(args: argparse.Namespace, queries: ZipfSampler) -> Dict[str, Any]:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60, limits=limits) as client:
+        async def step(rng: random.Random, budget: List[int]):
+            budget[0] -= 1
+            await search(recorder, client, queries.sample(rng))
+
+        # Every worker has started and loaded its model before the clock starts
+        await closed_loop(args.concurrency, args.concurrency * 4, step, seed=1)
+        recorder = Recorder()
+        started = time.perf_counter()
+        await closed_loop(args.concurrency, args.requests, step, seed=2)
+        return recorder.summary(time.perf_counter() - started)
+
+def measure(mode: str, workers: int, args: argparse.Namespace, stand_ins: StandIns, queries: ZipfSampler) -> Dict[str, Any]:
+    from core.shared_embedding_cache import SharedEmbeddingCache
+
+    stand_ins.call("reset")
+    embedding_server = cache = None
+    extra_env: Dict[str, str] = {}
+    if mode == "shared":
+        socket_path = f"/tmp/indexify-bench-embeddings-{args.port}.sock"
+        cache_name = f"indexify-bench-embeddings-{args.port}"
+        cache = SharedEmbeddingCache(cache_name, slots=args.shared_cache_slots)
+        embedding_server = multiprocessing.get_context("spawn").Process(
+            target=run_embedding_server, args=(socket_path, args.embedding_ms, args.model_mb), daemon=True
+        )
+        embedding_server.start()
+        extra_env = {"EMBEDDING_SERVER_SOCKET": socket_path, "EMBEDDING_SHARED_CACHE": cache_name}
+
+    api = start_api(args, stand_ins, workers, extra_env)
+    try:
+        summary = asyncio.run(drive(args, queries))
+        pids = [api.pid] + ([embedding_server.pid] if embedding_server else [])
+        rss = sum(process_tree_rss(pid) for pid in pids)
+        pss = sum(process_tree_pss(pid) for pid in pids)
+    finally:
+        api.terminate()
+        api.wait(timeout=30)
+        if embedding_server is not None:
+            embedding_server.terminate()
+            embedding_server.join(timeout=10)
+    result = {
+        "mode": mode,
+        "workers": workers,
+        "rss_mb": rss / 1024 / 1024,
+        "pss_mb": pss / 1024 / 1024,
+        "throughput": summary["throughput"],
+        "p50_ms": summary["p50_ms"],
+        "p95_ms": summary["p95_ms"],
+        "errors": summary["errors"]
+    }
+    if cache is not None:
+        result["shared_cache_entries"] = cache.occupancy()
+        cache.close()
+    return result
+
+def main(args: argparse.Namespace):
+    corpus = make_corpus(args.documents)
+    query_log = make_query_log(args.distinct_queries, corpus)
+    queries = ZipfSampler([query["query"] for query in query_log], weights=[query["weight"] for query in query_log])
+    args.google_latency_ms, args.google_error_rate, args.stats_searches = 0.0, 0.0, 0
+    stand_ins = StandIns(corpus, [], args)
+    try:
+        print(f"{os.cpu_count()} CPU(s), {args.model_mb:.0f} MB model, {args.embedding_ms:.0f} ms per model batch")
+        for workers in args.workers:
+            for mode in args.modes:
+                result = measure(mode, workers, args, stand_ins, queries)
+                print(
+                    f"workers={workers:<3} {mode:<11} RSS {result['rss_mb']:6.0f} MB  PSS {result['pss_mb']:6.0f} MB  "
+                    f"{result['throughput']:7.1f} req/s  p50 {result['p50_ms']:6.1f}ms  "
+                    f"p95 {result['p95_ms']:6.1f}ms  errors {result['errors']}"
+                )
+    finally:
+        stand_ins.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--distinct-queries", type=int, default=5000)
+    parser.add_argument("--es-latency-ms", type=float, default=2.0)
+    parser.add_argument("--embedding-ms", type=float, default=5.0, help="Simulated model time per batch")
+    parser.add_argument("--model-mb", type=float, default=90.0, help="Memory standing in for the model weights")
+    parser.add_argument("--shared-cache-slots", type=int, default=65536)
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--verbose", action="store_true")
+    main(parser.parse_args())
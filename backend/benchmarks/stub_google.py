@@ -0,0 +1,91 @@
+"""
+Local stand-in for the Google Custom Search JSON API.
+
+Returns deterministic items for any query, honours `num` and `start`, and
+can add latency or fail a fraction of requests with 429/500 to exercise
+the fetcher's retry and rate-limit paths. Point GOOGLE_SEARCH_URL at
+`server.url` to use it:
+
+    with StubGoogleServer(latency_ms=50) as server:
+        os.environ["GOOGLE_SEARCH_URL"] = server.url
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+def make_items(query: str, start: int, num: int) -> List[Dict[str, str]]:
+    slug = "-".join(query.lower().split()) or "empty"
+    return [
+        {
+            "title": f"{query} result {position}",
+            "snippet": f"Snippet {position} about {query} and related topics",
+            "link": f"https://example.com/{slug}/{position}"
+        }
+        for position in range(start, start + num)
+    ]
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        if server.rng.random() < server.error_rate:
+            status, payload = server.rng.choice([429, 500]), {"error": {"message": "stub failure"}}
+        else:
+            start = int(params.get("start", 1))
+            num = min(int(params.get("num", 10)), 10)
+            status, payload = 200, {"items": make_items(params.get("q", ""), start, num)}
+
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class StubGoogleServer:
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency_ms / 1000
+        self.httpd.error_rate = error_rate
+        self.httpd.rng = random.Random(0)
+        self.httpd.requests = 0
+        self.httpd.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/customsearch/v1"
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    def start(self) -> "StubGoogleServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubGoogleServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
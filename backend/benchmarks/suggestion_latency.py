@@ -0,0 +1,132 @@
+"""
+Per-keystroke latency of /api/suggestions backends: the in-process trie
+versus the Elasticsearch paths (stats prefix + phrase_prefix queries, and
+stats prefix + completion suggester in one _msearch) against the local
+fake Elasticsearch with a fixed round-trip delay.
+
+Every sample query is typed one character at a time and each prefix is
+timed, which is what the frontend does while the user types.
+
+Usage (from the backend directory):
+
+    python benchmarks/suggestion_latency.py --titles 50000 --queries 20000 --latency-ms 2
+    python benchmarks/suggestion_latency.py --titles 50000 --max-titles 20000 --memory --es-keystrokes 0
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from elasticsearch import AsyncElasticsearch  # noqa: E402
+from core.suggestion_index import SuggestionIndex  # noqa: E402
+from core.suggestions import async_get_search_suggestions, async_get_completion_suggestions  # noqa: E402
+from fake_es import FakeElasticsearchServer  # noqa: E402
+
+WORDS = (
+    "search vector neural ranking index query semantic retrieval learning deep "
+    "elastic embedding model language dense sparse hybrid graph network data "
+    "cluster shard cache latency throughput token text document score relevance"
+).split()
+
+def make_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def report(name: str, timings_us: list[float]):
+    print(
+        f"{name:<12} keystrokes={len(timings_us):6d} "
+        f"p50={percentile(timings_us, 0.5):10.1f}us "
+        f"p99={percentile(timings_us, 0.99):10.1f}us "
+        f"mean={statistics.mean(timings_us):10.1f}us"
+    )
+
+def keystrokes(samples: list[str]) -> list[str]:
+    return [sample[:length] for sample in samples for length in range(1, len(sample) + 1)]
+
+def build_trie(args, titles: list[str], queries: list[tuple[str, int]]) -> SuggestionIndex:
+    index = SuggestionIndex(top_k=args.top_k, max_queries=args.max_queries, max_titles=args.max_titles)
+    for query, count in queries:
+        index.add_query(query, count)
+    for title in titles:
+        index.add_document({"title": title, "keywords": title.split()[:2]})
+    return index
+
+def report_trie_memory(args, titles: list[str], queries: list[tuple[str, int]]):
+    # A separate build, as tracing allocations slows it down several times
+    tracemalloc.start()
+    index = build_trie(args, titles, queries)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    status = index.status()
+    print(f"trie memory: {memory / 1024 ** 2:.1f} MB, {memory / max(status['entries'], 1):.0f} B per entry")
+
+def bench_trie(args, titles: list[str], queries: list[tuple[str, int]], prefixes: list[str]):
+    started = time.perf_counter()
+    index = build_trie(args, titles, queries)
+    print(f"trie build: {time.perf_counter() - started:.2f}s, {index.status()}")
+    if args.memory:
+        report_trie_memory(args, titles, queries)
+
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.suggest(prefix, size=args.size)
+        timings.append((time.perf_counter() - started) * 1e6)
+    report("memory", timings)
+
+async def bench_es(args, server: FakeElasticsearchServer, prefixes: list[str]):
+    client = AsyncElasticsearch(server.url)
+    for name, fn in (("query", async_get_search_suggestions), ("completion", async_get_completion_suggestions)):
+        requests_before = server.es.requests
+        timings = []
+        for prefix in prefixes[:args.es_keystrokes]:
+            started = time.perf_counter()
+            await fn(client, "bench", prefix, args.size)
+            timings.append((time.perf_counter() - started) * 1e6)
+        report(name, timings)
+        print(f"{'':<12} es_requests/keystroke={(server.es.requests - requests_before) / len(timings):.1f}")
+    await client.close()
+
+def main(args):
+    rng = random.Random(0)
+    titles = [make_text(rng, rng.randint(3, 8)).capitalize() for _ in range(args.titles)]
+    # Zipf-like popularity: a few queries are searched far more than the rest
+    queries = [(make_text(rng, rng.randint(1, 4)), max(1, int(1000 / (rank + 1)))) for rank in range(args.queries)]
+    samples = [query for query, _ in rng.sample(queries, min(args.samples, len(queries)))]
+    prefixes = keystrokes(samples)
+
+    bench_trie(args, titles, queries, prefixes)
+
+    if args.es_keystrokes:
+        with FakeElasticsearchServer(latency_ms=args.latency_ms) as server:
+            server.es.indices["bench"] = {str(i): {"title": title} for i, title in enumerate(titles[:args.es_documents])}
+            server.es.indices["bench_stats"] = {
+                str(i): {"query": query, "count": count, "is_trending": count > 5}
+                for i, (query, count) in enumerate(queries[:args.es_documents])
+            }
+            asyncio.run(bench_es(args, server, prefixes))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--size", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--max-queries", type=int, default=100000)
+    parser.add_argument("--max-titles", type=int, default=100000)
+    parser.add_argument("--memory", action="store_true", help="Also report the trie memory per entry")
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--es-keystrokes", type=int, default=200, help="0 skips the Elasticsearch backends")
+    parser.add_argument("--es-documents", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,74 @@
+"""
+Stand-in embedding model for the serving benchmarks: hash-seeded unit
+vectors (the same text always gets the same vector) plus a simulated
+model time per batch, so the API can be measured without torch.
+
+--model-mb allocates and touches that much memory once per process, in
+place of the model weights (all-MiniLM-L6-v2 is about 90 MB in float32),
+so resident memory grows with every process that loads a model the way
+the real one does.
+
+Used in-process through install(), or as a uvicorn factory for multi-worker
+servers (settings from SYNTHETIC_EMBEDDING_MS / SYNTHETIC_MODEL_MB):
+
+    python -m uvicorn synthetic_embeddings:create_app --factory --workers 4
+"""
+import hashlib
+import os
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from core.embedding_backends import EmbeddingBackend  # noqa: E402
+
+class SyntheticBackend(EmbeddingBackend):
+    name = "synthetic"
+    normalized = True
+
+    def __init__(self, delay: float = 0.0, model_mb: float = 0.0):
+        self.delay = delay
+        self.model_mb = model_mb
+        self.weights: Optional[np.ndarray] = None
+
+    def warm(self):
+        if self.weights is None and self.model_mb:
+            # ones() rather than zeros() so every page is actually resident
+            self.weights = np.ones(int(self.model_mb * 1024 * 1024 // 4), dtype=np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        self.warm()
+        if self.delay:
+            time.sleep(self.delay)
+        vectors = np.empty((len(texts), self.dims), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dims)
+            vectors[row] = vector / np.linalg.norm(vector)
+        return vectors
+
+def install(delay: float = 0.0, model_mb: float = 0.0) -> Optional[SyntheticBackend]:
+    """
+    Replaces the configured embedding backend with a SyntheticBackend.
+    Must run before main is imported. Workers of an embedding server keep
+    their remote backend (the server runs the synthetic one).
+    """
+    import core.custom_search as custom_search
+    import core.embedding_backends as embedding_backends
+
+    if os.getenv("EMBEDDING_SERVER_SOCKET"):
+        return None
+    backend = SyntheticBackend(delay, model_mb)
+    embedding_backends.embedding_backend = backend
+    custom_search.embedding_backend = backend
+    return backend
+
+def create_app():
+    install(float(os.getenv("SYNTHETIC_EMBEDDING_MS", "0")) / 1000, float(os.getenv("SYNTHETIC_MODEL_MB", "0")))
+    import main
+    return main.app
@@ -0,0 +1,76 @@
+"""
+Memory per vector, build time, QPS and recall@k of the local VectorIndex
+in brute-force and IVF modes.
+
+Usage (from the backend directory):
+
+    python benchmarks/vector_index_bench.py --sizes 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core.vector_index import VectorIndex  # noqa: E402
+
+def clustered_vectors(count: int, dims: int, rng: np.random.Generator, clusters: int = 1000) -> np.ndarray:
+    # Embeddings of real text are clustered, which is what IVF relies on
+    centers = rng.standard_normal((clusters, dims)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.5 * rng.standard_normal((count, dims)).astype(np.float32)
+    return vectors
+
+def run_queries(index: VectorIndex, queries: np.ndarray, k: int, n_probe: Optional[int] = None):
+    started = time.perf_counter()
+    results = [index.search(query, k, n_probe=n_probe) for query in queries]
+    return results, len(queries) / (time.perf_counter() - started)
+
+def recall(results, truth, k: int) -> float:
+    return float(np.mean([
+        len({doc_id for doc_id, _ in found} & {doc_id for doc_id, _ in exact}) / k
+        for found, exact in zip(results, truth)
+    ]))
+
+def main(args):
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        vectors = clustered_vectors(size, args.dims, rng)
+        ids = [str(i) for i in range(size)]
+        queries = vectors[rng.choice(size, args.queries, replace=False)] + 0.1 * rng.standard_normal((args.queries, args.dims)).astype(np.float32)
+
+        index = VectorIndex(dims=args.dims)
+        started = time.perf_counter()
+        for start in range(0, size, 10000):
+            index.add(ids[start:start + 10000], vectors[start:start + 10000])
+        build = time.perf_counter() - started
+        truth, qps = run_queries(index, queries, args.k)
+        print(
+            f"n={size:>8} brute  build={build:6.1f}s "
+            f"bytes/vector={index.memory_bytes / size:7.1f} qps={qps:8.1f} recall@{args.k}=1.000"
+        )
+
+        started = time.perf_counter()
+        index.train(n_lists=args.lists or int(4 * np.sqrt(size)))
+        train = time.perf_counter() - started
+        for n_probe in args.probes:
+            results, qps = run_queries(index, queries, args.k, n_probe=n_probe)
+            print(
+                f"n={size:>8} ivf    train={train:6.1f}s "
+                f"bytes/vector={index.memory_bytes / size:7.1f} qps={qps:8.1f} "
+                f"recall@{args.k}={recall(results, truth, args.k):.3f} n_probe={n_probe}"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=0)
+    parser.add_argument("--probes", type=int, nargs="+", default=[4, 16, 64])
+    main(parser.parse_args())
@@ -0,0 +1,162 @@
+"""
+Synthetic corpus and query-log generators for the load tests.
+
+Words are pronounceable letter strings (the keyword tokenizer drops
+digits), drawn from a Zipf-distributed vocabulary so titles and abstracts
+share terms the way real text does. Query popularity is Zipfian too: with
+the default exponent of 1.0 the top 1% of distinct queries takes roughly
+half of the traffic, which is what makes the result cache matter.
+
+The generated files can be replaced by real exports with the same shape:
+documents as the index stores them, queries as {"query", "weight"}.
+
+Usage (from the backend directory):
+
+    python benchmarks/workload.py --documents 20000 --queries 5000 --output-dir workload
+"""
+import argparse
+import bisect
+import itertools
+import json
+import os
+import random
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+CONSONANTS = "bcdfghklmnprstvz"
+VOWELS = "aeiou"
+
+def make_words(rng: random.Random, count: int, syllables: tuple = (2, 4)) -> List[str]:
+    """
+    Distinct pronounceable words, e.g. "kodari", "mesu"
+    """
+    words: Dict[str, None] = {}
+    while len(words) < count:
+        length = rng.randint(*syllables)
+        words["".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(length))] = None
+    return list(words)
+
+def zipf_cum_weights(count: int, exponent: float = 1.0) -> List[float]:
+    return list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(count)))
+
+class ZipfSampler:
+    """
+    Draws items with probability proportional to 1 / rank^exponent, the
+    first item being the most popular
+    """
+
+    def __init__(self, items: List, exponent: float = 1.0, weights: Optional[List[float]] = None):
+        self.items = items
+        self.cum_weights = list(itertools.accumulate(weights)) if weights else zipf_cum_weights(len(items), exponent)
+
+    def sample(self, rng: random.Random):
+        position = bisect.bisect_left(self.cum_weights, rng.random() * self.cum_weights[-1])
+        return self.items[min(position, len(self.items) - 1)]
+
+    def sample_many(self, rng: random.Random, count: int) -> List:
+        return rng.choices(self.items, cum_weights=self.cum_weights, k=count)
+
+def make_document(rng: random.Random, words: ZipfSampler, authors: List[str], position: int) -> dict:
+    title = " ".join(words.sample_many(rng, rng.randint(3, 8))).capitalize()
+    abstract = " ".join(words.sample_many(rng, rng.randint(20, 60))).capitalize() + "."
+    published = date(2026, 1, 1) - timedelta(days=int(rng.expovariate(1 / 1500)))
+    return {
+        "title": title,
+        "author": rng.choice(authors),
+        "publication_date": published.isoformat(),
+        "abstract": abstract,
+        "keywords": [],
+        "content": f"https://example.org/papers/{position}",
+        "search_count": 0
+    }
+
+def make_corpus(count: int, vocabulary: int = 20000, exponent: float = 1.0, seed: int = 0) -> List[dict]:
+    """
+    Documents with Zipf-distributed words, deterministic for a seed
+    """
+    rng = random.Random(seed)
+    words = ZipfSampler(make_words(rng, vocabulary), exponent)
+    authors = [" ".join(name.capitalize() for name in make_words(rng, 2)) for _ in range(max(1, count // 20))]
+    return [make_document(rng, words, authors, position) for position in range(count)]
+
+def make_query_log(
+    distinct: int,
+    corpus: List[dict],
+    exponent: float = 1.0,
+    seed: int = 1
+) -> List[dict]:
+    """
+    Distinct queries built from corpus titles, each with a Zipfian weight
+    (expected share of traffic), most popular first
+
+    Args:
+        distinct: Number of distinct queries
+        corpus: Documents the queries are cut from, so they find results
+        exponent: Zipf exponent of query popularity
+        seed: Random seed
+
+    Returns:
+        List[dict]: {"query", "weight"} records
+    """
+    rng = random.Random(seed)
+    queries: Dict[str, None] = {}
+    attempts = 0
+    while len(queries) < distinct and attempts < distinct * 20:
+        attempts += 1
+        words = rng.choice(corpus)["title"].lower().split()
+        length = min(len(words), rng.choice([1, 2, 2, 3, 3, 4]))
+        start = rng.randint(0, len(words) - length)
+        queries[" ".join(words[start:start + length])] = None
+    weights = [1.0 / (rank + 1) ** exponent for rank in range(len(queries))]
+    total = sum(weights)
+    return [{"query": query, "weight": weight / total} for query, weight in zip(queries, weights)]
+
+def iter_novel_queries(seed: int = 2) -> Iterator[str]:
+    """
+    Distinct queries made of words the corpus vocabulary cannot produce
+    (syllables starting with "q"), so every one of them misses the index
+    """
+    rng = random.Random(seed)
+    seen = set()
+    while True:
+        query = " ".join(
+            "".join("q" + rng.choice(VOWELS) + rng.choice(CONSONANTS) for _ in range(3)) for _ in range(2)
+        )
+        if query not in seen:
+            seen.add(query)
+            yield query
+
+def make_novel_queries(count: int, seed: int = 2) -> List[str]:
+    return list(itertools.islice(iter_novel_queries(seed), count))
+
+def write_jsonl(path: str, records: Iterable[dict]):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+def read_jsonl(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def main(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    corpus = make_corpus(args.documents, args.vocabulary, args.exponent, args.seed)
+    queries = make_query_log(args.queries, corpus, args.query_exponent, args.seed + 1)
+    write_jsonl(os.path.join(args.output_dir, "corpus.jsonl"), corpus)
+    write_jsonl(os.path.join(args.output_dir, "queries.jsonl"), queries)
+    top = max(1, len(queries) // 100)
+    print(
+        f"{len(corpus)} documents, {len(queries)} distinct queries "
+        f"(top 1% = {sum(query['weight'] for query in queries[:top]):.0%} of traffic) in '{args.output_dir}'"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--exponent", type=float, default=1.0, help="Zipf exponent of word frequencies")
+    parser.add_argument("--queries", type=int, default=5000, help="Distinct queries in the log")
+    parser.add_argument("--query-exponent", type=float, default=1.0, help="Zipf exponent of query popularity")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="workload")
+    main(parser.parse_args())
@@ -0,0 +1,39 @@
+"""
+One-off job that migrates the search statistics index to one document
+per query.
+
+Stats written before the aggregator keyed documents by the normalized
+query have auto-generated ids, so the upserts and trending snapshots add
+a second document next to them and a query's count is split between the
+two. Every query's documents are merged into one under its id (see
+core/stats_aggregator.py) and the others are deleted in bulk.
+
+    python scripts/collapse_stats.py --dry-run
+    python scripts/collapse_stats.py --index documents
+
+Stop the backend first: counts it flushes meanwhile to a merged query
+would be overwritten.
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core.client import get_client  # noqa: E402
+from core.stats_aggregator import collapse_stats_documents  # noqa: E402
+
+def main(args):
+    logging.basicConfig(level=logging.INFO)
+    report = collapse_stats_documents(get_client(), args.index, dry_run=args.dry_run)
+    print(
+        f"{report['documents']} stats documents, {report['queries']} queries to merge, "
+        f"{len(report['replaced'])} {'to delete' if args.dry_run else 'deleted'}, {report['errors']} errors"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default=os.getenv("INDEX_NAME"))
+    parser.add_argument("--dry-run", action="store_true")
+    main(parser.parse_args())
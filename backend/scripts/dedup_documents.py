@@ -0,0 +1,51 @@
+"""
+One-off job that collapses duplicate documents already in the index.
+
+Documents sharing a normalized URL, a content hash or a near-duplicate
+MinHash signature (see core/dedup.py) are grouped; the most searched copy
+is kept with the group's summed search_count and the others are deleted
+in bulk. Every remaining document gets the url_key and content_hash fields
+that ingest-time dedup looks up.
+
+    python scripts/dedup_documents.py --dry-run
+    python scripts/dedup_documents.py --index documents
+
+Stop the backend first when VECTOR_INDEX_PATH is set: the deleted ids are
+removed from the saved local vector index, which the backend rewrites on
+shutdown.
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core.client import get_client  # noqa: E402
+from core.dedup import DEDUP_COLLAPSE_CAPACITY, collapse_duplicates  # noqa: E402
+from core.vector_index import VectorIndex  # noqa: E402
+
+def main(args):
+    logging.basicConfig(level=logging.INFO)
+    report = collapse_duplicates(get_client(), args.index, dry_run=args.dry_run, max_signatures=args.max_signatures)
+    print(
+        f"{report['documents']} documents, {report['groups']} duplicate groups, "
+        f"{len(report['deleted'])} {'to delete' if args.dry_run else 'deleted'}, {report['errors']} errors"
+    )
+
+    if not args.dry_run and report['deleted'] and args.vector_index and os.path.exists(os.path.join(args.vector_index, "index.json")):
+        index = VectorIndex.load(args.vector_index, mmap=False)
+        removed = index.delete(report['deleted'])
+        index.save(args.vector_index)
+        print(f"{removed} vectors removed from {args.vector_index}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default=os.getenv("INDEX_NAME"))
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--vector-index", default=os.getenv("VECTOR_INDEX_PATH"))
+    parser.add_argument(
+        "--max-signatures", type=int, default=DEDUP_COLLAPSE_CAPACITY,
+        help="MinHash signatures held at once (about 6 KB each); near duplicates further apart are missed"
+    )
+    main(parser.parse_args())
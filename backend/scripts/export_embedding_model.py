@@ -0,0 +1,58 @@
+"""
+Saves a local copy of the embedding model so workers load it from disk
+instead of the Hugging Face hub, optionally exported to ONNX and
+int8-quantized. Point EMBEDDING_MODEL_PATH (and EMBEDDING_MODEL_FORMAT=onnx
+for an ONNX export) at the output directory.
+
+Usage (from the backend directory):
+
+    python scripts/export_embedding_model.py --output models/minilm
+    python scripts/export_embedding_model.py --output models/minilm-onnx --onnx --quantize
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core.model_loader import DEFAULT_MODEL_NAME  # noqa: E402
+
+def export_torch(model_name: str, output: str):
+    from transformers import AutoModel, AutoTokenizer
+
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output)
+    AutoModel.from_pretrained(model_name).save_pretrained(output, safe_serialization=True)
+
+def export_onnx(model_name: str, output: str, quantize: bool):
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output)
+    model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+    model.save_pretrained(output)
+
+    if quantize:
+        # Dynamic int8 quantization; the quantized graph replaces model.onnx
+        quantizer = ORTQuantizer.from_pretrained(output)
+        config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=output, quantization_config=config)
+        os.replace(os.path.join(output, "model_quantized.onnx"), os.path.join(output, "model.onnx"))
+
+def main(args):
+    os.makedirs(args.output, exist_ok=True)
+    if args.onnx:
+        export_onnx(args.model, args.output, args.quantize)
+    else:
+        if args.quantize:
+            print("Torch int8 quantization is applied at load time with EMBEDDING_MODEL_QUANTIZE=int8")
+        export_torch(args.model, args.output)
+    print(f"Model saved to {args.output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--onnx", action="store_true")
+    parser.add_argument("--quantize", action="store_true")
+    main(parser.parse_args())
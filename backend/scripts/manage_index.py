@@ -0,0 +1,104 @@
+"""
+Index lifecycle operations for INDEX_NAME (see core/index_lifecycle.py).
+
+Create the template, the first generation and the read/write aliases:
+
+    python scripts/manage_index.py bootstrap
+
+Copy everything into a new mapping version with a sliced _reindex and swap
+the aliases (also migrates an index created before aliases existed):
+
+    python scripts/manage_index.py reindex --version 2 --slices auto
+
+Re-embed while copying, for a new embedding backend or vector dims:
+
+    python scripts/manage_index.py reindex --version 3 --reembed minilm
+
+Start a new generation once the current one is large enough:
+
+    python scripts/manage_index.py rollover --max-primary-shard-size 30gb
+
+Show where the aliases point:
+
+    python scripts/manage_index.py status
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core.client import get_client  # noqa: E402
+from core.index_lifecycle import (  # noqa: E402
+    MAPPING_VERSION,
+    alias_indices,
+    bootstrap_index,
+    reindex_to_version,
+    rollover,
+    write_alias
+)
+
+def template_options(args) -> dict:
+    options = {"shards": args.shards, "replicas": args.replicas}
+    if args.vector_dims:
+        options["vector_dims"] = args.vector_dims
+    return options
+
+def main(args):
+    logging.basicConfig(level=logging.INFO)
+    client = get_client()
+
+    if args.command == "bootstrap":
+        index = bootstrap_index(client, args.name, args.version, **template_options(args))
+        print(f"created {index}" if index else "nothing to create")
+
+    elif args.command == "reindex":
+        backend = None
+        if args.reembed:
+            from core.embedding_backends import create_embedding_backend
+            backend = create_embedding_backend(args.reembed)
+        slices = int(args.slices) if args.slices.isdigit() else args.slices
+        report = reindex_to_version(
+            client,
+            args.name,
+            args.version,
+            backend=backend,
+            slices=slices,
+            requests_per_second=args.requests_per_second,
+            swap=not args.no_swap,
+            **template_options(args)
+        )
+        print(
+            f"{report['documents']} documents into {report['index']} in {report['seconds']:.1f}s "
+            f"({report['docs_per_second']:.0f} docs/s), {len(report['failures'])} failures, "
+            f"aliases {'swapped' if report['swapped'] else 'unchanged'}"
+        )
+
+    elif args.command == "rollover":
+        response = rollover(client, args.name, args.max_primary_shard_size, args.max_docs, args.max_age)
+        print(json.dumps({key: response.get(key) for key in ("rolled_over", "old_index", "new_index")}))
+
+    elif args.command == "status":
+        print(json.dumps({
+            "read": alias_indices(client, args.name),
+            "write": alias_indices(client, write_alias(args.name))
+        }, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["bootstrap", "reindex", "rollover", "status"])
+    parser.add_argument("--name", default=os.getenv("INDEX_NAME"))
+    parser.add_argument("--version", type=int, default=MAPPING_VERSION)
+    parser.add_argument("--shards", type=int, default=int(os.getenv("INDEX_SHARDS", "1")))
+    parser.add_argument("--replicas", type=int, default=int(os.getenv("INDEX_REPLICAS", "1")))
+    parser.add_argument("--vector-dims", type=int)
+    parser.add_argument("--slices", default="auto")
+    parser.add_argument("--requests-per-second", type=float)
+    parser.add_argument("--reembed", help="Embedding backend used to re-embed while copying")
+    parser.add_argument("--no-swap", action="store_true", help="Copy only; leave the aliases in place")
+    parser.add_argument("--max-primary-shard-size", default="30gb")
+    parser.add_argument("--max-docs", type=int)
+    parser.add_argument("--max-age")
+    main(parser.parse_args())
@@ -0,0 +1,40 @@
+"""
+Offline job that rewrites the stored vectors with the configured embedding
+backend (EMBEDDING_BACKEND, default the mean-pooled normalized MiniLM).
+
+Copying into a new index is required when the similarity changes, for
+example from the old cosine/[CLS] vectors to dot_product:
+
+    python scripts/reembed_documents.py --source documents --dest documents_v3
+
+Re-embedding in place keeps the existing mapping:
+
+    python scripts/reembed_documents.py --source documents --dest documents
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from core.client import get_client  # noqa: E402
+from core.embedding_backends import create_embedding_backend  # noqa: E402
+from core.index import reembed_index  # noqa: E402
+
+def main(args):
+    logging.basicConfig(level=logging.INFO)
+    backend = create_embedding_backend(args.backend)
+    report = reembed_index(get_client(), args.source, args.dest, backend, batch_size=args.batch_size)
+    print(
+        f"{report['documents']} documents re-embedded with '{backend.name}', "
+        f"{report['errors']} errors, {report['docs_per_second']:.1f} docs/s"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source", default=os.getenv("INDEX_NAME"))
+    parser.add_argument("--dest", required=True)
+    parser.add_argument("--backend", default=os.getenv("EMBEDDING_BACKEND", "minilm"))
+    parser.add_argument("--batch-size", type=int, default=256)
+    main(parser.parse_args())
@@ -0,0 +1,91 @@
+"""
+Multi-process serving: one embedding server process holds the model and
+N uvicorn API workers embed through it over a Unix socket, so the model
+is loaded once however many workers run. The workers also share an
+embedding cache in shared memory, so a query embedded by one worker is a
+cache hit on all of them.
+
+The embedding server is restarted if it exits; workers reconnect on
+their next request.
+
+Usage (from the backend directory):
+
+    python scripts/serve.py --workers 4 --port 8000
+"""
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from core.embedding_backends import create_embedding_backend  # noqa: E402
+from core.shared_embedding_cache import SharedEmbeddingCache  # noqa: E402
+
+def start_embedding_server(socket_path: str) -> subprocess.Popen:
+    env = {key: value for key, value in os.environ.items() if key != "EMBEDDING_SHARED_CACHE"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "core.embedding_server", "--socket", socket_path], cwd=APP_DIR, env=env
+    )
+
+def start_api(args: argparse.Namespace, socket_path: str, cache_name: str) -> subprocess.Popen:
+    env = dict(os.environ, EMBEDDING_SERVER_SOCKET=socket_path, EMBEDDING_SHARED_CACHE=cache_name)
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", args.host, "--port", str(args.port), "--workers", str(args.workers)
+        ],
+        cwd=APP_DIR, env=env
+    )
+
+def stop(process: subprocess.Popen, timeout: float = 30):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main(args):
+    logging.basicConfig(level=logging.INFO)
+    socket_path = args.socket or f"/tmp/indexify-embeddings-{args.port}.sock"
+    cache_name = args.shared_cache or f"indexify-embeddings-{args.port}"
+
+    # The launcher owns the segment, so it outlives worker restarts
+    backend = create_embedding_backend(os.getenv("EMBEDDING_BACKEND", "minilm"))
+    cache = SharedEmbeddingCache(cache_name, dims=backend.dims, slots=args.shared_cache_slots)
+    logging.info(f"Shared embedding cache '{cache_name}': {cache.slots} slots, {cache.status()['size_mb']:.0f} MB")
+
+    stopping = []
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.append(True))
+
+    embedding_server = start_embedding_server(socket_path)
+    api = start_api(args, socket_path, cache_name)
+    try:
+        while not stopping and api.poll() is None:
+            if embedding_server.poll() is not None:
+                logging.error(f"Embedding server exited with code {embedding_server.returncode}, restarting it")
+                time.sleep(1)
+                embedding_server = start_embedding_server(socket_path)
+            time.sleep(0.5)
+    finally:
+        stop(api)
+        stop(embedding_server)
+        cache.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SERVER_SOCKET"))
+    parser.add_argument("--shared-cache", default=os.getenv("EMBEDDING_SHARED_CACHE"))
+    parser.add_argument(
+        "--shared-cache-slots", type=int, default=int(os.getenv("EMBEDDING_SHARED_CACHE_SLOTS", "65536"))
+    )
+    main(parser.parse_args())
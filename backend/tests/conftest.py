@@ -0,0 +1,9 @@
+import os
+import sys
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Tests import the application modules the way main.py does, from the app directory,
+# and the local stand-ins (stub_google, fake_es) from the benchmarks directory
+sys.path.insert(0, os.path.join(BACKEND, "app"))
+sys.path.insert(0, os.path.join(BACKEND, "benchmarks"))
@@ -0,0 +1,28 @@
+import asyncio
+
+from api.routes import routes
+from core.index_lifecycle import IndexAliases
+from core.models import AdvancedSearchQuery
+
+class FlakyClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def search(self, index, body):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("cluster unavailable")
+        return {"hits": {"hits": [{"_source": {"title": "Deep learning"}}]}}
+
+def test_failed_advanced_search_is_not_cached():
+    async def scenario():
+        client = FlakyClient()
+        query = AdvancedSearchQuery(title="unique flaky title")
+        aliases = IndexAliases(read="docs", write="docs")
+        first = await routes.advanced_search_endpoint(query, client=client, aliases=aliases)
+        second = await routes.advanced_search_endpoint(query, client=client, aliases=aliases)
+        return first, second, client.calls
+
+    first, second, calls = asyncio.run(scenario())
+    assert first == {"results": []}
+    assert second == {"results": [{"title": "Deep learning"}]} and calls == 2
@@ -0,0 +1,28 @@
+from elasticsearch import Elasticsearch
+
+from core.dedup import find_duplicate_groups
+from fake_es import FakeElasticsearchServer
+
+TEXT = " ".join(f"word{position}" for position in range(200))
+
+def test_signature_limit_bounds_the_near_duplicate_window():
+    server = FakeElasticsearchServer().start()
+    try:
+        client = Elasticsearch(server.url)
+        documents = [
+            {"title": "Original", "abstract": TEXT, "content": "https://example.com/a"},
+            {"title": "Unrelated", "abstract": "something else entirely " * 20, "content": "https://example.com/b"},
+            {"title": "Original", "abstract": TEXT + " extra", "content": "https://example.com/c"}
+        ]
+        for position, document in enumerate(documents):
+            client.index(index="docs", id=str(position), document=document, refresh=True)
+
+        groups, scanned = find_duplicate_groups(client, "docs")
+        assert scanned == 3
+        assert [sorted(hit["_id"] for hit in group) for group in groups] == [["0", "2"]]
+
+        # Holding one signature at a time, the copy two documents later is no longer compared
+        groups, _ = find_duplicate_groups(client, "docs", max_signatures=1)
+        assert groups == []
+    finally:
+        server.stop()
@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from core.embeddings import EmbeddingService
+
+def test_batches_run_concurrently_up_to_the_worker_count():
+    # Each batch waits for a second one inside the model, which only returns if both run at once
+    barrier = threading.Barrier(2, timeout=5)
+    running = []
+
+    def embed_batch(texts):
+        running.append(texts)
+        barrier.wait()
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    async def scenario():
+        service = EmbeddingService(embed_batch, max_batch_size=1, max_wait_ms=0, cache_size=0, workers=2)
+        try:
+            return await asyncio.gather(service.embed("first"), service.embed("second"))
+        finally:
+            await service.close()
+
+    vectors = asyncio.run(scenario())
+    assert len(vectors) == 2 and sorted(running) == [["first"], ["second"]]
+    assert not barrier.broken
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from core.google_search import GoogleSearchClient, ResponseCache, TokenBucket
+from stub_google import StubGoogleServer
+
+def make_client(server, **options) -> GoogleSearchClient:
+    return GoogleSearchClient("key", "engine", url=server.url, backoff=0.01, **options)
+
+def test_fetch_paginates_and_serves_repeats_from_the_cache(tmp_path):
+    async def scenario(server):
+        client = make_client(server, cache=ResponseCache(str(tmp_path / "google.sqlite3"), ttl=60))
+        try:
+            items = await client.fetch("Deep  Learning", num_results=25)
+            again = await client.fetch("deep learning", num_results=25)
+        finally:
+            await client.close()
+        return client, items, again
+
+    with StubGoogleServer() as server:
+        client, items, again = asyncio.run(scenario(server))
+        assert server.requests == 3
+    assert [item["link"].rsplit("/", 1)[1] for item in items] == [str(position) for position in range(1, 26)]
+    assert again == items
+    assert client.stats.cache_hits == 1 and client.stats.cache_misses == 1
+
+def test_fetch_retries_failed_pages():
+    async def scenario(server):
+        client = make_client(server, max_retries=10)
+        try:
+            items = await client.fetch("retries", num_results=50)
+        finally:
+            await client.close()
+        return client, items
+
+    # Every stub failure is a 429 or a 500, both retried
+    with StubGoogleServer(error_rate=0.5) as server:
+        client, items = asyncio.run(scenario(server))
+        assert server.requests == client.stats.requests
+    assert len(items) == 50
+    assert client.stats.retries > 0
+    assert client.stats.requests == 5 + client.stats.retries
+
+def test_fetch_gives_up_after_max_retries():
+    async def scenario(server):
+        client = make_client(server, max_retries=1)
+        try:
+            await client.fetch("failing")
+        finally:
+            await client.close()
+
+    with StubGoogleServer(error_rate=1.0) as server:
+        with pytest.raises(Exception, match="Error querying the API"):
+            asyncio.run(scenario(server))
+        assert server.requests == 2
+
+def test_token_bucket_limits_the_request_rate():
+    async def scenario():
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = asyncio.get_running_loop().time()
+        for _ in range(6):
+            await bucket.acquire()
+        return asyncio.get_running_loop().time() - started
+
+    # The first call uses the burst, the other five wait 1/50 s each
+    assert asyncio.run(scenario()) >= 0.09
@@ -0,0 +1,40 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.index_lifecycle import reindex_to_version
+
+def make_legacy_client() -> MagicMock:
+    """
+    A client over a concrete "docs" index with no aliases yet
+    """
+    client = MagicMock()
+    client.indices.exists_alias.return_value = False
+    client.indices.exists.side_effect = lambda index: index == "docs"
+    client.indices.get_settings.side_effect = lambda index: {index: {"settings": {"index": {}}}}
+    client.reindex.return_value = {"task": "t1", "created": 0}
+    client.tasks.get.return_value = {"completed": True, "task": {"status": {"created": 3, "total": 3}}, "response": {}}
+    return client
+
+def calls(client: MagicMock):
+    return [(name, kwargs) for name, _, kwargs in client.mock_calls]
+
+def test_legacy_index_is_write_blocked_before_the_final_catch_up():
+    client = make_legacy_client()
+    result = reindex_to_version(client, "docs", 2)
+    assert result["swapped"]
+
+    history = calls(client)
+    block = history.index(("indices.put_settings", {"index": "docs", "settings": {"index.blocks.write": True}}))
+    catch_up = next(i for i, (name, kwargs) in enumerate(history) if name == "reindex" and kwargs.get("wait_for_completion"))
+    swap = next(i for i, (name, _) in enumerate(history) if name == "indices.update_aliases")
+    assert block < catch_up < swap
+    # Documents updated during the copy replace their stale copies
+    assert history[catch_up][1]["dest"] == {"index": "docs-v2-000001", "version_type": "external"}
+
+def test_failed_swap_lifts_the_write_block():
+    client = make_legacy_client()
+    client.indices.update_aliases.side_effect = RuntimeError("swap failed")
+    with pytest.raises(RuntimeError):
+        reindex_to_version(client, "docs", 2)
+    assert calls(client)[-1] == ("indices.put_settings", {"index": "docs", "settings": {"index.blocks.write": False}})
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+from elasticsearch import ApiError, BadRequestError, NotFoundError
+
+from core.pagination import ExpiredCursor, async_search_page, encode_cursor
+
+def api_error(error_class, status: int, error_type: str, root_cause: str):
+    meta = ApiResponseMeta(status=status, http_version="1.1", headers=HttpHeaders(), duration=0.0, node=NodeConfig("http", "localhost", 9200))
+    return error_class(error_type, meta, {"error": {"type": error_type, "root_cause": [{"type": root_cause, "reason": root_cause}]}})
+
+class FailingClient:
+    def __init__(self, error):
+        self.error = error
+        self.closed = []
+
+    async def open_point_in_time(self, index, keep_alive):
+        return {"id": "new-pit"}
+
+    async def search(self, body):
+        raise self.error
+
+    async def close_point_in_time(self, id):
+        self.closed.append(id)
+
+@pytest.mark.parametrize("error", [
+    api_error(NotFoundError, 404, "search_context_missing_exception", "search_context_missing_exception"),
+    api_error(NotFoundError, 404, "search_phase_execution_exception", "search_context_missing_exception")
+])
+def test_lost_point_in_time_expires_the_cursor(error):
+    cursor = encode_cursor("pit", [1.0, 7], "fp")
+    with pytest.raises(ExpiredCursor, match="restart pagination"):
+        asyncio.run(async_search_page(FailingClient(error), "docs", {"query": {}}, 10, "fp", cursor))
+
+@pytest.mark.parametrize("error", [
+    api_error(BadRequestError, 400, "parsing_exception", "parsing_exception"),
+    api_error(BadRequestError, 400, "search_phase_execution_exception", "script_exception")
+])
+def test_query_and_shard_errors_are_not_cursor_errors(error):
+    cursor = encode_cursor("pit", [1.0, 7], "fp")
+    with pytest.raises(BadRequestError):
+        asyncio.run(async_search_page(FailingClient(error), "docs", {"query": {}}, 10, "fp", cursor))
+
+def test_failed_first_page_closes_its_point_in_time():
+    client = FailingClient(api_error(BadRequestError, 400, "search_phase_execution_exception", "script_exception"))
+    with pytest.raises(ApiError):
+        asyncio.run(async_search_page(client, "docs", {"query": {}}, 10, "fp"))
+    assert client.closed == ["new-pit"]
@@ -0,0 +1,23 @@
+import asyncio
+
+from core.result_cache import IndexGeneration, InMemorySharedCache, ResultCache
+
+def test_result_computed_across_a_write_is_not_stored():
+    async def scenario():
+        generation = IndexGeneration()
+        cache = ResultCache(generation=generation, shared=InMemorySharedCache())
+        params = {"query": "deep learning"}
+
+        cached, looked_up_at = await cache.lookup("search", params)
+        assert cached is None
+        # A miss-fill writes documents while the search is running
+        generation.bump()
+        await cache.set("search", params, ["stale"], looked_up_at)
+        assert await cache.get("search", params) is None
+        assert cache.stats.stale_writes == 1
+
+        cached, looked_up_at = await cache.lookup("search", params)
+        await cache.set("search", params, ["fresh"], looked_up_at)
+        assert await cache.get("search", params) == ["fresh"]
+
+    asyncio.run(scenario())
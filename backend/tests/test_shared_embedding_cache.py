@@ -0,0 +1,24 @@
+import os
+import zlib
+
+import numpy as np
+
+from core.shared_embedding_cache import SharedEmbeddingCache, key_hash
+
+def test_slot_with_another_writers_vector_is_a_miss():
+    cache = SharedEmbeddingCache(f"test_embc_{os.getpid()}", dims=4, slots=8, ways=2)
+    try:
+        first, second = np.full(4, 0.25, dtype=np.float32), np.full(4, 0.5, dtype=np.float32)
+        cache.put("first", first)
+        assert np.array_equal(cache.get("first"), first)
+
+        # Interleaved writers: the slot ends with the key of "first" but the vector and vector-only CRC of "second"
+        hashed = key_hash("first")
+        row = cache._table[hashed % len(cache._table)]
+        way = int(np.flatnonzero(row["key"] == hashed)[0])
+        row["vector"][way] = second
+        row["checksum"][way] = zlib.crc32(second.tobytes())
+        assert cache.get("first") is None
+        assert cache.stats.torn_reads == 1
+    finally:
+        cache.close()
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from core.stats_aggregator import SearchStatsAggregator, normalize_stats_query, plan_stats_collapse
+from core.trending import TrendingTracker
+
+def test_normalize_stats_query_collapses_case_and_whitespace():
+    assert normalize_stats_query("  Deep   Learning ") == "deep learning"
+    assert normalize_stats_query("\tDeep\nlearning") == "deep learning"
+
+def test_aggregator_and_trending_snapshot_write_the_same_stats_document():
+    queries = ["Deep Learning", "  deep   learning ", "DEEP LEARNING\n"]
+
+    aggregator = SearchStatsAggregator(client=None, index_name="documents")
+    for query in queries:
+        aggregator.record(query)
+    count_ids = {action["_id"] for action in aggregator._build_actions(aggregator._counts, aggregator._last_searched)}
+
+    tracker = TrendingTracker(threshold=1.0)
+    tracker._stats_index = "documents_stats"
+    for query in queries:
+        tracker.record(query)
+    snapshot_ids = {action["_id"] for action in tracker._build_snapshot_actions(datetime.now().timestamp())}
+
+    assert count_ids == snapshot_ids == {"deep learning"}
+    assert aggregator._counts == {"deep learning": 3}
+
+def test_aggregator_ignores_blank_queries():
+    aggregator = SearchStatsAggregator(client=None, index_name="documents")
+    aggregator.record("   ")
+    assert aggregator.pending == 0
+
+def test_collapse_merges_auto_id_documents_into_the_query_document():
+    hits = [
+        {"_id": "auto-1", "_source": {"query": "Deep Learning", "count": 4, "last_searched": "2024-01-02T00:00:00"}},
+        {"_id": "deep learning", "_source": {
+            "query": "deep learning", "count": 2, "last_searched": "2025-03-01T00:00:00", "trending_score": 1.5
+        }},
+        {"_id": "cats", "_source": {"query": "cats", "count": 7, "last_searched": "2025-01-01T00:00:00"}}
+    ]
+    documents, replaced = plan_stats_collapse(hits)
+    assert replaced == ["auto-1"]
+    assert documents == [{
+        "_id": "deep learning",
+        "query": "deep learning",
+        "count": 6,
+        "last_searched": "2025-03-01T00:00:00",
+        "trending_score": 1.5,
+        "is_trending": False
+    }]
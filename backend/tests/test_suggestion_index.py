@@ -0,0 +1,35 @@
+from core.suggestion_index import SuggestionIndex
+from core.trending import TrendingTracker
+
+def walk(node):
+    yield node
+    for child in (node.children or {}).values():
+        yield from walk(child)
+
+def test_titles_beyond_max_titles_are_skipped():
+    index = SuggestionIndex(max_titles=2)
+    for title in ["Deep learning", "Deep kernels", "Deep forests"]:
+        index.add_document({"title": title})
+
+    status = index.status()
+    assert status["titles"] == 2 and status["entries"] == 2
+    assert {suggestion.text for suggestion in index.suggest("deep")} == {"Deep learning", "Deep kernels"}
+    assert index.suggest("fore") == []
+
+def test_distinct_queries_never_exceed_max_queries():
+    trending = TrendingTracker(capacity=50)
+    index = SuggestionIndex(max_queries=100, trending=trending)
+    index.add_document({"title": "Query planning"})
+    for position in range(5000):
+        query = f"query {position}"
+        trending.record(query)
+        index.add_query(query)
+        assert len(index._entries) <= 101
+
+    live = set(index._entries.values())
+    nodes = list(walk(index._root))
+    assert index.status()["nodes"] == len(nodes) < 5000
+    assert all(entry in live for node in nodes for entry in node.top)
+    # The most recent searches weigh the most, and titles are never evicted
+    assert index.suggest("query 4999")[0].text == "query 4999"
+    assert "Query planning" in {suggestion.text for suggestion in index.suggest("planning")}
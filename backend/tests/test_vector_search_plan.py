@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from core.custom_search import merge_search_responses, plan_vector_text_search
+from core.vector_index import VectorIndex
+
+def make_index(ready=True):
+    index = VectorIndex(dims=4)
+    index.add(["a", "b", "c"], [[1, 0, 0, 0], [0, 1, 0, 0], [0.9, 0.1, 0, 0]])
+    index.ready = ready
+    return index
+
+def test_knn_uses_only_the_local_candidates():
+    plan = plan_vector_text_search("q", np.array([1, 0, 0, 0], dtype=np.float32), size=2, mode="knn", vector_index=make_index())
+    assert [doc_id for doc_id, _ in plan.local_hits] == ["a", "c"]
+    assert len(plan.bodies) == 1 and "ids" in plan.bodies[0]["query"]
+    response = {"hits": {"hits": [{"_id": "c", "_source": {}}, {"_id": "a", "_source": {}}]}}
+    assert [hit["_id"] for hit in merge_search_responses([response], plan.size, plan.local_hits)] == ["a", "c"]
+
+@pytest.mark.parametrize("mode,fusion", [("script_score", "rrf"), ("hybrid", "linear")])
+def test_modes_scored_in_elasticsearch_ignore_the_local_index(mode, fusion):
+    plan = plan_vector_text_search("q", np.ones(4, dtype=np.float32), mode=mode, fusion=fusion, vector_index=make_index())
+    assert plan.local_hits is None
+
+def test_unbuilt_index_falls_back_to_elasticsearch_knn():
+    plan = plan_vector_text_search("q", np.ones(4, dtype=np.float32), mode="knn", vector_index=make_index(ready=False))
+    assert plan.local_hits is None and "knn" in plan.bodies[0]
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        plan_vector_text_search("q", np.ones(4, dtype=np.float32), mode="vector", vector_index=make_index())
@@ -0,0 +1,38 @@
+import asyncio
+
+import numpy as np
+
+from core import custom_search
+from core.index import async_vector_similarity
+
+class FakeIndices:
+    def __init__(self, similarities):
+        self.similarities = similarities
+
+    async def get_mapping(self, index):
+        return {
+            name: {"mappings": {"properties": {"vector": {"type": "dense_vector", "similarity": similarity}}}}
+            for name, similarity in self.similarities.items()
+        }
+
+class FakeClient:
+    def __init__(self, **similarities):
+        self.indices = FakeIndices(similarities)
+
+def test_dot_product_only_when_every_backing_index_uses_it():
+    assert asyncio.run(async_vector_similarity(FakeClient(a="dot_product"), "docs")) == "dot_product"
+    assert asyncio.run(async_vector_similarity(FakeClient(a="dot_product", b="cosine"), "docs")) == "cosine"
+    # Legacy indices with a non-indexed vector field have no similarity
+    assert asyncio.run(async_vector_similarity(FakeClient(a=None), "docs")) == "cosine"
+
+def test_script_follows_the_detected_similarity():
+    vector = np.ones(4, dtype=np.float32) / 2
+    try:
+        custom_search.set_script_similarity("cosine")
+        source = custom_search.build_vector_text_query("q", vector)["query"]["script_score"]["script"]["source"]
+        assert "cosineSimilarity" in source
+        custom_search.set_script_similarity("dot_product")
+        source = custom_search.build_vector_text_query("q", vector)["query"]["script_score"]["script"]["source"]
+        assert "dotProduct" in source
+    finally:
+        custom_search.set_script_similarity(custom_search.VECTOR_SIMILARITY)